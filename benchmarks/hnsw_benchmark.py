@@ -0,0 +1,299 @@
+"""
+HNSW parameter sweep for the ChromaDB collection.
+
+Builds collections from synthetic or recorded embeddings at several sizes,
+sweeps M / construction_ef / search_ef and reports recall@k against exact
+search together with query latency, build time and on-disk size.
+
+Usage:
+    python -m benchmarks.hnsw_benchmark --sizes 1000 10000 --m 16 32 --search-ef 10 50
+    python -m benchmarks.hnsw_benchmark --embeddings recorded.npy --output report.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 2)[0])
+from config.settings import DATA_DIR
+from src.utils.vector_store import build_collection_metadata
+
+
+def generate_synthetic_embeddings(
+    n: int,
+    dim: int,
+    n_clusters: int = 50,
+    seed: int = 42
+) -> np.ndarray:
+    """
+    Generate clustered, L2-normalized vectors resembling text embeddings.
+    
+    Args:
+        n: Number of vectors
+        dim: Vector dimensionality
+        n_clusters: Number of topic clusters
+        seed: Random seed
+    
+    Returns:
+        Array of shape (n, dim) with float32 vectors
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    assignments = rng.integers(0, n_clusters, size=n)
+    vectors = centers[assignments] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows of a matrix."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def make_queries(base: np.ndarray, n_queries: int, seed: int = 7) -> np.ndarray:
+    """
+    Create query vectors by perturbing randomly chosen base vectors.
+    
+    Args:
+        base: Base vectors of shape (n, dim)
+        n_queries: Number of queries to create
+        seed: Random seed
+    
+    Returns:
+        Array of shape (n_queries, dim)
+    """
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(base), size=n_queries)
+    noise = 0.3 * rng.standard_normal((n_queries, base.shape[1])).astype(np.float32)
+    return normalize(base[picks] + noise)
+
+
+def exact_top_k(base: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """
+    Compute exact cosine top-k indices by brute force.
+    
+    Args:
+        base: Normalized base vectors
+        queries: Normalized query vectors
+        k: Number of neighbours
+    
+    Returns:
+        Array of shape (n_queries, k) with base indices
+    """
+    scores = queries @ base.T
+    top = np.argpartition(-scores, kth=min(k, base.shape[0] - 1), axis=1)[:, :k]
+    order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def directory_size(path: str) -> int:
+    """Return the total size in bytes of all files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run_configuration(
+    base: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    hnsw_params: Dict[str, int]
+) -> Dict:
+    """
+    Build one collection with the given HNSW parameters and measure it.
+    
+    Args:
+        base: Base vectors to index
+        queries: Query vectors
+        truth: Exact top-k indices for each query
+        k: Number of results per query
+        hnsw_params: HNSW parameters ('M', 'construction_ef', 'search_ef')
+    
+    Returns:
+        Dictionary with recall, latency, build time and disk size
+    """
+    with tempfile.TemporaryDirectory(prefix="hnsw_bench_") as persist_dir:
+        client = chromadb.PersistentClient(
+            path=persist_dir,
+            settings=Settings(anonymized_telemetry=False, allow_reset=True)
+        )
+        collection = client.create_collection(
+            name="hnsw_benchmark",
+            metadata=build_collection_metadata(hnsw_params)
+        )
+        
+        ids = [str(i) for i in range(len(base))]
+        batch_size = client.get_max_batch_size()
+        
+        build_start = time.perf_counter()
+        for start in range(0, len(base), batch_size):
+            collection.add(
+                ids=ids[start:start + batch_size],
+                embeddings=base[start:start + batch_size]
+            )
+        build_seconds = time.perf_counter() - build_start
+        
+        latencies = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            query_start = time.perf_counter()
+            results = collection.query(
+                query_embeddings=[query],
+                n_results=k,
+                include=[]
+            )
+            latencies.append((time.perf_counter() - query_start) * 1000)
+            
+            returned = {int(i) for i in results["ids"][0]}
+            hits += len(returned.intersection(int(i) for i in expected))
+        
+        disk_bytes = directory_size(persist_dir)
+        client.reset()
+    
+    return {
+        "hnsw": hnsw_params,
+        "recall_at_k": hits / float(truth.size),
+        "latency_ms": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+            "mean": float(np.mean(latencies))
+        },
+        "build_seconds": build_seconds,
+        "disk_bytes": disk_bytes
+    }
+
+
+def run_benchmark(
+    sizes: List[int],
+    m_values: List[int],
+    construction_ef_values: List[int],
+    search_ef_values: List[int],
+    k: int = 5,
+    n_queries: int = 200,
+    dim: int = 1536,
+    embeddings_path: Optional[str] = None
+) -> Dict:
+    """
+    Sweep HNSW parameters over several collection sizes.
+    
+    Args:
+        sizes: Collection sizes to build
+        m_values: Values of M to test
+        construction_ef_values: Values of construction_ef to test
+        search_ef_values: Values of search_ef to test
+        k: Number of results per query (recall@k)
+        n_queries: Number of queries per configuration
+        dim: Dimensionality for synthetic embeddings
+        embeddings_path: Optional .npy file with recorded embeddings
+    
+    Returns:
+        Machine-readable benchmark report
+    """
+    if embeddings_path:
+        source = normalize(np.load(embeddings_path).astype(np.float32))
+        dim = source.shape[1]
+        sizes = [size for size in sizes if size <= len(source)] or [len(source)]
+        source_name = str(embeddings_path)
+    else:
+        source = generate_synthetic_embeddings(max(sizes), dim)
+        source_name = "synthetic"
+    
+    results = []
+    for size in sizes:
+        base = source[:size]
+        queries = make_queries(base, n_queries)
+        truth = exact_top_k(base, queries, k)
+        
+        for m, construction_ef, search_ef in itertools.product(
+            m_values, construction_ef_values, search_ef_values
+        ):
+            hnsw_params = {
+                "M": m,
+                "construction_ef": construction_ef,
+                "search_ef": search_ef
+            }
+            logger.info(f"Benchmarking size={size} {hnsw_params}")
+            
+            result = run_configuration(base, queries, truth, k, hnsw_params)
+            result["size"] = size
+            results.append(result)
+            
+            logger.info(
+                f"recall@{k}={result['recall_at_k']:.3f} "
+                f"p50={result['latency_ms']['p50']:.2f}ms "
+                f"p99={result['latency_ms']['p99']:.2f}ms "
+                f"build={result['build_seconds']:.2f}s"
+            )
+    
+    return {
+        "benchmark": "hnsw",
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "chromadb": chromadb.__version__,
+            "numpy": np.__version__,
+            "python": platform.python_version(),
+            "machine": platform.machine()
+        },
+        "dataset": {
+            "source": source_name,
+            "dim": dim,
+            "n_queries": n_queries,
+            "k": k
+        },
+        "results": results
+    }
+
+
+def main() -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="HNSW recall/latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--embeddings", help="Path to a .npy file with recorded embeddings")
+    parser.add_argument("--output", help="Path of the JSON report")
+    args = parser.parse_args()
+    
+    report = run_benchmark(
+        sizes=args.sizes,
+        m_values=args.m,
+        construction_ef_values=args.construction_ef,
+        search_ef_values=args.search_ef,
+        k=args.k,
+        n_queries=args.queries,
+        dim=args.dim,
+        embeddings_path=args.embeddings
+    )
+    
+    output = Path(args.output) if args.output else (
+        DATA_DIR / "benchmarks" / f"hnsw_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    
+    logger.info(f"Wrote HNSW benchmark report to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
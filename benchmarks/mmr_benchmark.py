@@ -0,0 +1,250 @@
+"""
+Redundancy of RAG tool context with and without MMR re-ranking.
+
+Indexes one or more PDFs into a temporary collection, runs each question
+with plain similarity top-k and with maximal marginal relevance at several
+lambdas, and reports the prompt tokens of the formatted tool output, how
+many of them repeat text already present in the context, and the mean
+relevance of the selected chunks. Both contexts hold k chunks, so the
+comparison is in redundant tokens, not total tokens. Documents are
+registered in a temporary registry, never in the application's.
+
+Usage:
+    python -m benchmarks.mmr_benchmark --pdf notes.pdf --questions questions.txt
+    python -m benchmarks.mmr_benchmark --pdf a.pdf b.pdf --questions q.txt --lambdas 0.3 0.5 0.7
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import tiktoken
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 2)[0])
+from config.settings import DATA_DIR, OPENAI_MODEL
+from src.utils.document_registry import DocumentRegistry, get_document_registry, use_document_registry
+from src.utils.embeddings import EmbeddingManager
+from src.utils.pdf_processor import PDFProcessor
+from src.utils.vector_store import VectorStore, maximal_marginal_relevance
+
+
+def get_encoding(model: str) -> tiktoken.Encoding:
+    """Get the tokenizer for a model, falling back to cl100k_base."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def format_context(documents: List[str], metadatas: List[Dict]) -> str:
+    """Format chunks the way RAGTool presents them to the agent."""
+    return "\n---\n".join(
+        f"[Result {i}] ({metadata.get('file_name', 'Unknown file')}, "
+        f"Page {metadata.get('page_number', 'Unknown')}):\n{doc}\n"
+        for i, (doc, metadata) in enumerate(zip(documents, metadatas), start=1)
+    )
+
+
+def unique_text(documents: List[str], metadatas: List[Dict]) -> str:
+    """
+    Get the text covered by a set of chunks with overlapping spans counted once.
+    
+    Args:
+        documents: Chunk texts
+        metadatas: Chunk metadata with 'doc_id', 'page_number' and offsets
+    
+    Returns:
+        Concatenated text of the merged spans
+    """
+    registry = get_document_registry()
+    spans: Dict = {}
+    for metadata in metadatas:
+        key = (metadata.get("doc_id"), metadata.get("page_number"))
+        spans.setdefault(key, []).append((metadata.get("start_index", 0), metadata.get("end_index", 0)))
+    
+    parts = []
+    for (doc_id, page_number), ranges in spans.items():
+        page_text = registry.get_page_text(doc_id, page_number)
+        ranges.sort()
+        start, end = ranges[0]
+        for next_start, next_end in ranges[1:]:
+            if next_start <= end:
+                end = max(end, next_end)
+            else:
+                parts.append(page_text[start:end])
+                start, end = next_start, next_end
+        parts.append(page_text[start:end])
+    return "\n".join(parts)
+
+
+def measure(
+    encoding: tiktoken.Encoding,
+    results: Dict,
+    selected: List[int]
+) -> Dict:
+    """
+    Measure the context built from a subset of candidate results.
+    
+    Args:
+        encoding: Tokenizer
+        results: Hydrated candidate results
+        selected: Indices of the candidates placed in the context
+    
+    Returns:
+        Dictionary with context tokens, redundant tokens and mean distance
+    """
+    documents = [results["documents"][i] for i in selected]
+    metadatas = [results["metadatas"][i] for i in selected]
+    
+    context_tokens = len(encoding.encode(format_context(documents, metadatas)))
+    chunk_tokens = sum(len(encoding.encode(doc)) for doc in documents)
+    unique_tokens = len(encoding.encode(unique_text(documents, metadatas)))
+    
+    return {
+        "context_tokens": context_tokens,
+        "redundant_tokens": max(chunk_tokens - unique_tokens, 0),
+        "pages": len({(m.get("doc_id"), m.get("page_number")) for m in metadatas}),
+        "mean_distance": float(np.mean([results["distances"][i] for i in selected])) if selected else 0.0
+    }
+
+
+def summarize(rows: List[Dict]) -> Dict:
+    """Average per-question measurements."""
+    return {
+        key: float(np.mean([row[key] for row in rows])) if rows else 0.0
+        for key in ("context_tokens", "redundant_tokens", "pages", "mean_distance")
+    }
+
+
+def run_benchmark(
+    pdf_paths: List[str],
+    questions: List[str],
+    k: int = 5,
+    fetch_k: int = 20,
+    lambdas: List[float] = None
+) -> Dict:
+    """
+    Compare plain top-k retrieval with MMR re-ranking.
+    
+    Args:
+        pdf_paths: PDFs to index
+        questions: Questions to run
+        k: Number of chunks in the context
+        fetch_k: Size of the MMR candidate pool
+        lambdas: MMR lambdas to test
+    
+    Returns:
+        Machine-readable benchmark report
+    """
+    lambdas = lambdas or [0.5]
+    encoding = get_encoding(OPENAI_MODEL)
+    processor = PDFProcessor()
+    embedding_manager = EmbeddingManager()
+    
+    with tempfile.TemporaryDirectory(prefix="mmr_bench_") as persist_dir, \
+            use_document_registry(DocumentRegistry(str(Path(persist_dir) / "documents.sqlite3"))) as registry:
+        store = VectorStore(
+            collection_name="mmr_benchmark",
+            persist_dir=persist_dir,
+            embedding_manager=embedding_manager
+        )
+        
+        for pdf_path in pdf_paths:
+            document = processor.extract_text_from_pdf(pdf_path)
+            doc_id = registry.register_document(document["metadata"], document["pages"])
+            store.add_documents(embedding_manager.chunk_pages(document["pages"], document["metadata"], doc_id=doc_id))
+        total_chunks = store.get_collection_count()
+        
+        baseline_rows = []
+        mmr_rows = {mmr_lambda: [] for mmr_lambda in lambdas}
+        for question in questions:
+            query_embedding = embedding_manager.get_embedding(question)
+            candidates = store.query_by_embedding(
+                query_embedding,
+                n_results=max(fetch_k, k),
+                include_embeddings=True,
+                hydrate=False
+            )
+            embeddings = candidates.pop("embeddings")
+            candidates = registry.hydrate(candidates)
+            
+            baseline_rows.append(measure(encoding, candidates, list(range(min(k, len(embeddings))))))
+            for mmr_lambda in lambdas:
+                selected = maximal_marginal_relevance(query_embedding, embeddings, k, mmr_lambda)
+                mmr_rows[mmr_lambda].append(measure(encoding, candidates, selected))
+        
+        store.delete_collection()
+    
+    baseline = summarize(baseline_rows)
+    mmr_results = []
+    for mmr_lambda, rows in mmr_rows.items():
+        summary = summarize(rows)
+        summary["lambda"] = mmr_lambda
+        mmr_results.append(summary)
+        
+        logger.info(
+            f"lambda={mmr_lambda}: {summary['redundant_tokens']:.0f} redundant tokens "
+            f"(baseline {baseline['redundant_tokens']:.0f}) of {summary['context_tokens']:.0f}, "
+            f"{summary['pages']:.1f} pages (baseline {baseline['pages']:.1f})"
+        )
+    
+    return {
+        "benchmark": "mmr",
+        "generated_at": datetime.now().isoformat(),
+        "environment": {
+            "tiktoken_encoding": encoding.name,
+            "python": platform.python_version()
+        },
+        "dataset": {
+            "pdfs": [str(path) for path in pdf_paths],
+            "chunks": total_chunks,
+            "questions": len(questions),
+            "k": k,
+            "fetch_k": fetch_k
+        },
+        "baseline": baseline,
+        "mmr": mmr_results
+    }
+
+
+def main() -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="MMR context redundancy benchmark")
+    parser.add_argument("--pdf", nargs="+", required=True, help="PDF files to index")
+    parser.add_argument("--questions", required=True, help="Text file with one question per line")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--lambdas", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    parser.add_argument("--output", help="Path of the JSON report")
+    args = parser.parse_args()
+    
+    questions = [
+        line.strip() for line in Path(args.questions).read_text().splitlines() if line.strip()
+    ]
+    
+    report = run_benchmark(
+        pdf_paths=args.pdf,
+        questions=questions,
+        k=args.k,
+        fetch_k=args.fetch_k,
+        lambdas=args.lambdas
+    )
+    
+    output = Path(args.output) if args.output else (
+        DATA_DIR / "benchmarks" / f"mmr_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    
+    logger.info(f"Wrote MMR benchmark report to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,11 +13,14 @@ DATA_DIR = BASE_DIR / "data"
 UPLOADS_DIR = DATA_DIR / "uploads"
 VECTORSTORE_DIR = DATA_DIR / "vectorstore"
 OUTPUTS_DIR = DATA_DIR / "outputs"
+SNAPSHOTS_DIR = DATA_DIR / "snapshots"
+STUDY_PLANS_DIR = OUTPUTS_DIR / "study_plans"
 
 # Create directories if they don't exist
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 VECTORSTORE_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -27,14 +30,145 @@ SERPER_API_KEY = os.getenv("SERPER_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
 
+# Per-agent models; extraction and research default to the small tier
+MODEL_TIER_SMALL = os.getenv("MODEL_TIER_SMALL", "gpt-4o-mini")
+EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL", MODEL_TIER_SMALL)
+RESEARCH_MODEL = os.getenv("RESEARCH_MODEL", MODEL_TIER_SMALL)
+PLANNING_MODEL = os.getenv("PLANNING_MODEL", OPENAI_MODEL)
+RAG_MODEL = os.getenv("RAG_MODEL", OPENAI_MODEL)
+
+# Fallback to a secondary model when the primary times out or errors
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", MODEL_TIER_SMALL)
+LLM_PRIMARY_TIMEOUT_SECONDS = float(os.getenv("LLM_PRIMARY_TIMEOUT_SECONDS", "90"))
+LLM_PRIMARY_MAX_RETRIES = int(os.getenv("LLM_PRIMARY_MAX_RETRIES", "1"))
+
+# Optional model router for extraction/research (0 disables a budget)
+MODEL_ROUTER_ENABLED = os.getenv("MODEL_ROUTER_ENABLED", "false").lower() == "true"
+ROUTER_LARGE_INPUT_TOKENS = int(os.getenv("ROUTER_LARGE_INPUT_TOKENS", "6000"))
+ROUTER_LATENCY_BUDGET_SECONDS = float(os.getenv("ROUTER_LATENCY_BUDGET_SECONDS", "0"))
+ROUTER_COST_BUDGET_USD = float(os.getenv("ROUTER_COST_BUDGET_USD", "0"))
+
+# Background re-embedding when EMBEDDING_MODEL changes
+EMBEDDING_MIGRATION_AUTO = os.getenv("EMBEDDING_MIGRATION_AUTO", "false").lower() == "true"
+EMBEDDING_MIGRATION_BATCH_SIZE = int(os.getenv("EMBEDDING_MIGRATION_BATCH_SIZE", "100"))
+EMBEDDING_MIGRATION_BATCH_DELAY_SECONDS = float(os.getenv("EMBEDDING_MIGRATION_BATCH_DELAY_SECONDS", "1.0"))
+EMBEDDING_ALIAS_REFRESH_SECONDS = float(os.getenv("EMBEDDING_ALIAS_REFRESH_SECONDS", "30"))
+
+# Shared LLM HTTP connection pool (per process)
+LLM_MAX_CONCURRENT_REQUESTS = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "16"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "120"))
+LLM_POOL_TIMEOUT_SECONDS = float(os.getenv("LLM_POOL_TIMEOUT_SECONDS", "60"))
+
+# Persistent LLM response cache for crew agents
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(DATA_DIR / "cache" / "llm_responses.sqlite3"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "100"))
+
 # Vector Database
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", str(VECTORSTORE_DIR))
 
+# HNSW index parameters (defaults match ChromaDB's built-in values)
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "10"))
+
+# Number of persist directories to shard the collection across (1 = unsharded)
+VECTORSTORE_SHARDS = int(os.getenv("VECTORSTORE_SHARDS", "1"))
+
+# Optional shared vector-store server (leave host empty to open the store in-process)
+CHROMA_SERVER_HOST = os.getenv("CHROMA_SERVER_HOST", "")
+CHROMA_SERVER_PORT = int(os.getenv("CHROMA_SERVER_PORT", "8000"))
+
+# Single-writer ingestion queue (group commit)
+INGEST_COMMIT_INTERVAL_MS = int(os.getenv("INGEST_COMMIT_INTERVAL_MS", "100"))
+INGEST_MAX_BATCH_CHUNKS = int(os.getenv("INGEST_MAX_BATCH_CHUNKS", "2000"))
+
+# In-memory session index tier
+SESSION_INDEX_ENABLED = os.getenv("SESSION_INDEX_ENABLED", "false").lower() == "true"
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "64"))
+SESSION_TOTAL_MEMORY_MB = float(os.getenv("SESSION_TOTAL_MEMORY_MB", "512"))
+SESSION_IDLE_TTL_MINUTES = float(os.getenv("SESSION_IDLE_TTL_MINUTES", "60"))
+
+# Janitor TTLs and quotas (0 disables a limit)
+JANITOR_INTERVAL_MINUTES = float(os.getenv("JANITOR_INTERVAL_MINUTES", "30"))
+UPLOADS_TTL_HOURS = float(os.getenv("UPLOADS_TTL_HOURS", "24"))
+UPLOADS_QUOTA_MB = float(os.getenv("UPLOADS_QUOTA_MB", "500"))
+ARTIFACTS_TTL_HOURS = float(os.getenv("ARTIFACTS_TTL_HOURS", "168"))
+ARTIFACTS_QUOTA_MB = float(os.getenv("ARTIFACTS_QUOTA_MB", "1000"))
+SESSION_DATA_TTL_HOURS = float(os.getenv("SESSION_DATA_TTL_HOURS", "168"))
+UPLOADED_DATA_TTL_HOURS = float(os.getenv("UPLOADED_DATA_TTL_HOURS", "168"))
+JANITOR_COMPACT_MIN_DELETED = int(os.getenv("JANITOR_COMPACT_MIN_DELETED", "1000"))
+
 # App Settings
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
 
+# Keep chunk text only in the document registry's compressed page store
+EXTERNAL_CHUNK_TEXT = os.getenv("EXTERNAL_CHUNK_TEXT", "false").lower() == "true"
+
+# Maximal marginal relevance re-ranking of retrieved chunks
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))
+
+# Retrieved context packed into each RAG tool response
+RAG_N_RESULTS = int(os.getenv("RAG_N_RESULTS", "8"))
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+
+# Single-call answers from retrieved documents, escalating to the web RAG agent
+# when the closest chunk is farther than the cosine distance limit or the
+# model reports the documents do not cover the question
+RAG_FAST_PATH_ENABLED = os.getenv("RAG_FAST_PATH_ENABLED", "true").lower() == "true"
+RAG_FAST_PATH_MAX_DISTANCE = float(os.getenv("RAG_FAST_PATH_MAX_DISTANCE", "0.6"))
+
+# Start document retrieval and web search together as a question arrives and
+# hand both to the web RAG agent as evidence (one extra web search per
+# question that the fast path ends up answering)
+RAG_PREFETCH_ENABLED = os.getenv("RAG_PREFETCH_ENABLED", "false").lower() == "true"
+
+# Second-stage cross-encoder reranking (sentence-transformers, CPU)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "50"))
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "300"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+RERANK_PROBE_EVERY = int(os.getenv("RERANK_PROBE_EVERY", "20"))
+
+# Page/document summary index built at ingestion
+SUMMARY_INDEX_ENABLED = os.getenv("SUMMARY_INDEX_ENABLED", "false").lower() == "true"
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-4o-mini")
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "8"))
+
+# Per-topic research fan-out in the study plan crew
+RESEARCH_MAX_TOPICS = int(os.getenv("RESEARCH_MAX_TOPICS", "6"))
+RESEARCH_MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "4"))
+
+# Study plan stage cache (extraction/research reused across re-plans)
+STAGE_CACHE_ENABLED = os.getenv("STAGE_CACHE_ENABLED", "true").lower() == "true"
+STAGE_CACHE_DIR = os.getenv("STAGE_CACHE_DIR", str(OUTPUTS_DIR / "stage_cache"))
+EXTRACTION_CACHE_TTL_HOURS = float(os.getenv("EXTRACTION_CACHE_TTL_HOURS", "168"))
+RESEARCH_CACHE_TTL_HOURS = float(os.getenv("RESEARCH_CACHE_TTL_HOURS", "24"))
+
+# Study plan schedule skeleton
+STUDY_HOURS_PER_DAY = float(os.getenv("STUDY_HOURS_PER_DAY", "2"))
+STUDY_BUFFER_RATIO = float(os.getenv("STUDY_BUFFER_RATIO", "0.15"))
+
+# Map-reduce condensation of oversized assignment texts before extraction
+CONDENSE_MODEL = os.getenv("CONDENSE_MODEL", "gpt-4o-mini")
+CONDENSE_THRESHOLD_TOKENS = int(os.getenv("CONDENSE_THRESHOLD_TOKENS", "12000"))
+CONDENSE_CHUNK_TOKENS = int(os.getenv("CONDENSE_CHUNK_TOKENS", "4000"))
+CONDENSE_BRIEF_TOKENS = int(os.getenv("CONDENSE_BRIEF_TOKENS", "3000"))
+CONDENSE_MAX_CONCURRENCY = int(os.getenv("CONDENSE_MAX_CONCURRENCY", "8"))
+
+# Batch study plan generation (python -m src.crews.batch_study_plans)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+# Token, cost and call accounting of crew runs (JSONL, one line per run)
+USAGE_LOG_PATH = os.getenv("USAGE_LOG_PATH", str(DATA_DIR / "logs" / "usage.jsonl"))
+USAGE_TOOL_CALL_WARN = int(os.getenv("USAGE_TOOL_CALL_WARN", "15"))
+
 # Validate required API keys
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not set in .env file")
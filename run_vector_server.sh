@@ -0,0 +1,30 @@
+#!/bin/bash
+
+# Run a local vector-store server shared by all app processes
+
+echo "🗄️  Starting local vector-store server..."
+echo ""
+
+# Load settings from .env if present
+if [ -f ".env" ]; then
+    set -a
+    source .env
+    set +a
+fi
+
+# Activate virtual environment
+if [ -d ".venv" ]; then
+    source .venv/bin/activate
+fi
+
+PERSIST_DIR="${CHROMA_PERSIST_DIR:-./data/vectorstore}"
+HOST="${CHROMA_SERVER_HOST:-localhost}"
+PORT="${CHROMA_SERVER_PORT:-8000}"
+
+echo "📂 Persist directory: $PERSIST_DIR"
+echo "🌐 Listening on: $HOST:$PORT"
+echo ""
+echo "Set CHROMA_SERVER_HOST=$HOST and CHROMA_SERVER_PORT=$PORT in .env so the app uses this server."
+echo ""
+
+chroma run --path "$PERSIST_DIR" --host "$HOST" --port "$PORT"
@@ -1,25 +1,25 @@
-"""Assignment detail extraction agent using GPT-4o."""
+"""Assignment detail extraction agent."""
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import EXTRACTION_MODEL
+from src.utils.llm_pool import get_agent_llm
 
 
-def create_extraction_agent() -> Agent:
+def create_extraction_agent(model: Optional[str] = None) -> Agent:
     """
     Create an agent for extracting assignment details from text.
     
+    Args:
+        model: Chat model (defaults to EXTRACTION_MODEL)
+    
     Returns:
         Agent configured for detail extraction
     """
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0.1,
-        openai_api_key=OPENAI_API_KEY
-    )
+    llm = get_agent_llm(temperature=0, model=model or EXTRACTION_MODEL)
     
     agent = Agent(
         role="Assignment Details Analyzer",
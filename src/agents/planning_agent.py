@@ -1,25 +1,25 @@
 """Planning agent for creating study plans."""
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import PLANNING_MODEL
+from src.utils.llm_pool import get_agent_llm
 
 
-def create_planning_agent() -> Agent:
+def create_planning_agent(model: Optional[str] = None) -> Agent:
     """
     Create an agent for generating personalized study plans.
     
+    Args:
+        model: Chat model (defaults to PLANNING_MODEL)
+    
     Returns:
         Agent configured for study planning
     """
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0.5,
-        openai_api_key=OPENAI_API_KEY
-    )
+    llm = get_agent_llm(temperature=0.5, model=model or PLANNING_MODEL)
     
     agent = Agent(
         role="Study Plan Architect",
@@ -1,31 +1,28 @@
 """RAG agent for document question answering."""
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
 from typing import Optional
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import RAG_MODEL
 from src.tools.rag_tool import get_rag_tool
-from src.utils.vector_store import VectorStore
+from src.utils.vector_store import BaseVectorStore
+from src.utils.llm_pool import get_agent_llm
 
 
-def create_rag_agent(vector_store: Optional[VectorStore] = None) -> Agent:
+def create_rag_agent(vector_store: Optional[BaseVectorStore] = None, model: Optional[str] = None) -> Agent:
     """
     Create an agent for answering questions based on uploaded documents.
     
     Args:
         vector_store: Optional VectorStore instance
+        model: Chat model (defaults to RAG_MODEL)
         
     Returns:
         Agent configured for RAG-based Q&A
     """
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0.3,
-        openai_api_key=OPENAI_API_KEY
-    )
+    llm = get_agent_llm(temperature=0.3, model=model or RAG_MODEL)
     
     rag_tool = get_rag_tool(vector_store)
     
@@ -1,26 +1,26 @@
 """Research agent for web searching."""
 
 from crewai import Agent
-from langchain_openai import ChatOpenAI
+from typing import Optional
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from config.settings import OPENAI_API_KEY, OPENAI_MODEL
+from config.settings import RESEARCH_MODEL
 from src.tools.web_search_tool import search_tool
+from src.utils.llm_pool import get_agent_llm
 
 
-def create_research_agent() -> Agent:
+def create_research_agent(model: Optional[str] = None) -> Agent:
     """
     Create an agent for web research using SerperAPI.
     
+    Args:
+        model: Chat model (defaults to RESEARCH_MODEL)
+    
     Returns:
         Agent configured for web research
     """
-    llm = ChatOpenAI(
-        model=OPENAI_MODEL,
-        temperature=0.7,
-        openai_api_key=OPENAI_API_KEY
-    )
+    llm = get_agent_llm(temperature=0.7, model=model or RESEARCH_MODEL)
     
     agent = Agent(
         role="Web Research Specialist",
@@ -0,0 +1,294 @@
+"""
+Batch study plan generation for a manifest of assignments.
+
+The manifest is a JSON list or a CSV file with one entry per plan:
+    id            Unique plan id, used as the output file name
+    assignment    Path to a .pdf/.txt/.md file (relative to the manifest; several joined by ';')
+    text          Assignment text, instead of a file
+    deadline      ISO date or datetime
+    current_date  Optional ISO date the plan starts from (defaults to now)
+
+Plans already written to the output directory are skipped, so rerunning the
+same command resumes after a partial failure. Entries with the same assignment
+and dates are generated once and the plan is written for each of them.
+
+Usage:
+    python -m src.crews.batch_study_plans --manifest cohort.csv
+    python -m src.crews.batch_study_plans --manifest cohort.json --concurrency 8 --force
+"""
+
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import STUDY_PLANS_DIR, BATCH_MAX_CONCURRENCY
+from src.crews.study_plan_crew import StudyPlanCrew
+from src.utils.pdf_processor import PDFProcessor
+
+
+def load_manifest(manifest_path: str) -> List[Dict]:
+    """
+    Read manifest entries from a JSON or CSV file.
+    
+    Args:
+        manifest_path: Path to the manifest
+    
+    Returns:
+        List of entry dictionaries
+    """
+    path = Path(manifest_path)
+    if path.suffix.lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            entries = list(csv.DictReader(f))
+    
+    ids = [str(entry.get("id") or "").strip() for entry in entries]
+    if not all(ids):
+        raise ValueError("Every manifest entry needs an id")
+    if len(set(ids)) != len(ids):
+        raise ValueError("Manifest ids must be unique")
+    
+    return entries
+
+
+def load_assignment_text(entry: Dict, base_dir: Path) -> str:
+    """
+    Get the assignment text of a manifest entry.
+    
+    Args:
+        entry: Manifest entry
+        base_dir: Directory relative assignment paths are resolved against
+    
+    Returns:
+        Assignment text
+    """
+    if entry.get("text"):
+        return entry["text"]
+    
+    texts = []
+    for name in str(entry.get("assignment") or "").split(";"):
+        name = name.strip()
+        if not name:
+            continue
+        path = Path(name) if Path(name).is_absolute() else base_dir / name
+        if path.suffix.lower() == ".pdf":
+            texts.append(PDFProcessor().extract_text_from_pdf(str(path))["full_text"])
+        else:
+            texts.append(path.read_text(encoding="utf-8"))
+    
+    if not texts:
+        raise ValueError(f"Entry {entry['id']} has neither text nor an assignment file")
+    return "\n\n".join(texts)
+
+
+def assignment_key(entry: Dict, base_dir: Path) -> str:
+    """
+    Identify the plan an entry asks for, so identical entries are generated once.
+    
+    Args:
+        entry: Manifest entry
+        base_dir: Directory relative assignment paths are resolved against
+    
+    Returns:
+        Key covering the assignment text or files and the dates
+    """
+    if entry.get("text"):
+        assignment = ["text", entry["text"]]
+    else:
+        assignment = ["files"] + [
+            str((Path(name) if Path(name).is_absolute() else base_dir / name).resolve())
+            for name in (name.strip() for name in str(entry.get("assignment") or "").split(";"))
+            if name
+        ]
+    dates = [str(entry.get(field) or "").strip() for field in ("deadline", "current_date")]
+    return json.dumps(assignment + dates)
+
+
+def _write_atomic(path: Path, content: str) -> None:
+    """Write a file through a temporary file so readers never see partial output."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class BatchStudyPlanner:
+    """
+    Generate study plans for many assignments with bounded parallelism.
+    
+    Each worker thread keeps its own StudyPlanCrew, since crewai agents are
+    not safe to share between concurrent runs, while the LLM connection pool,
+    LLM response cache and stage cache are process-wide and shared by all of
+    them.
+    """
+    
+    def __init__(
+        self,
+        output_dir: Path,
+        max_concurrency: int = BATCH_MAX_CONCURRENCY,
+        force: bool = False
+    ):
+        """
+        Initialize the batch planner.
+        
+        Args:
+            output_dir: Directory the plans and status files are written to
+            max_concurrency: Maximum plans generated in parallel
+            force: Regenerate plans that already exist
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.max_concurrency = max_concurrency
+        self.force = force
+        self._local = threading.local()
+    
+    def _crew(self) -> StudyPlanCrew:
+        """Get this worker thread's crew."""
+        if getattr(self._local, "crew", None) is None:
+            self._local.crew = StudyPlanCrew()
+        return self._local.crew
+    
+    def plan_path(self, plan_id: str) -> Path:
+        """Path of a generated plan."""
+        return self.output_dir / f"{plan_id}.md"
+    
+    def _run_entry(self, entry: Dict, base_dir: Path, duplicates: List[Dict]) -> List[Dict]:
+        """Generate one plan, then write and record it for the entry and its duplicates."""
+        plan_id = str(entry["id"]).strip()
+        started = time.perf_counter()
+        status = {"id": plan_id, "success": False}
+        plan = None
+        
+        try:
+            assignment_text = load_assignment_text(entry, base_dir)
+            deadline = datetime.fromisoformat(str(entry["deadline"]).strip())
+            current_date = (
+                datetime.fromisoformat(str(entry["current_date"]).strip())
+                if entry.get("current_date") else None
+            )
+            
+            result = self._crew().generate_study_plan(assignment_text, deadline, current_date)
+            if not result["success"]:
+                raise RuntimeError(result["error"])
+            
+            plan = str(result["study_plan"])
+            status.update(success=True, deadline=result["deadline"], generated_at=result["generated_at"])
+            
+        except Exception as e:
+            logger.error(f"Plan {plan_id} failed: {str(e)}")
+            status["error"] = str(e)
+        
+        status["latency_seconds"] = time.perf_counter() - started
+        statuses = [status] + [
+            {**status, "id": str(duplicate["id"]).strip(), "duplicate_of": plan_id}
+            for duplicate in duplicates
+        ]
+        for entry_status in statuses:
+            if plan is not None:
+                _write_atomic(self.plan_path(entry_status["id"]), plan)
+            _write_atomic(self.output_dir / f"{entry_status['id']}.json", json.dumps(entry_status, indent=2))
+        return statuses
+    
+    def run(self, entries: List[Dict], base_dir: Optional[Path] = None) -> Dict:
+        """
+        Generate the plans of all entries that have none yet.
+        
+        Args:
+            entries: Manifest entries
+            base_dir: Directory relative assignment paths are resolved against
+        
+        Returns:
+            Report with counts, throughput and per-plan latency
+        """
+        base_dir = base_dir or Path.cwd()
+        pending = [
+            entry for entry in entries
+            if self.force or not self.plan_path(str(entry["id"]).strip()).exists()
+        ]
+        skipped = len(entries) - len(pending)
+        
+        # Identical assignments are generated once instead of racing each other
+        groups: Dict[str, List[Dict]] = {}
+        for entry in pending:
+            groups.setdefault(assignment_key(entry, base_dir), []).append(entry)
+        logger.info(
+            f"Generating {len(groups)} study plans for {len(pending)} entries ({skipped} already done) "
+            f"with up to {self.max_concurrency} in parallel"
+        )
+        
+        started = time.perf_counter()
+        statuses = []
+        with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency), thread_name_prefix="batch-plan") as executor:
+            futures = [executor.submit(self._run_entry, group[0], base_dir, group[1:]) for group in groups.values()]
+            for future in as_completed(futures):
+                group_statuses = future.result()
+                statuses.extend(group_statuses)
+                status = group_statuses[0]
+                logger.info(
+                    f"[{len(statuses)}/{len(pending)}] Plan {status['id']} "
+                    + (f"(and {len(group_statuses) - 1} duplicates) " if len(group_statuses) > 1 else "")
+                    + f"{'done' if status['success'] else 'failed'} in {status['latency_seconds']:.1f}s"
+                )
+        elapsed = time.perf_counter() - started
+        
+        generated = [status for status in statuses if "duplicate_of" not in status]
+        latencies = sorted(status["latency_seconds"] for status in generated if status["success"])
+        
+        def percentile(p: float) -> Optional[float]:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+        
+        report = {
+            "total": len(entries),
+            "skipped": skipped,
+            "succeeded": sum(1 for status in statuses if status["success"]),
+            "deduplicated": len(statuses) - len(generated),
+            "failed": [status["id"] for status in statuses if not status["success"]],
+            "elapsed_seconds": elapsed,
+            "plans_per_minute": len(latencies) / elapsed * 60 if elapsed else 0.0,
+            "latency_seconds": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": latencies[-1] if latencies else None,
+                "per_plan": {status["id"]: status["latency_seconds"] for status in generated}
+            }
+        }
+        _write_atomic(self.output_dir / "report.json", json.dumps(report, indent=2))
+        return report
+
+
+def main() -> int:
+    """Run a batch from the command line."""
+    parser = argparse.ArgumentParser(description="Generate study plans for a manifest of assignments")
+    parser.add_argument("--manifest", required=True, help="JSON or CSV manifest")
+    parser.add_argument("--output-dir", help="Defaults to STUDY_PLANS_DIR/<manifest name>, which the janitor never sweeps")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY)
+    parser.add_argument("--force", action="store_true", help="Regenerate plans that already exist")
+    args = parser.parse_args()
+    
+    manifest = Path(args.manifest)
+    output_dir = Path(args.output_dir) if args.output_dir else STUDY_PLANS_DIR / manifest.stem
+    
+    planner = BatchStudyPlanner(output_dir, max_concurrency=args.concurrency, force=args.force)
+    report = planner.run(load_manifest(str(manifest)), base_dir=manifest.parent)
+    
+    logger.info(
+        f"Batch finished: {report['succeeded']} succeeded, {len(report['failed'])} failed, "
+        f"{report['skipped']} skipped in {report['elapsed_seconds']:.1f}s "
+        f"({report['plans_per_minute']:.1f} plans/min, p50 {report['latency_seconds']['p50'] or 0:.1f}s, "
+        f"p95 {report['latency_seconds']['p95'] or 0:.1f}s); report in {output_dir / 'report.json'}"
+    )
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,39 +1,133 @@
 """RAG question-answering crew with web enhancement."""
 
-from crewai import Crew, Task, Process
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from crewai import Agent, Crew, Task, Process
+from typing import Callable, Dict, Iterator, Optional, Tuple
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    RAG_MODEL,
+    RAG_CONTEXT_TOKEN_BUDGET,
+    RAG_FAST_PATH_ENABLED,
+    RAG_FAST_PATH_MAX_DISTANCE,
+    RAG_PREFETCH_ENABLED
+)
 from src.agents.web_rag_agent import create_web_rag_agent
-from src.utils.vector_store import VectorStore
+from src.tools.rag_tool import get_rag_tool
+from src.tools.web_search_tool import search_tool
+from src.utils.context_packer import truncate_to_tokens
+from src.utils.llm_pool import get_llm, kickoff_with_fallback
+from src.utils.vector_store import BaseVectorStore, create_vector_store
+from src.utils.streaming import Emit, stream_events, stream_final_answer
+from src.utils.usage_tracker import RunUsage, get_usage_tracker, track_agent
+
+
+# Reply the fast path asks for when the documents do not answer the question
+INSUFFICIENT_MARKER = "INSUFFICIENT_CONTEXT"
+
+FAST_PATH_PROMPT = (
+    "Answer the question using only the course material excerpts below. Cite the document names and page "
+    "numbers you use, include examples and explanations where the excerpts give them, and format the answer "
+    "in markdown with headers, lists, and emphasis where appropriate.\n"
+    "If the excerpts do not contain enough information to answer the question fully, reply with exactly "
+    "{marker} and nothing else.\n\n"
+    "Course material excerpts:\n{context}\n\n"
+    "Question: {question}"
+)
+
+# Threads of the evidence pre-fetch executor shared by every crew
+PREFETCH_WORKERS = 8
+
+_prefetch_executor: Optional[ThreadPoolExecutor] = None
+_prefetch_executor_lock = threading.Lock()
+
+
+def get_prefetch_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide executor running evidence pre-fetches.
+    
+    It is shared rather than owned by a crew because a crew is created per
+    Streamlit session and would otherwise leave its threads behind. Searches
+    are not scoped to a question, so a fast-path answer never waits on them.
+    """
+    global _prefetch_executor
+    with _prefetch_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="rag-prefetch")
+        return _prefetch_executor
 
 
 class RAGCrew:
     """Crew for answering questions using RAG and web search."""
     
-    def __init__(self, vector_store: Optional[VectorStore] = None):
+    def __init__(
+        self,
+        vector_store: Optional[BaseVectorStore] = None,
+        fast_path: bool = RAG_FAST_PATH_ENABLED,
+        max_distance: float = RAG_FAST_PATH_MAX_DISTANCE,
+        prefetch: bool = RAG_PREFETCH_ENABLED
+    ):
         """
         Initialize the RAG crew with agents.
         
         Args:
             vector_store: Optional VectorStore instance
+            fast_path: Try a single LLM call over retrieved documents before the agent
+            max_distance: Cosine distance of the closest chunk above which the agent is used
+            prefetch: Fetch document and web evidence concurrently when the question arrives
         """
-        self.vector_store = vector_store or VectorStore()
+        self.vector_store = vector_store or create_vector_store()
         self.web_rag_agent = create_web_rag_agent(self.vector_store)
+        self.rag_tool = get_rag_tool(self.vector_store)
+        self.fast_path = fast_path
+        self.max_distance = max_distance
+        self.prefetch = prefetch
         
         logger.info("Initialized RAGCrew with web-enhanced agent")
     
-    def create_task(self, question: str) -> Task:
+    def create_task(self, question: str, evidence: Optional[str] = None, agent: Optional[Agent] = None) -> Task:
         """
         Create a task for answering a question.
         
         Args:
             question: User's question
-            
+            evidence: Pre-fetched document and web evidence; the agent then synthesizes
+                instead of searching
+            agent: Agent running the task (defaults to the crew's web RAG agent)
+        
         Returns:
             Task object
         """
+        if evidence is not None:
+            return Task(
+                description=(
+                    f"Answer the following question comprehensively:\n\n"
+                    f"{question}\n\n"
+                    f"The course materials and the web have already been searched for you:\n\n"
+                    f"{evidence}\n\n"
+                    f"Synthesize this evidence into your answer directly. Only use a tool if the evidence "
+                    f"lacks something essential to the question.\n\n"
+                    f"Your answer should:\n"
+                    f"- Start with information from the course materials (if available)\n"
+                    f"- Enhance with the web results\n"
+                    f"- Cite sources clearly:\n"
+                    f"  * For course materials: mention page numbers and document names\n"
+                    f"  * For web sources: include URLs and source names\n"
+                    f"- Be well-organized with clear sections\n"
+                    f"- Include examples and explanations\n"
+                    f"- Acknowledge if certain information is not available\n\n"
+                    f"Format your answer in markdown with headers, lists, and emphasis where appropriate."
+                ),
+                expected_output=(
+                    "A comprehensive answer that combines information from course materials and web research, "
+                    "with clear citations, examples, and explanations. Use markdown formatting."
+                ),
+                agent=agent or self.web_rag_agent
+            )
+        
         task = Task(
             description=(
                 f"Answer the following question comprehensively:\n\n"
@@ -57,50 +151,287 @@ class RAGCrew:
                 "A comprehensive answer that combines information from course materials and web research, "
                 "with clear citations, examples, and explanations. Use markdown formatting."
             ),
-            agent=self.web_rag_agent
+            agent=agent or self.web_rag_agent
         )
         
         return task
     
-    def answer_question(self, question: str) -> Dict:
+    def retrieve_documents(self, question: str) -> Optional[Tuple[str, Dict]]:
         """
-        Answer a question using RAG and web search.
+        Retrieve the document evidence of a question.
         
         Args:
             question: User's question
-            
+        
         Returns:
-            Dictionary with answer and metadata
+            Packed passages and raw results, or None without indexed documents
+        """
+        if self.vector_store.get_collection_count() == 0:
+            return None
+        return self.rag_tool.retrieve(question)
+    
+    def search_web(self, question: str) -> str:
+        """
+        Search the web for a question.
+        
+        Args:
+            question: User's question
+        
+        Returns:
+            Search results trimmed to the RAG context budget
+        """
+        return truncate_to_tokens(str(search_tool.run(search_query=question)), RAG_CONTEXT_TOKEN_BUDGET)
+    
+    def _prefetch(self, task: str, func: Callable, question: str, usage: Optional[RunUsage]) -> Future:
+        """Start one search on the shared executor, recording it as a tool call."""
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(question)
+            finally:
+                if usage is not None:
+                    usage.record("prefetch", task, {"tool_calls": 1, "wall_seconds": time.perf_counter() - started})
+        
+        return get_prefetch_executor().submit(timed)
+    
+    def prefetch_evidence(
+        self,
+        question: str,
+        usage: Optional[RunUsage] = None,
+        web: bool = True
+    ) -> Dict[str, Future]:
+        """
+        Start document retrieval and, optionally, web search concurrently.
+        
+        Args:
+            question: User's question
+            usage: Run the searches are recorded into as tool calls
+            web: Start the web search too; leave it out while a fast-path answer is still possible
+        
+        Returns:
+            Futures of the document and web evidence, keyed by "documents" and "web"
+        """
+        prefetched = {"documents": self._prefetch("prefetch:documents", self.retrieve_documents, question, usage)}
+        if web:
+            prefetched["web"] = self.prefetch_web(question, usage)
+        return prefetched
+    
+    def prefetch_web(self, question: str, usage: Optional[RunUsage] = None) -> Future:
+        """
+        Start the web search of a question.
+        
+        Args:
+            question: User's question
+            usage: Run the search is recorded into as a tool call
+        
+        Returns:
+            Future of the web evidence
+        """
+        return self._prefetch("prefetch:web", self.search_web, question, usage)
+    
+    def format_evidence(self, prefetched: Dict[str, Future]) -> str:
+        """
+        Wait for pre-fetched evidence and format it for the agent task.
+        
+        Args:
+            prefetched: Output of prefetch_evidence
+        
+        Returns:
+            Document and web evidence sections; a failed search is reported as unavailable
+        """
+        sections = []
+        for name, title in (("documents", "Course material excerpts"), ("web", "Web search results")):
+            try:
+                evidence = prefetched[name].result()
+                if name == "documents":
+                    evidence = evidence[0] if evidence and evidence[1].get("documents") else None
+                text = evidence or "No relevant results found."
+            except Exception as e:
+                logger.warning(f"Pre-fetching {name} evidence failed: {str(e)}")
+                text = "Not available; search yourself if needed."
+            sections.append(f"{title}:\n{text}")
+        return "\n\n".join(sections)
+    
+    def answer_from_documents(
+        self,
+        question: str,
+        emit: Optional[Emit] = None,
+        usage: Optional[RunUsage] = None,
+        retrieved: Optional[Future] = None
+    ) -> Optional[str]:
+        """
+        Answer a question with one LLM call over retrieved document chunks.
+        
+        Args:
+            question: User's question
+            emit: Optional callback receiving answer token events
+            usage: Run the token and call usage is recorded into
+            retrieved: Pre-fetched retrieve_documents result, retrieved here when None
+        
+        Returns:
+            The answer, or None when the documents look insufficient and the
+            question should go to the web-enhanced agent
         """
         try:
-            logger.info(f"Processing question: {question[:50]}...")
-            
-            # Create task
-            task = self.create_task(question)
-            
-            # Create crew
-            crew = Crew(
-                agents=[self.web_rag_agent],
-                tasks=[task],
-                process=Process.sequential,
-                verbose=True
-            )
-            
-            # Execute crew
-            result = crew.kickoff()
-            
-            logger.info("Question answered successfully")
-            
-            return {
-                "success": True,
-                "answer": result,
-                "question": question
-            }
-            
+            retrieved = retrieved.result() if retrieved is not None else self.retrieve_documents(question)
         except Exception as e:
-            logger.error(f"Error answering question: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "question": question
-            }
+            logger.error(f"Document retrieval failed, escalating to the web RAG agent: {str(e)}")
+            return None
+        if retrieved is None:
+            return None
+        
+        context, results = retrieved
+        if not results.get("documents"):
+            return None
+        
+        distances = [distance for distance in results.get("distances") or [] if distance is not None]
+        if distances and min(distances) > self.max_distance:
+            logger.info(f"Closest chunk at distance {min(distances):.2f}; escalating to the web RAG agent")
+            return None
+        
+        llm = get_llm(temperature=0.4, model=RAG_MODEL)
+        prompt = FAST_PATH_PROMPT.format(marker=INSUFFICIENT_MARKER, context=context, question=question)
+        
+        answer = ""
+        pending = True
+        with track_agent(usage, llm, "rag_fast_path", "answer") as task_usage:
+            config = {"callbacks": task_usage.callbacks}
+            # Streaming skips the LLM cache, so only stream when someone is listening
+            chunks = llm.stream(prompt, config=config) if emit else iter([llm.invoke(prompt, config=config)])
+            try:
+                for chunk in chunks:
+                    text = chunk.content or ""
+                    answer += text
+                    if not pending:
+                        if emit and text:
+                            emit({"type": "token", "text": text})
+                        continue
+                    
+                    # Hold tokens back until they cannot be the start of the insufficiency marker
+                    head = answer.lstrip()
+                    if head.startswith(INSUFFICIENT_MARKER):
+                        break
+                    if INSUFFICIENT_MARKER.startswith(head):
+                        continue
+                    pending = False
+                    if emit:
+                        emit({"type": "token", "text": head})
+            finally:
+                # Closing the stream on an early break frees its connection and request slot right away
+                if hasattr(chunks, "close"):
+                    chunks.close()
+        
+        answer = answer.strip()
+        if not answer or answer.startswith(INSUFFICIENT_MARKER):
+            logger.info("Documents do not cover the question; escalating to the web RAG agent")
+            return None
+        
+        return answer
+    
+    def answer_question(
+        self,
+        question: str,
+        emit: Optional[Emit] = None,
+        fast_path: Optional[bool] = None,
+        prefetch: Optional[bool] = None
+    ) -> Dict:
+        """
+        Answer a question using RAG and web search.
+        
+        Unless disabled, the question is first answered from the uploaded
+        documents in a single LLM call, and only goes through the web-enhanced
+        agent's tool loop when the documents are insufficient. With prefetch
+        on, document retrieval and web search start together as the question
+        arrives and the agent gets their results instead of calling its tools;
+        with the fast path on, the web search only starts once the question is
+        escalated.
+        
+        Args:
+            question: User's question
+            emit: Optional callback receiving stage and final-answer token events
+            fast_path: Try the single-call document answer first (defaults to the crew's setting)
+            prefetch: Pre-fetch document and web evidence (defaults to the crew's setting)
+        
+        Returns:
+            Dictionary with answer and metadata
+        """
+        with get_usage_tracker().track_run("rag") as usage:
+            try:
+                logger.info(f"Processing question: {question[:50]}...")
+                
+                if emit:
+                    emit({"type": "stage", "stage": "answering"})
+                
+                use_prefetch = self.prefetch if prefetch is None else prefetch
+                use_fast_path = self.fast_path if fast_path is None else fast_path
+                prefetched = self.prefetch_evidence(question, usage, web=not use_fast_path) if use_prefetch else None
+                
+                # Answer from the documents alone when they suffice
+                answer = None
+                if use_fast_path:
+                    answer = self.answer_from_documents(
+                        question, emit, usage, prefetched["documents"] if prefetched else None
+                    )
+                if answer is not None:
+                    logger.info("Question answered from documents")
+                    return {
+                        "success": True,
+                        "answer": answer,
+                        "question": question,
+                        "mode": "documents",
+                        "run_id": usage.run_id
+                    }
+                
+                # The web search only pays off now that the documents fell short
+                if prefetched is not None and "web" not in prefetched:
+                    prefetched["web"] = self.prefetch_web(question, usage)
+                
+                # The crew is shared between sessions, so each run streams from and counts the steps of its own agent
+                agent = create_web_rag_agent(self.vector_store)
+                task = self.create_task(question, self.format_evidence(prefetched) if prefetched else None, agent)
+                
+                # Execute crew
+                if emit and use_fast_path:
+                    emit({"type": "stage", "stage": "escalating"})
+                with usage.track(agent, "web_rag", "answer") as task_usage:
+                    crew = Crew(
+                        agents=[agent],
+                        tasks=[task],
+                        process=Process.sequential,
+                        verbose=True,
+                        step_callback=task_usage
+                    )
+                    with stream_final_answer(agent, emit):
+                        result = kickoff_with_fallback(crew)
+                    task_usage.record_output(result)
+                
+                logger.info("Question answered successfully")
+                
+                return {
+                    "success": True,
+                    "answer": result,
+                    "question": question,
+                    "mode": "agent",
+                    "run_id": usage.run_id
+                }
+                
+            except Exception as e:
+                logger.error(f"Error answering question: {str(e)}")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "question": question,
+                    "run_id": usage.run_id
+                }
+    
+    def stream_answer(self, question: str) -> Iterator[Dict]:
+        """
+        Answer a question, yielding stage changes and answer tokens as they arrive.
+        
+        Args:
+            question: User's question
+        
+        Yields:
+            Stage and token events, then a result event with the answer_question dictionary
+        """
+        return stream_events(lambda emit: self.answer_question(question, emit=emit))
@@ -1,41 +1,68 @@
 """Study plan generation crew."""
 
-from crewai import Crew, Task, Process
+from concurrent.futures import ThreadPoolExecutor
+from crewai import Agent, Crew, Task, Process
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import RESEARCH_MAX_TOPICS, RESEARCH_MAX_CONCURRENCY
 from src.agents.extraction_agent import create_extraction_agent
 from src.agents.research_agent import create_research_agent
 from src.agents.planning_agent import create_planning_agent
+from src.utils.condenser import get_condenser
+from src.utils.context_packer import count_tokens
+from src.utils.llm_pool import kickoff_with_fallback
+from src.utils.model_router import RunBudget, get_model_router
+from src.utils.research_topics import extract_key_topics, merge_resources
+from src.utils.schedule import build_schedule_skeleton, format_schedule_skeleton
+from src.utils.stage_cache import get_stage_cache
+from src.utils.streaming import Emit, stream_events, stream_final_answer
+from src.utils.usage_tracker import RunUsage, get_usage_tracker, track_agent
+
+
+# Bump when the extraction or research prompts change to invalidate cached stage outputs
+STAGE_PROMPT_VERSION = 1
 
 
 class StudyPlanCrew:
     """Crew for generating study plans from assignment details."""
     
-    def __init__(self):
-        """Initialize the study plan crew with agents."""
+    def __init__(
+        self,
+        max_topics: int = RESEARCH_MAX_TOPICS,
+        max_concurrency: int = RESEARCH_MAX_CONCURRENCY
+    ):
+        """
+        Initialize the study plan crew with agents.
+        
+        Args:
+            max_topics: Maximum key topics researched separately
+            max_concurrency: Maximum topics researched in parallel
+        """
         self.extraction_agent = create_extraction_agent()
         self.research_agent = create_research_agent()
         self.planning_agent = create_planning_agent()
+        self.max_topics = max_topics
+        self.max_concurrency = max_concurrency
+        self.stage_cache = get_stage_cache()
+        self.router = get_model_router()
         
         logger.info("Initialized StudyPlanCrew")
     
-    def create_tasks(self, assignment_text: str, deadline: str, current_date: str) -> list:
+    def create_extraction_task(self, assignment_text: str, agent: Optional[Agent] = None) -> Task:
         """
-        Create tasks for the study plan workflow.
+        Create the task that extracts assignment details.
         
         Args:
             assignment_text: The assignment content
-            deadline: The deadline date/time
-            current_date: Current date
-            
+            agent: Extraction agent running the task (defaults to the crew's)
+        
         Returns:
-            List of Task objects
+            Task object
         """
-        # Task 1: Extract assignment details
-        extraction_task = Task(
+        return Task(
             description=(
                 f"Analyze the following assignment text and extract key information:\n\n"
                 f"{assignment_text}\n\n"
@@ -46,79 +73,247 @@ class StudyPlanCrew:
                 f"4. Learning objectives\n"
                 f"5. Key topics or areas to study\n"
                 f"6. Any specific instructions or constraints\n\n"
-                f"Present the information in a clear, organized format."
+                f"Present the information in a clear, organized format. List the key topics under a "
+                f"'Key Topics' heading, one short topic name per bullet."
             ),
             expected_output=(
                 "A structured summary containing: assignment topic, course name, requirements, "
-                "deliverables, learning objectives, key topics to study, and any special instructions."
+                "deliverables, learning objectives, a 'Key Topics' bullet list, and any special instructions."
             ),
-            agent=self.extraction_agent
+            agent=agent or self.extraction_agent
         )
+    
+    def create_research_task(self, topic: str, assignment_details: str, agent: Agent) -> Task:
+        """
+        Create a research task for one key topic.
         
-        # Task 2: Research resources
-        research_task = Task(
+        Args:
+            topic: Key topic to research
+            assignment_details: Output of the extraction task
+            agent: Research agent running the task
+        
+        Returns:
+            Task object
+        """
+        return Task(
             description=(
-                "Based on the extracted assignment details, conduct comprehensive web research to find:\n"
-                "1. High-quality tutorials and learning resources\n"
-                "2. Video courses or lecture series\n"
-                "3. Documentation and reference materials\n"
-                "4. Practice exercises and examples\n"
-                "5. Community resources (forums, study groups)\n"
-                "6. Books or articles (if relevant)\n\n"
-                "Focus on resources that are:\n"
-                "- Credible and from reputable sources\n"
-                "- Suitable for the topic and skill level\n"
-                "- Free or accessible to students\n"
-                "- Current and up-to-date\n\n"
-                "Organize resources by category and provide brief descriptions with URLs."
+                f"Find learning resources for this topic of an assignment: {topic}\n\n"
+                f"Assignment details for context:\n{assignment_details}\n\n"
+                f"Search the web for:\n"
+                f"1. High-quality tutorials and learning resources\n"
+                f"2. Video courses or lecture series\n"
+                f"3. Documentation and reference materials\n"
+                f"4. Practice exercises and examples\n"
+                f"5. Community resources (forums, study groups)\n"
+                f"6. Books or articles (if relevant)\n\n"
+                f"Focus on resources that are:\n"
+                f"- Credible and from reputable sources\n"
+                f"- Suitable for the topic and skill level\n"
+                f"- Free or accessible to students\n"
+                f"- Current and up-to-date\n\n"
+                f"Only cover '{topic}'; other topics are researched separately. "
+                f"Give one resource per bullet with its title, URL and a brief description."
             ),
             expected_output=(
-                "A categorized list of learning resources with titles, descriptions, URLs, "
-                "and recommendations for which resources are most essential."
+                f"A list of learning resources for {topic} with titles, URLs, descriptions, "
+                f"and which resources are most essential."
             ),
-            agent=self.research_agent,
-            context=[extraction_task]
+            agent=agent
         )
+    
+    def create_planning_task(
+        self,
+        assignment_details: str,
+        resources: str,
+        schedule: str,
+        agent: Optional[Agent] = None
+    ) -> Task:
+        """
+        Create the task that writes the study plan.
+        
+        Args:
+            assignment_details: Output of the extraction task
+            resources: Merged research resources
+            schedule: Formatted schedule skeleton
+            agent: Planning agent running the task (defaults to the crew's)
         
-        # Task 3: Create study plan
-        planning_task = Task(
+        Returns:
+            Task object
+        """
+        return Task(
             description=(
-                f"Create a detailed, personalized study plan with the following information:\n\n"
-                f"Current Date: {current_date}\n"
-                f"Deadline: {deadline}\n\n"
-                f"Using the assignment details and research resources, create a comprehensive study plan that:\n\n"
-                f"1. Calculates the exact number of days available until the deadline\n"
-                f"2. Breaks down the study period into weekly phases\n"
-                f"3. For each week, specify:\n"
-                f"   - Learning objectives and topics to cover\n"
-                f"   - Specific tasks and activities\n"
-                f"   - Recommended resources from the research\n"
-                f"   - Estimated time commitment (hours per day/week)\n"
-                f"   - Milestones or checkpoints\n"
-                f"4. Includes buffer time for review and assignment completion\n"
-                f"5. Provides practical tips for staying on track\n\n"
+                f"Create a detailed, personalized study plan.\n\n"
+                f"Schedule (already computed; use these dates and hours as given, do not recalculate):\n"
+                f"{schedule}\n\n"
+                f"Assignment details:\n{assignment_details}\n\n"
+                f"Research resources:\n{resources}\n\n"
+                f"For each week of the schedule, specify:\n"
+                f"- Learning objectives and topics to cover\n"
+                f"- Specific tasks and activities\n"
+                f"- Recommended resources from the research\n"
+                f"- Milestones or checkpoints\n"
+                f"Use the buffer period for review and assignment completion, and add practical tips "
+                f"for staying on track.\n\n"
                 f"Make the plan realistic, actionable, and motivating. Use a clear, easy-to-follow format "
                 f"with emojis for visual organization."
             ),
             expected_output=(
-                "A comprehensive study plan formatted with:\n"
-                "- Executive summary (days remaining, total hours needed)\n"
-                "- Weekly breakdown with specific objectives, tasks, resources, and time allocations\n"
-                "- Milestones and checkpoints\n"
+                "A study plan formatted with:\n"
+                "- Executive summary restating the schedule's days and hours\n"
+                "- One section per scheduled week with objectives, tasks, resources, and milestones\n"
+                "- Buffer period activities\n"
                 "- Success tips and motivational guidance\n"
                 "Use markdown formatting with headers, lists, and emojis for readability."
             ),
-            agent=self.planning_agent,
-            context=[extraction_task, research_task]
+            agent=agent or self.planning_agent
         )
+    
+    def extract(
+        self,
+        assignment_text: str,
+        budget: Optional[RunBudget] = None,
+        usage: Optional[RunUsage] = None
+    ) -> str:
+        """
+        Extract assignment details, reusing a cached extraction of the same text.
+        
+        Args:
+            assignment_text: The assignment content
+            budget: Latency/cost budget of the run, used for model routing
+            usage: Run the token and call usage is recorded into
+        
+        Returns:
+            Extracted assignment details
+        """
+        # Route on the size the agent will see; oversized inputs are condensed into a bounded brief
+        condenser = get_condenser()
+        input_tokens = count_tokens(assignment_text)
+        if input_tokens > condenser.threshold_tokens:
+            input_tokens = condenser.brief_tokens
+        model = self.router.route("extraction", input_tokens, budget=budget)
+        
+        cache_key = None
+        if self.stage_cache is not None:
+            cache_key = self.stage_cache.make_key(assignment_text, model, STAGE_PROMPT_VERSION)
+            cached = self.stage_cache.get("extraction", cache_key)
+            if cached is not None:
+                return cached["details"]
+        
+        assignment_text = condenser.condense(assignment_text)
         
-        return [extraction_task, research_task, planning_task]
+        # Each run gets its own agent so concurrent runs do not share its step callback
+        agent = create_extraction_agent(model)
+        
+        with track_agent(usage, agent, "extraction", "extraction") as task_usage:
+            crew = Crew(
+                agents=[agent],
+                tasks=[self.create_extraction_task(assignment_text, agent)],
+                process=Process.sequential,
+                verbose=True,
+                step_callback=task_usage
+            )
+            output = kickoff_with_fallback(crew)
+            task_usage.record_output(output)
+            assignment_details = str(output)
+        
+        if cache_key is not None:
+            self.stage_cache.put("extraction", cache_key, {
+                "details": assignment_details,
+                "topics": extract_key_topics(assignment_details, self.max_topics)
+            })
+        
+        return assignment_details
+    
+    def _research_topic(
+        self,
+        topic: str,
+        assignment_details: str,
+        agent: Agent,
+        usage: Optional[RunUsage] = None
+    ) -> str:
+        """Run the research task of one topic in its own crew."""
+        with track_agent(usage, agent, "research", f"research:{topic}") as task_usage:
+            crew = Crew(
+                agents=[agent],
+                tasks=[self.create_research_task(topic, assignment_details, agent)],
+                process=Process.sequential,
+                verbose=False,
+                step_callback=task_usage
+            )
+            output = kickoff_with_fallback(crew)
+            task_usage.record_output(output)
+            return str(output)
+    
+    def research(
+        self,
+        assignment_details: str,
+        budget: Optional[RunBudget] = None,
+        usage: Optional[RunUsage] = None
+    ) -> str:
+        """
+        Research every key topic concurrently and merge the resource lists.
+        
+        Results are cached by the extracted details, so re-planning the same
+        assignment skips research until the research TTL expires.
+        
+        Args:
+            assignment_details: Output of the extraction task
+            budget: Latency/cost budget of the run, used for model routing
+            usage: Run the token and call usage is recorded into
+        
+        Returns:
+            Deduplicated resources grouped by topic
+        """
+        topics = extract_key_topics(assignment_details, self.max_topics) or ["the assignment topic"]
+        model = self.router.route(
+            "research", count_tokens(assignment_details), budget=budget, calls=len(topics)
+        )
+        
+        cache_key = None
+        if self.stage_cache is not None:
+            cache_key = self.stage_cache.make_key(assignment_details, model, STAGE_PROMPT_VERSION, self.max_topics)
+            cached = self.stage_cache.get("research", cache_key)
+            if cached is not None:
+                return cached["resources"]
+        
+        logger.info(f"Researching {len(topics)} topics with up to {self.max_concurrency} in parallel")
+        
+        # Each subtask gets its own agent; crewai agents keep per-run executor state and step callbacks
+        agents = [create_research_agent(model) for _ in topics]
+        
+        results: Dict[str, str] = {}
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.max_concurrency, len(topics))),
+            thread_name_prefix="topic-research"
+        ) as executor:
+            futures = {
+                topic: executor.submit(self._research_topic, topic, assignment_details, agent, usage)
+                for topic, agent in zip(topics, agents)
+            }
+            for topic, future in futures.items():
+                try:
+                    results[topic] = future.result()
+                except Exception as e:
+                    logger.error(f"Research failed for topic '{topic}': {str(e)}")
+        
+        if not results:
+            raise RuntimeError("Research failed for every topic")
+        
+        resources = merge_resources(results)
+        
+        # Partial results are not cached so failed topics are retried next time
+        if cache_key is not None and len(results) == len(topics):
+            self.stage_cache.put("research", cache_key, {"topics": results, "resources": resources})
+        
+        return resources
     
     def generate_study_plan(
         self, 
         assignment_text: str, 
         deadline: datetime,
-        current_date: Optional[datetime] = None
+        current_date: Optional[datetime] = None,
+        emit: Optional[Emit] = None,
+        budget: Optional[RunBudget] = None
     ) -> Dict:
         """
         Generate a complete study plan.
@@ -127,13 +322,30 @@ class StudyPlanCrew:
             assignment_text: The assignment content
             deadline: The deadline datetime
             current_date: Current datetime (defaults to now)
-            
+            emit: Optional callback receiving stage and final-answer token events
+            budget: Latency/cost budget for model routing (defaults to the configured one)
+        
         Returns:
             Dictionary with study plan and metadata
         """
+        with get_usage_tracker().track_run("study_plan") as usage:
+            result = self._generate_study_plan(assignment_text, deadline, current_date, emit, budget, usage)
+        return {**result, "run_id": usage.run_id}
+    
+    def _generate_study_plan(
+        self,
+        assignment_text: str,
+        deadline: datetime,
+        current_date: Optional[datetime],
+        emit: Optional[Emit],
+        budget: Optional[RunBudget],
+        usage: RunUsage
+    ) -> Dict:
+        """Run the stages of generate_study_plan within a tracked run."""
         try:
             if current_date is None:
                 current_date = datetime.now()
+            budget = budget or RunBudget()
             
             # Format dates
             deadline_str = deadline.strftime("%B %d, %Y at %I:%M %p")
@@ -141,19 +353,35 @@ class StudyPlanCrew:
             
             logger.info(f"Generating study plan from {current_str} to {deadline_str}")
             
-            # Create tasks
-            tasks = self.create_tasks(assignment_text, deadline_str, current_str)
+            # Extract assignment details
+            if emit:
+                emit({"type": "stage", "stage": "extracting"})
+            assignment_details = self.extract(assignment_text, budget, usage)
             
-            # Create crew
-            crew = Crew(
-                agents=[self.extraction_agent, self.research_agent, self.planning_agent],
-                tasks=tasks,
-                process=Process.sequential,
-                verbose=True
-            )
+            # Research key topics in parallel
+            if emit:
+                emit({"type": "stage", "stage": "researching"})
+            resources = self.research(assignment_details, budget, usage)
             
-            # Execute crew
-            result = crew.kickoff()
+            # Create study plan
+            if emit:
+                emit({"type": "stage", "stage": "planning"})
+            skeleton = build_schedule_skeleton(current_date, deadline)
+            # The crew is shared between sessions, so each run streams from its own agent and LLM
+            planning_agent = create_planning_agent()
+            with track_agent(usage, planning_agent, "planning", "planning") as task_usage:
+                planning_crew = Crew(
+                    agents=[planning_agent],
+                    tasks=[self.create_planning_task(
+                        assignment_details, resources, format_schedule_skeleton(skeleton), planning_agent
+                    )],
+                    process=Process.sequential,
+                    verbose=True,
+                    step_callback=task_usage
+                )
+                with stream_final_answer(planning_agent, emit):
+                    result = kickoff_with_fallback(planning_crew)
+                task_usage.record_output(result)
             
             logger.info("Study plan generation completed successfully")
             
@@ -161,6 +389,7 @@ class StudyPlanCrew:
                 "success": True,
                 "study_plan": result,
                 "deadline": deadline_str,
+                "schedule": skeleton,
                 "generated_at": current_date.isoformat()
             }
             
@@ -170,3 +399,24 @@ class StudyPlanCrew:
                 "success": False,
                 "error": str(e)
             }
+    
+    def stream_study_plan(
+        self,
+        assignment_text: str,
+        deadline: datetime,
+        current_date: Optional[datetime] = None
+    ) -> Iterator[Dict]:
+        """
+        Generate a study plan, yielding stage changes and plan tokens as they arrive.
+        
+        Args:
+            assignment_text: The assignment content
+            deadline: The deadline datetime
+            current_date: Current datetime (defaults to now)
+        
+        Yields:
+            Stage and token events, then a result event with the generate_study_plan dictionary
+        """
+        return stream_events(
+            lambda emit: self.generate_study_plan(assignment_text, deadline, current_date, emit=emit)
+        )
@@ -1,12 +1,22 @@
 """RAG tool for document retrieval and question answering."""
 
 from crewai.tools import BaseTool
-from typing import Type, Optional
+from typing import Dict, Optional, Tuple, Type
 from pydantic import BaseModel, Field
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from src.utils.vector_store import VectorStore
+from config.settings import (
+    RAG_N_RESULTS,
+    RAG_CONTEXT_TOKEN_BUDGET,
+    RERANK_ENABLED,
+    RERANK_FETCH_K,
+    SUMMARY_INDEX_ENABLED
+)
+from src.utils.vector_store import BaseVectorStore, create_vector_store
+from src.utils.context_packer import pack_context
+from src.utils.reranker import get_reranker
+from src.utils.summary_index import SummaryIndex, get_summary_index, is_overview_question
 
 
 class RAGQueryInput(BaseModel):
@@ -24,12 +34,62 @@ class RAGTool(BaseTool):
         "Provide a clear question or query as input."
     )
     args_schema: Type[BaseModel] = RAGQueryInput
-    vector_store: Optional[VectorStore] = None
+    vector_store: Optional[BaseVectorStore] = None
+    summary_index: Optional[SummaryIndex] = None
     
-    def __init__(self, vector_store: Optional[VectorStore] = None):
-        """Initialize RAG tool with vector store."""
+    def __init__(
+        self,
+        vector_store: Optional[BaseVectorStore] = None,
+        summary_index: Optional[SummaryIndex] = None
+    ):
+        """Initialize RAG tool with vector store and optional summary index."""
         super().__init__()
-        self.vector_store = vector_store or VectorStore()
+        self.vector_store = vector_store or create_vector_store()
+        if summary_index is None and SUMMARY_INDEX_ENABLED:
+            summary_index = get_summary_index()
+        self.summary_index = summary_index
+        if RERANK_ENABLED:
+            # Start loading the cross-encoder before the first query
+            get_reranker()
+    
+    def retrieve(self, query: str) -> Tuple[str, Dict]:
+        """
+        Retrieve and pack the passages relevant to a query.
+        
+        Args:
+            query: The search query
+        
+        Returns:
+            Tuple of the packed passages with citations and the raw results
+            (documents, metadatas and, for chunk results, distances)
+        """
+        # Answer overview questions from the summary level when summaries exist
+        if self.summary_index is not None and is_overview_question(query):
+            results = self._query_summaries(query)
+            if results["documents"]:
+                result_text, stats = pack_context(results, token_budget=RAG_CONTEXT_TOKEN_BUDGET)
+                logger.info(
+                    f"RAG tool answered from {stats['spans']} summaries "
+                    f"({stats['tokens']} tokens) for query: {query[:50]}..."
+                )
+                return result_text, results
+        
+        # Query vector store, reranking a larger candidate set when enabled
+        if RERANK_ENABLED:
+            results = self.vector_store.query(query, n_results=max(RERANK_FETCH_K, RAG_N_RESULTS))
+            results = get_reranker().rerank(query, results, top_n=RAG_N_RESULTS)
+        else:
+            results = self.vector_store.query(query, n_results=RAG_N_RESULTS)
+        
+        # Merge overlapping chunks and pack them within the token budget
+        result_text, stats = pack_context(results, token_budget=RAG_CONTEXT_TOKEN_BUDGET)
+        
+        logger.info(
+            f"RAG tool packed {stats['chunks']} results into {stats['spans']} spans "
+            f"({stats['tokens']} tokens) for query: {query[:50]}..."
+        )
+        
+        return result_text, results
     
     def _run(self, query: str) -> str:
         """
@@ -37,9 +97,9 @@ class RAGTool(BaseTool):
         
         Args:
             query: The search query
-            
+        
         Returns:
-            Relevant text chunks from the documents
+            Relevant document passages with file and page citations
         """
         try:
             # Check if vector store has documents
@@ -48,41 +108,34 @@ class RAGTool(BaseTool):
             if doc_count == 0:
                 return "No documents have been uploaded yet. Please upload course materials first."
             
-            # Query vector store
-            results = self.vector_store.query(query, n_results=5)
-            
-            # Format results with source information
-            formatted_results = []
-            for i, (doc, metadata, distance) in enumerate(
-                zip(results["documents"], results["metadatas"], results["distances"]), 
-                start=1
-            ):
-                page_info = f"Page {metadata.get('page_number', 'Unknown')}" if metadata.get('page_number') else "Unknown page"
-                file_info = metadata.get('file_name', 'Unknown file')
-                
-                formatted_results.append(
-                    f"[Result {i}] ({file_info}, {page_info}):\n{doc}\n"
-                )
-            
-            result_text = "\n---\n".join(formatted_results)
-            
-            logger.info(f"RAG tool retrieved {len(results['documents'])} results for query: {query[:50]}...")
-            
+            result_text, _ = self.retrieve(query)
             return result_text
             
         except Exception as e:
             error_msg = f"Error retrieving documents: {str(e)}"
             logger.error(error_msg)
             return error_msg
+    
+    def _query_summaries(self, query: str) -> dict:
+        """Find the documents relevant to a query and return their summaries."""
+        query_embedding = self.vector_store.embedding_manager.get_embedding(query)
+        hits = self.vector_store.query_by_embedding(query_embedding, n_results=RAG_N_RESULTS, hydrate=False)
+        doc_ids = [metadata["doc_id"] for metadata in hits["metadatas"] if metadata and metadata.get("doc_id")]
+        
+        # The summary collection may be embedded with another model, e.g. during a migration
+        summary_embeddings = self.summary_index.store.embedding_manager
+        if summary_embeddings.model != self.vector_store.embedding_model:
+            query_embedding = summary_embeddings.get_embedding(query)
+        return self.summary_index.query_by_embedding(query_embedding, doc_ids, n_results=RAG_N_RESULTS)
 
 
-def get_rag_tool(vector_store: Optional[VectorStore] = None) -> RAGTool:
+def get_rag_tool(vector_store: Optional[BaseVectorStore] = None) -> RAGTool:
     """
     Get configured RAG tool instance.
     
     Args:
         vector_store: Optional VectorStore instance
-        
+    
     Returns:
         RAGTool instance
     """
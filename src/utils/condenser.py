@@ -0,0 +1,177 @@
+"""Map-reduce condensation of oversized assignment texts."""
+
+import re
+import threading
+from typing import List, Optional
+from langchain_openai import ChatOpenAI
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    CONDENSE_MODEL,
+    CONDENSE_THRESHOLD_TOKENS,
+    CONDENSE_CHUNK_TOKENS,
+    CONDENSE_BRIEF_TOKENS,
+    CONDENSE_MAX_CONCURRENCY
+)
+from src.utils.context_packer import count_tokens, truncate_to_tokens
+from src.utils.llm_pool import get_llm
+
+
+MAP_PROMPT = (
+    "This is part {part} of {parts} of an assignment and its course materials. "
+    "Condense it to at most {words} words. Keep every requirement, deliverable, deadline, grading criterion, "
+    "learning objective, constraint and key topic verbatim where possible; drop examples and filler.\n\n{text}"
+)
+
+REDUCE_PROMPT = (
+    "Merge these condensed parts of an assignment into one brief of at most {words} words. "
+    "Keep every requirement, deliverable, deadline, grading criterion, learning objective, constraint and "
+    "key topic, and remove duplicates.\n\n{text}"
+)
+
+# Rough words-per-token ratio used to phrase length limits in prompts
+WORDS_PER_TOKEN = 0.75
+
+MAX_REDUCE_LEVELS = 4
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split a text into parts of at most max_tokens tokens on paragraph boundaries.
+    
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per part
+    
+    Returns:
+        List of parts
+    """
+    parts: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count_tokens(paragraph)
+        
+        # Hard-split paragraphs that alone exceed a part
+        while tokens > max_tokens:
+            head = truncate_to_tokens(paragraph, max_tokens)
+            if current:
+                parts.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            parts.append(head)
+            paragraph = paragraph[len(head):].strip()
+            tokens = count_tokens(paragraph)
+        
+        if current and current_tokens + tokens > max_tokens:
+            parts.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        if paragraph:
+            current.append(paragraph)
+            current_tokens += tokens
+    
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+class AssignmentCondenser:
+    """
+    Condense assignment texts above a token threshold into a bounded brief.
+    
+    Oversized texts are split into parts summarized concurrently with a cheap
+    model (map), then the summaries are merged level by level until they fit
+    in the brief budget (reduce). Texts under the threshold pass through.
+    """
+    
+    def __init__(
+        self,
+        llm: Optional[ChatOpenAI] = None,
+        threshold_tokens: int = CONDENSE_THRESHOLD_TOKENS,
+        chunk_tokens: int = CONDENSE_CHUNK_TOKENS,
+        brief_tokens: int = CONDENSE_BRIEF_TOKENS,
+        max_concurrency: int = CONDENSE_MAX_CONCURRENCY
+    ):
+        """
+        Initialize the condenser.
+        
+        Args:
+            llm: Optional chat model used for condensation
+            threshold_tokens: Texts longer than this are condensed
+            chunk_tokens: Maximum tokens per map part
+            brief_tokens: Maximum tokens of the final brief
+            max_concurrency: Maximum parallel summarization requests
+        """
+        self.llm = llm or get_llm(temperature=0, model=CONDENSE_MODEL)
+        self.threshold_tokens = threshold_tokens
+        self.chunk_tokens = chunk_tokens
+        self.brief_tokens = brief_tokens
+        self.max_concurrency = max_concurrency
+    
+    def _summarize(self, prompts: List[str]) -> List[str]:
+        """Run summarization prompts concurrently."""
+        responses = self.llm.batch(prompts, config={"max_concurrency": self.max_concurrency})
+        return [response.content.strip() for response in responses]
+    
+    def condense(self, text: str) -> str:
+        """
+        Condense a text if it exceeds the threshold.
+        
+        Args:
+            text: Assignment text
+        
+        Returns:
+            The text itself, or a brief of at most brief_tokens tokens
+        """
+        tokens = count_tokens(text)
+        if tokens <= self.threshold_tokens:
+            return text
+        
+        try:
+            parts = split_text(text, self.chunk_tokens)
+            
+            # Map: each part gets an equal share of the brief, with a floor so small details survive
+            words = max(int(self.brief_tokens * WORDS_PER_TOKEN / len(parts)), 150)
+            summaries = self._summarize([
+                MAP_PROMPT.format(part=i + 1, parts=len(parts), words=words, text=part)
+                for i, part in enumerate(parts)
+            ])
+            
+            # Reduce: merge groups of summaries until one brief remains
+            levels = 0
+            while len(summaries) > 1 and levels < MAX_REDUCE_LEVELS:
+                levels += 1
+                groups = split_text("\n\n".join(summaries), self.chunk_tokens)
+                brief_words = int(self.brief_tokens * WORDS_PER_TOKEN / len(groups))
+                summaries = self._summarize([
+                    REDUCE_PROMPT.format(words=brief_words, text=group) for group in groups
+                ])
+            
+            brief = truncate_to_tokens("\n\n".join(summaries), self.brief_tokens)
+            
+            logger.info(
+                f"Condensed assignment text from {tokens} to {count_tokens(brief)} tokens "
+                f"({len(parts)} parts, {levels} reduce levels)"
+            )
+            return brief
+            
+        except Exception as e:
+            logger.error(f"Error condensing assignment text: {str(e)}")
+            raise
+
+
+_condenser: Optional[AssignmentCondenser] = None
+_condenser_lock = threading.Lock()
+
+
+def get_condenser() -> AssignmentCondenser:
+    """Get the process-wide assignment condenser."""
+    global _condenser
+    with _condenser_lock:
+        if _condenser is None:
+            _condenser = AssignmentCondenser()
+        return _condenser
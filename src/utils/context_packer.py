@@ -0,0 +1,185 @@
+"""Token-budgeted packing of retrieved chunks into tool context."""
+
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import OPENAI_MODEL, RAG_CONTEXT_TOKEN_BUDGET
+
+MIN_TRUNCATED_SPAN_TOKENS = 32
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer for the configured model, or None if unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(OPENAI_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Tokenizer unavailable, estimating tokens from characters: {str(e)}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text for the configured model.
+    
+    Args:
+        text: Text to count
+    
+    Returns:
+        Number of tokens (estimated at 4 characters per token without tiktoken)
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text down to at most max_tokens tokens.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum number of tokens
+    
+    Returns:
+        Truncated text
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+
+
+def format_result(index: int, text: str, metadata: Dict) -> str:
+    """Format one context span with its file and page citation."""
+    page_info = f"Page {metadata.get('page_number', 'Unknown')}" if metadata.get('page_number') else "Unknown page"
+    if metadata.get("level") == "document":
+        page_info = "Document summary"
+    elif metadata.get("level") == "page":
+        page_info = f"{page_info} summary"
+    file_info = metadata.get('file_name', 'Unknown file')
+    return f"[Result {index}] ({file_info}, {page_info}):\n{text}\n"
+
+
+def merge_spans(documents: List[str], metadatas: List[Dict]) -> List[Dict]:
+    """
+    Merge adjacent or overlapping chunks of the same page into single spans.
+    
+    Chunks carrying 'start_index'/'end_index' offsets are stitched together
+    without repeating their overlap. Chunks without offsets are kept as they
+    are, and spans with identical text are dropped after the first.
+    
+    Args:
+        documents: Chunk texts in relevance order
+        metadatas: Chunk metadata in relevance order
+    
+    Returns:
+        List of spans with 'text', 'metadata' and 'rank' (best member's position), in relevance order
+    """
+    groups: Dict[Tuple, List[Dict]] = {}
+    spans = []
+    
+    for rank, (text, metadata) in enumerate(zip(documents, metadatas)):
+        metadata = metadata or {}
+        if not text:
+            continue
+        if "start_index" not in metadata or "end_index" not in metadata:
+            spans.append({"text": text, "metadata": metadata, "rank": rank})
+            continue
+        
+        key = (
+            metadata.get("doc_id") or metadata.get("file_name") or metadata.get("source"),
+            metadata.get("page_number")
+        )
+        groups.setdefault(key, []).append({
+            "text": text,
+            "metadata": metadata,
+            "rank": rank,
+            "start": metadata["start_index"],
+            "end": metadata["end_index"]
+        })
+    
+    for members in groups.values():
+        members.sort(key=lambda member: member["start"])
+        current = dict(members[0])
+        for member in members[1:]:
+            if member["start"] <= current["end"]:
+                if member["end"] > current["end"]:
+                    current["text"] += member["text"][current["end"] - member["start"]:]
+                    current["end"] = member["end"]
+                current["rank"] = min(current["rank"], member["rank"])
+            else:
+                spans.append(current)
+                current = dict(member)
+        spans.append(current)
+    
+    spans.sort(key=lambda span: span["rank"])
+    
+    unique, seen = [], set()
+    for span in spans:
+        normalized = " ".join(span["text"].split())
+        if normalized in seen:
+            continue
+        seen.add(normalized)
+        unique.append(span)
+    return unique
+
+
+def pack_context(
+    results: Dict,
+    token_budget: Optional[int] = None,
+    separator: str = "\n---\n"
+) -> Tuple[str, Dict]:
+    """
+    Build tool context from query results within a token budget.
+    
+    Args:
+        results: Dictionary with documents and metadatas in relevance order
+        token_budget: Maximum tokens of the packed context (defaults to RAG_CONTEXT_TOKEN_BUDGET)
+        separator: Text placed between spans
+    
+    Returns:
+        Tuple of the packed context and statistics (chunks, spans, tokens, truncated)
+    """
+    budget = RAG_CONTEXT_TOKEN_BUDGET if token_budget is None else token_budget
+    documents = results.get("documents") or []
+    spans = merge_spans(documents, results.get("metadatas") or [{}] * len(documents))
+    separator_tokens = count_tokens(separator)
+    
+    parts, used, truncated = [], 0, False
+    for span in spans:
+        entry = format_result(len(parts) + 1, span["text"], span["metadata"])
+        cost = count_tokens(entry) + (separator_tokens if parts else 0)
+        
+        if used + cost > budget:
+            # Fill what is left of the budget with the head of the next span,
+            # unless only a fragment would fit
+            header_cost = count_tokens(format_result(len(parts) + 1, "", span["metadata"]))
+            remaining = budget - used - header_cost - (separator_tokens if parts else 0)
+            if remaining >= MIN_TRUNCATED_SPAN_TOKENS:
+                entry = format_result(len(parts) + 1, truncate_to_tokens(span["text"], remaining), span["metadata"])
+                used += count_tokens(entry) + (separator_tokens if parts else 0)
+                parts.append(entry)
+            truncated = True
+            break
+        
+        parts.append(entry)
+        used += cost
+    
+    stats = {
+        "chunks": len(documents),
+        "spans": len(parts),
+        "tokens": used,
+        "truncated": truncated
+    }
+    return separator.join(parts), stats
@@ -0,0 +1,379 @@
+"""Document registry and compressed page store shared by all chunks of a document."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Dict, Optional, Set, Tuple
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import CHROMA_PERSIST_DIR
+
+
+class DocumentRegistry:
+    """
+    Store per-document metadata and page text once, outside the vector index.
+    
+    Chunks only carry 'doc_id', 'page_number' and character offsets; file-level
+    metadata and (optionally) chunk text are resolved from here for the final
+    results of a query. Stores holding chunks register as reference sources, and
+    a document is pruned once none of them references it any more.
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, page_cache_size: int = 256):
+        """
+        Initialize the registry database.
+        
+        Args:
+            db_path: SQLite file path (defaults to documents.sqlite3 in CHROMA_PERSIST_DIR)
+            page_cache_size: Number of decompressed pages kept in memory
+        """
+        self.db_path = db_path or str(Path(CHROMA_PERSIST_DIR) / "documents.sqlite3")
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self.page_cache_size = page_cache_size
+        self._page_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._doc_cache: Dict[str, Dict] = {}
+        self._cache_lock = threading.Lock()
+        self._reference_sources = weakref.WeakSet()
+        
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "doc_id TEXT PRIMARY KEY, metadata TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "doc_id TEXT NOT NULL, page_number INTEGER NOT NULL, text BLOB NOT NULL, "
+                "PRIMARY KEY (doc_id, page_number))"
+            )
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection and commit on success."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def make_doc_id(metadata: Dict, pages: List[Dict]) -> str:
+        """
+        Derive a stable document id from its name and content.
+        
+        Args:
+            metadata: Document-level metadata
+            pages: List of page dictionaries with 'page_number' and 'text'
+        
+        Returns:
+            16-character hex document id
+        """
+        digest = hashlib.md5()
+        digest.update(str(metadata.get("file_name") or metadata.get("source") or "").encode("utf-8"))
+        for page in pages:
+            digest.update(f"|{page.get('page_number')}|".encode("utf-8"))
+            digest.update(page.get("text", "").encode("utf-8"))
+        return digest.hexdigest()[:16]
+    
+    def register_document(self, metadata: Dict, pages: List[Dict]) -> str:
+        """
+        Store a document's metadata and compressed pages if not already present.
+        
+        Args:
+            metadata: Document-level metadata
+            pages: List of page dictionaries with 'page_number' and 'text'
+        
+        Returns:
+            Document id
+        """
+        doc_id = self.make_doc_id(metadata, pages)
+        
+        # Re-registering refreshes created_at so pruning leaves documents being ingested alone
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO documents (doc_id, metadata, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(doc_id) DO UPDATE SET created_at = excluded.created_at",
+                (doc_id, json.dumps(metadata), time.time())
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO pages (doc_id, page_number, text) VALUES (?, ?, ?)",
+                [
+                    (doc_id, int(page.get("page_number") or 0), zlib.compress(page.get("text", "").encode("utf-8")))
+                    for page in pages
+                ]
+            )
+        
+        logger.info(f"Registered document {doc_id} ({metadata.get('file_name', 'unnamed')}, {len(pages)} pages)")
+        return doc_id
+    
+    def get_documents(self, doc_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch metadata for several documents in one query.
+        
+        Args:
+            doc_ids: Document ids
+        
+        Returns:
+            Mapping of document id to metadata
+        """
+        with self._cache_lock:
+            found = {doc_id: self._doc_cache[doc_id] for doc_id in doc_ids if doc_id in self._doc_cache}
+        missing = list(set(doc_ids) - set(found))
+        if not missing:
+            return found
+        
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT doc_id, metadata FROM documents WHERE doc_id IN ({','.join('?' * len(missing))})",
+                missing
+            ).fetchall()
+        
+        # Document metadata never changes once registered, so it is cached indefinitely
+        with self._cache_lock:
+            for doc_id, metadata in rows:
+                found[doc_id] = self._doc_cache[doc_id] = json.loads(metadata)
+        return found
+    
+    def get_page_text(self, doc_id: str, page_number: int) -> str:
+        """
+        Get the decompressed text of a page.
+        
+        Args:
+            doc_id: Document id
+            page_number: Page number
+        
+        Returns:
+            Page text ('' if unknown)
+        """
+        key = (doc_id, int(page_number or 0))
+        with self._cache_lock:
+            if key in self._page_cache:
+                self._page_cache.move_to_end(key)
+                return self._page_cache[key]
+        
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text FROM pages WHERE doc_id = ? AND page_number = ?",
+                key
+            ).fetchone()
+        text = zlib.decompress(row[0]).decode("utf-8") if row else ""
+        
+        with self._cache_lock:
+            self._page_cache[key] = text
+            if len(self._page_cache) > self.page_cache_size:
+                self._page_cache.popitem(last=False)
+        return text
+    
+    def get_chunk_text(self, metadata: Dict) -> str:
+        """
+        Resolve a chunk's text from its page and offsets.
+        
+        Args:
+            metadata: Compact chunk metadata with 'doc_id', 'page_number', 'start_index', 'end_index'
+        
+        Returns:
+            Chunk text
+        """
+        page_text = self.get_page_text(metadata["doc_id"], metadata.get("page_number", 0))
+        return page_text[metadata.get("start_index", 0):metadata.get("end_index", len(page_text))]
+    
+    def hydrate(self, results: Dict) -> Dict:
+        """
+        Expand compact chunk metadata and externalized text in query results.
+        
+        Args:
+            results: Dictionary with documents and metadatas
+        
+        Returns:
+            Results with document metadata merged in and missing texts resolved
+        """
+        metadatas = results.get("metadatas") or []
+        documents = list(results.get("documents") or [None] * len(metadatas))
+        doc_ids = [m["doc_id"] for m in metadatas if m and "doc_id" in m]
+        if not doc_ids:
+            return results
+        
+        registry_docs = self.get_documents(doc_ids)
+        hydrated = []
+        for i, metadata in enumerate(metadatas):
+            if not metadata or "doc_id" not in metadata:
+                hydrated.append(metadata)
+                continue
+            hydrated.append({**registry_docs.get(metadata["doc_id"], {}), **metadata})
+            if not documents[i]:
+                documents[i] = self.get_chunk_text(metadata)
+        
+        return {**results, "documents": documents, "metadatas": hydrated}
+    
+    def delete_document(self, doc_id: str) -> None:
+        """
+        Remove a document and its pages.
+        
+        Args:
+            doc_id: Document id
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        with self._cache_lock:
+            self._doc_cache.pop(doc_id, None)
+            for key in [key for key in self._page_cache if key[0] == doc_id]:
+                del self._page_cache[key]
+    
+    def add_reference_source(self, source) -> None:
+        """
+        Register an object whose chunks reference registered documents.
+        
+        Args:
+            source: Object with a referenced_doc_ids(doc_ids) method; held weakly
+        """
+        self._reference_sources.add(source)
+    
+    def remove_reference_source(self, source) -> None:
+        """
+        Stop asking a source for references, e.g. after its collection was deleted.
+        
+        Args:
+            source: Previously registered source
+        """
+        self._reference_sources.discard(source)
+    
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """
+        Get the documents still referenced by any registered source.
+        
+        Args:
+            doc_ids: Document ids to check
+        
+        Returns:
+            Subset of doc_ids that is still referenced
+        """
+        referenced = set()
+        for source in list(self._reference_sources):
+            remaining = [doc_id for doc_id in doc_ids if doc_id not in referenced]
+            if not remaining:
+                break
+            referenced |= source.referenced_doc_ids(remaining)
+        return referenced
+    
+    def prune(self, doc_ids: Optional[Iterable[str]] = None, min_age_seconds: float = 3600) -> int:
+        """
+        Delete documents no reference source points to any more.
+        
+        Args:
+            doc_ids: Documents to consider (defaults to all registered documents)
+            min_age_seconds: Leave documents registered more recently than this alone
+        
+        Returns:
+            Number of documents deleted
+        """
+        cutoff = time.time() - min_age_seconds
+        with self._connect() as conn:
+            if doc_ids is None:
+                rows = conn.execute("SELECT doc_id FROM documents WHERE created_at < ?", (cutoff,)).fetchall()
+            else:
+                doc_ids = list(set(doc_ids))
+                if not doc_ids:
+                    return 0
+                rows = conn.execute(
+                    f"SELECT doc_id FROM documents WHERE created_at < ? AND doc_id IN ({','.join('?' * len(doc_ids))})",
+                    [cutoff, *doc_ids]
+                ).fetchall()
+        
+        candidates = [row[0] for row in rows]
+        referenced = self.referenced_doc_ids(candidates) if candidates else set()
+        orphaned = [doc_id for doc_id in candidates if doc_id not in referenced]
+        for doc_id in orphaned:
+            self.delete_document(doc_id)
+        
+        if orphaned:
+            logger.info(f"Pruned {len(orphaned)} unreferenced documents from the registry")
+        return len(orphaned)
+    
+    def dump(self, doc_ids: Iterable[str]) -> Dict[str, List[Tuple]]:
+        """
+        Read the raw rows of several documents, e.g. to include them in a snapshot.
+        
+        Args:
+            doc_ids: Document ids
+        
+        Returns:
+            Dictionary with 'documents' and 'pages' row tuples (page text stays compressed)
+        """
+        doc_ids = sorted(set(doc_ids))
+        rows = {"documents": [], "pages": []}
+        with self._connect() as conn:
+            for offset in range(0, len(doc_ids), 500):
+                batch = doc_ids[offset:offset + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows["documents"].extend(conn.execute(
+                    f"SELECT doc_id, metadata, created_at FROM documents WHERE doc_id IN ({placeholders})",
+                    batch
+                ).fetchall())
+                rows["pages"].extend(conn.execute(
+                    f"SELECT doc_id, page_number, text FROM pages WHERE doc_id IN ({placeholders})",
+                    batch
+                ).fetchall())
+        return rows
+    
+    def load(self, rows: Dict[str, List[Tuple]]) -> None:
+        """
+        Insert rows read by dump(), keeping documents that are already registered.
+        
+        Args:
+            rows: Dictionary with 'documents' and 'pages' row tuples
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO documents (doc_id, metadata, created_at) VALUES (?, ?, ?)",
+                [(doc_id, metadata, now) for doc_id, metadata, _ in rows.get("documents", [])]
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO pages (doc_id, page_number, text) VALUES (?, ?, ?)",
+                rows.get("pages", [])
+            )
+
+
+_registry: Optional[DocumentRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_document_registry() -> DocumentRegistry:
+    """Get the process-wide document registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DocumentRegistry()
+        return _registry
+
+
+@contextmanager
+def use_document_registry(registry: DocumentRegistry):
+    """
+    Temporarily replace the process-wide registry, e.g. to keep a benchmark out of the real one.
+    
+    Args:
+        registry: Registry to use inside the block
+    
+    Yields:
+        The registry
+    """
+    global _registry
+    with _registry_lock:
+        previous, _registry = _registry, registry
+    try:
+        yield registry
+    finally:
+        with _registry_lock:
+            _registry = previous
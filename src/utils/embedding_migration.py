@@ -0,0 +1,378 @@
+"""
+Background re-embedding of a collection into a new embedding model.
+
+Usage:
+    python -m src.utils.embedding_migration --collection assignment_documents --estimate-only
+    python -m src.utils.embedding_migration --collection assignment_documents --model text-embedding-3-large
+    python -m src.utils.embedding_migration --collection assignment_documents --also assignment_summaries
+"""
+
+import argparse
+import hashlib
+import threading
+import time
+from typing import List, Dict, Optional, Set
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    EMBEDDING_MODEL,
+    EMBEDDING_MIGRATION_BATCH_SIZE,
+    EMBEDDING_MIGRATION_BATCH_DELAY_SECONDS,
+    EMBEDDING_ALIAS_REFRESH_SECONDS
+)
+from src.utils.context_packer import count_tokens
+from src.utils.document_registry import get_document_registry
+from src.utils.embeddings import EmbeddingManager
+from src.utils.vector_store import VectorStore, create_vector_store, set_collection_alias
+
+
+# USD per million input tokens
+EMBEDDING_PRICES_PER_1M_TOKENS = {
+    "text-embedding-3-small": 0.02,
+    "text-embedding-3-large": 0.13,
+    "text-embedding-ada-002": 0.10
+}
+
+MAX_CATCH_UP_PASSES = 5
+
+
+def shadow_collection_name(collection_name: str, model: str) -> str:
+    """Name of the collection a logical collection is re-embedded into."""
+    return f"{collection_name}__{hashlib.md5(model.encode('utf-8')).hexdigest()[:8]}"
+
+
+class EmbeddingMigration:
+    """
+    Re-embed a collection into a shadow collection and switch over when done.
+    
+    Queries keep using the current collection and model while the shadow is
+    filled in throttled batches. Chunks written or deleted meanwhile are
+    reconciled in catch-up passes, then the collection alias is pointed at
+    the shadow in one write, which every VectorStore picks up on its next
+    refresh. Companion collections, such as the document summaries, are
+    migrated the same way right after, so every collection ends up on the
+    target model.
+    """
+    
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        target_model: str = EMBEDDING_MODEL,
+        batch_size: int = EMBEDDING_MIGRATION_BATCH_SIZE,
+        batch_delay_seconds: float = EMBEDDING_MIGRATION_BATCH_DELAY_SECONDS,
+        drop_old: bool = False,
+        companions: Optional[List[VectorStore]] = None
+    ):
+        """
+        Initialize the migration.
+        
+        Args:
+            vector_store: VectorStore whose collection is migrated
+            target_model: Embedding model to migrate to
+            batch_size: Chunks re-embedded per batch
+            batch_delay_seconds: Pause between batches to stay under rate limits
+            drop_old: Delete the old collection after the switch
+            companions: Other vector stores migrated to the same model after this one
+        """
+        if not hasattr(vector_store, "client"):
+            raise ValueError("Only single-collection vector stores can be migrated; migrate each shard separately")
+        
+        self.vector_store = vector_store
+        self.target_model = target_model
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay_seconds
+        self.drop_old = drop_old
+        
+        self.source_model = vector_store.embedding_model
+        self.source_name = vector_store.physical_name
+        self.shadow_name = shadow_collection_name(vector_store.collection_name, target_model)
+        self.embedding_manager = EmbeddingManager(target_model)
+        self.companions = [
+            EmbeddingMigration(store, target_model, batch_size, batch_delay_seconds, drop_old)
+            for store in companions or []
+        ]
+        
+        self._progress = {
+            "state": "pending",
+            "collection": vector_store.collection_name,
+            "source_model": self.source_model,
+            "target_model": target_model,
+            "total": 0,
+            "migrated": 0,
+            "tokens": 0,
+            "estimated_tokens": 0,
+            "estimated_cost_usd": 0.0,
+            "elapsed_seconds": 0.0,
+            "eta_seconds": None,
+            "error": None
+        }
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+    
+    @property
+    def needed(self) -> bool:
+        """Whether the collection or a companion is embedded with a different model than the target."""
+        return self.source_model != self.target_model or any(companion.needed for companion in self.companions)
+    
+    def _update(self, **values) -> None:
+        """Update the progress report."""
+        with self._lock:
+            self._progress.update(values)
+            if self._started_at is not None:
+                elapsed = time.monotonic() - self._started_at
+                self._progress["elapsed_seconds"] = elapsed
+                done, total = self._progress["migrated"], self._progress["total"]
+                if 0 < done < total:
+                    self._progress["eta_seconds"] = elapsed / done * (total - done)
+                elif total and done >= total:
+                    self._progress["eta_seconds"] = 0.0
+    
+    def progress(self) -> Dict:
+        """
+        Get the migration progress.
+        
+        Returns:
+            Dictionary with state, counts, token usage, estimated cost and ETA
+        """
+        with self._lock:
+            progress = dict(self._progress)
+        if self.companions:
+            progress["companions"] = [companion.progress() for companion in self.companions]
+        progress["percent"] = 100.0 * progress["migrated"] / progress["total"] if progress["total"] else 0.0
+        return progress
+    
+    def _all_ids(self, collection) -> Set[str]:
+        """Read every id of a collection page by page."""
+        ids, offset = set(), 0
+        while True:
+            page = collection.get(limit=self.batch_size * 10, offset=offset, include=[])
+            ids.update(page["ids"])
+            if len(page["ids"]) < self.batch_size * 10:
+                return ids
+            offset += len(page["ids"])
+    
+    def _texts(self, records: Dict) -> List[str]:
+        """Get record texts, resolving externalized chunk text from the document registry."""
+        registry = get_document_registry()
+        return [
+            document if document is not None else registry.get_chunk_text(metadata)
+            for document, metadata in zip(records["documents"], records["metadatas"])
+        ]
+    
+    def estimate(self) -> Dict:
+        """
+        Estimate the tokens and cost of re-embedding the whole collection.
+        
+        Returns:
+            Dictionary with record count, estimated tokens and estimated cost in USD
+        """
+        source = self.vector_store.collection
+        total, tokens, offset = source.count(), 0, 0
+        while offset < total:
+            records = source.get(limit=self.batch_size * 10, offset=offset, include=["documents", "metadatas"])
+            if not records["ids"]:
+                break
+            tokens += sum(count_tokens(text) for text in self._texts(records))
+            offset += len(records["ids"])
+        
+        price = EMBEDDING_PRICES_PER_1M_TOKENS.get(self.target_model)
+        estimate = {
+            "total": total,
+            "estimated_tokens": tokens,
+            "estimated_cost_usd": tokens / 1_000_000 * price if price is not None else None
+        }
+        self._update(**estimate)
+        return estimate
+    
+    def _copy(self, source, shadow, ids: List[str]) -> None:
+        """Re-embed records into the shadow collection in throttled batches."""
+        for start in range(0, len(ids), self.batch_size):
+            if self._stop.is_set():
+                raise InterruptedError("Migration stopped")
+            
+            records = source.get(ids=ids[start:start + self.batch_size], include=["documents", "metadatas"])
+            if not records["ids"]:
+                continue
+            
+            texts = self._texts(records)
+            has_documents = any(document is not None for document in records["documents"])
+            shadow.upsert(
+                ids=records["ids"],
+                embeddings=self.embedding_manager.get_embeddings(texts),
+                documents=texts if has_documents else None,
+                metadatas=records["metadatas"]
+            )
+            
+            with self._lock:
+                migrated = self._progress["migrated"] + len(records["ids"])
+                tokens = self._progress["tokens"] + sum(count_tokens(text) for text in texts)
+            self._update(migrated=migrated, tokens=tokens)
+            
+            if self.batch_delay:
+                time.sleep(self.batch_delay)
+    
+    def _reconcile(self, source, shadow, delete_removed: bool = True) -> int:
+        """
+        Copy records missing from the shadow and remove ones deleted from the source.
+        
+        Args:
+            source: Collection being migrated away from
+            shadow: Collection being migrated to
+            delete_removed: Delete shadow records that are not in the source; only
+                safe before the alias switch, afterwards they are new uploads
+        
+        Returns:
+            Number of records copied or deleted
+        """
+        source_ids = self._all_ids(source)
+        shadow_ids = self._all_ids(shadow)
+        missing = sorted(source_ids - shadow_ids)
+        removed = sorted(shadow_ids - source_ids)
+        
+        self._update(total=len(source_ids), migrated=len(source_ids & shadow_ids))
+        if removed and delete_removed:
+            shadow.delete(ids=removed)
+        elif removed:
+            logger.info(f"Kept {len(removed)} records written to {shadow.name} after the switch")
+        self._copy(source, shadow, missing)
+        return len(missing) + (len(removed) if delete_removed else 0)
+    
+    def run(self) -> Dict:
+        """
+        Run the migration to completion on the calling thread.
+        
+        Returns:
+            Final progress report
+        """
+        if not self.needed:
+            self._update(state="up_to_date")
+            return self.progress()
+        
+        if self.source_model == self.target_model:
+            self._update(state="up_to_date")
+            self._run_companions()
+            return self.progress()
+        
+        self._started_at = time.monotonic()
+        client = self.vector_store.client
+        try:
+            estimate = self.estimate()
+            logger.info(
+                f"Migrating {self.vector_store.collection_name} from {self.source_model} to {self.target_model}: "
+                f"{estimate['total']} chunks, ~{estimate['estimated_tokens']} tokens"
+                + (f", ~${estimate['estimated_cost_usd']:.4f}" if estimate["estimated_cost_usd"] is not None else "")
+            )
+            
+            source = self.vector_store.collection
+            shadow = client.get_or_create_collection(
+                name=self.shadow_name,
+                metadata=self.vector_store.collection_metadata
+            )
+            
+            # Keep catching up with writes made during the copy before switching
+            self._update(state="copying")
+            for _ in range(MAX_CATCH_UP_PASSES):
+                if not self._reconcile(source, shadow):
+                    break
+            
+            self._update(state="switching")
+            set_collection_alias(client, self.vector_store.collection_name, self.shadow_name, self.target_model)
+            self.vector_store.refresh(force=True)
+            logger.info(f"Switched {self.vector_store.collection_name} to {self.shadow_name} ({self.target_model})")
+            
+            # Other processes may write to the old collection until their next alias refresh
+            self._update(state="finalizing")
+            self._stop.wait(EMBEDDING_ALIAS_REFRESH_SECONDS)
+            self._reconcile(source, shadow, delete_removed=False)
+            
+            if self.drop_old:
+                client.delete_collection(name=self.source_name)
+                logger.info(f"Deleted old collection {self.source_name}")
+            
+            self._update(state="completed")
+            self._run_companions()
+            
+        except InterruptedError:
+            self._update(state="stopped")
+            logger.info(f"Stopped migration of {self.vector_store.collection_name}")
+        except Exception as e:
+            self._update(state="failed", error=str(e))
+            logger.error(f"Embedding migration failed: {str(e)}")
+            raise
+        
+        return self.progress()
+    
+    def _run_companions(self) -> None:
+        """Migrate the companion collections, stopping with this migration."""
+        for companion in self.companions:
+            companion._stop = self._stop
+            progress = companion.run()
+            if progress["state"] == "stopped":
+                raise InterruptedError("Migration stopped")
+    
+    def start(self) -> None:
+        """Run the migration on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        def run():
+            try:
+                self.run()
+            except Exception:
+                # Already logged and recorded in the progress report
+                pass
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="embedding-migration", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Stop after the current batch; a later run resumes from what was copied."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main() -> int:
+    """Run a migration from the command line."""
+    parser = argparse.ArgumentParser(description="Re-embed a collection with a new embedding model")
+    parser.add_argument("--collection", default="assignment_documents")
+    parser.add_argument("--model", default=EMBEDDING_MODEL, help="Target embedding model")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_MIGRATION_BATCH_SIZE)
+    parser.add_argument("--batch-delay", type=float, default=EMBEDDING_MIGRATION_BATCH_DELAY_SECONDS)
+    parser.add_argument("--estimate-only", action="store_true", help="Only report the estimated cost")
+    parser.add_argument("--drop-old", action="store_true", help="Delete the old collection after switching")
+    parser.add_argument(
+        "--also",
+        nargs="*",
+        default=[],
+        help="Collections migrated after the main one, e.g. assignment_summaries"
+    )
+    args = parser.parse_args()
+    
+    migration = EmbeddingMigration(
+        create_vector_store(args.collection),
+        target_model=args.model,
+        batch_size=args.batch_size,
+        batch_delay_seconds=args.batch_delay,
+        drop_old=args.drop_old,
+        # Summary-style collections carry their own text, so they do not keep registry documents alive
+        companions=[VectorStore(collection_name=name, references_documents=False) for name in args.also]
+    )
+    
+    if args.estimate_only:
+        logger.info(f"Migration estimate: {migration.estimate()}")
+        for companion in migration.companions:
+            logger.info(f"Migration estimate of {companion.vector_store.collection_name}: {companion.estimate()}")
+        return 0
+    
+    progress = migration.run()
+    logger.info(f"Migration finished: {progress}")
+    return 0 if progress["state"] in ("completed", "up_to_date") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
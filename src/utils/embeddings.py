@@ -1,6 +1,6 @@
 """Text chunking and embedding utilities."""
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from loguru import logger
@@ -12,42 +12,71 @@ from config.settings import OPENAI_API_KEY, EMBEDDING_MODEL, CHUNK_SIZE, CHUNK_O
 class EmbeddingManager:
     """Manage text chunking and embedding generation."""
     
-    def __init__(self):
-        """Initialize embedding manager with OpenAI embeddings."""
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        """
+        Initialize embedding manager with OpenAI embeddings.
+        
+        Args:
+            model: OpenAI embedding model (defaults to EMBEDDING_MODEL)
+        """
+        self.model = model
         self.embeddings = OpenAIEmbeddings(
             openai_api_key=OPENAI_API_KEY,
-            model=EMBEDDING_MODEL
+            model=model
         )
         
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=CHUNK_SIZE,
             chunk_overlap=CHUNK_OVERLAP,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
         )
         
-        logger.info(f"Initialized EmbeddingManager with model: {EMBEDDING_MODEL}")
+        logger.info(f"Initialized EmbeddingManager with model: {model}")
     
-    def chunk_text(self, text: str, metadata: Dict = None) -> List[Dict]:
+    def _split_with_offsets(self, text: str) -> List[Dict]:
+        """Split text and return each chunk with its start and end offsets."""
+        return [
+            {
+                "text": doc.page_content,
+                "start_index": doc.metadata["start_index"],
+                "end_index": doc.metadata["start_index"] + len(doc.page_content)
+            }
+            for doc in self.text_splitter.create_documents([text])
+        ]
+    
+    def chunk_text(self, text: str, metadata: Dict = None, doc_id: Optional[str] = None) -> List[Dict]:
         """
         Split text into chunks with metadata.
         
+        Chunks of a document registered in the document registry only carry
+        its id and their offsets; otherwise they carry the metadata itself.
+        
         Args:
             text: Text to chunk
-            metadata: Optional metadata to attach to each chunk
-            
+            metadata: Optional document-level metadata
+            doc_id: Registry id of the text, registered as page 0
+        
         Returns:
             List of dictionaries containing chunks and metadata
         """
         try:
-            chunks = self.text_splitter.split_text(text)
+            chunks = self._split_with_offsets(text)
+            document = {"doc_id": doc_id} if doc_id else dict(metadata or {})
             
             chunked_docs = []
             for i, chunk in enumerate(chunks):
                 doc = {
-                    "text": chunk,
+                    "text": chunk["text"],
                     "chunk_id": i,
-                    "metadata": metadata or {}
+                    "metadata": {
+                        **document,
+                        "page_number": 0,
+                        "chunk_within_page": i,
+                        "start_index": chunk["start_index"],
+                        "end_index": chunk["end_index"]
+                    }
                 }
                 chunked_docs.append(doc)
             
@@ -58,34 +87,46 @@ class EmbeddingManager:
             logger.error(f"Error chunking text: {str(e)}")
             raise
     
-    def chunk_pages(self, pages: List[Dict], file_metadata: Dict = None) -> List[Dict]:
+    def chunk_pages(
+        self,
+        pages: List[Dict],
+        file_metadata: Dict = None,
+        doc_id: Optional[str] = None
+    ) -> List[Dict]:
         """
         Chunk text from multiple pages with page tracking.
         
+        Chunks of a document registered in the document registry only carry
+        its id, page and offsets; otherwise they carry the file metadata.
+        
         Args:
             pages: List of page dictionaries with 'page_number' and 'text'
             file_metadata: File-level metadata
-            
+            doc_id: Registry id of the pages
+        
         Returns:
             List of chunked documents with page metadata
         """
         try:
+            document = {"doc_id": doc_id} if doc_id else dict(file_metadata or {})
             all_chunks = []
             
             for page in pages:
                 page_text = page.get("text", "")
                 page_num = page.get("page_number")
                 
-                chunks = self.text_splitter.split_text(page_text)
+                chunks = self._split_with_offsets(page_text)
                 
                 for i, chunk in enumerate(chunks):
                     doc = {
-                        "text": chunk,
+                        "text": chunk["text"],
                         "chunk_id": len(all_chunks),
                         "metadata": {
+                            **document,
                             "page_number": page_num,
                             "chunk_within_page": i,
-                            **(file_metadata or {})
+                            "start_index": chunk["start_index"],
+                            "end_index": chunk["end_index"]
                         }
                     }
                     all_chunks.append(doc)
@@ -103,7 +144,7 @@ class EmbeddingManager:
         
         Args:
             texts: List of text strings
-            
+        
         Returns:
             List of embedding vectors
         """
@@ -122,7 +163,7 @@ class EmbeddingManager:
         
         Args:
             text: Text string
-            
+        
         Returns:
             Embedding vector
         """
@@ -0,0 +1,255 @@
+"""Single-writer ingestion queue with group commit."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Optional
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import INGEST_COMMIT_INTERVAL_MS, INGEST_MAX_BATCH_CHUNKS
+from src.utils.vector_store import BaseVectorStore, make_chunk_id
+
+
+class _PendingBatch:
+    """A producer's chunk batch waiting to be committed."""
+    
+    def __init__(self, chunks: List[Dict], embeddings: List[List[float]], embedding_model: str):
+        self.chunks = chunks
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class IngestionQueue:
+    """
+    Funnel vector store writes from many producers through one writer thread.
+    
+    Producers embed their chunks on their own thread and enqueue them. The
+    writer coalesces everything that arrives within the commit interval into
+    one write and resolves each producer's future once the write is durable.
+    Queries go straight to the vector store and never wait on the queue.
+    """
+    
+    def __init__(
+        self,
+        vector_store: BaseVectorStore,
+        commit_interval_ms: int = INGEST_COMMIT_INTERVAL_MS,
+        max_batch_chunks: int = INGEST_MAX_BATCH_CHUNKS
+    ):
+        """
+        Initialize the queue and start the writer thread.
+        
+        Args:
+            vector_store: VectorStore all writes are committed to
+            commit_interval_ms: How long the writer waits to coalesce batches
+            max_batch_chunks: Maximum number of chunks per group commit
+        """
+        self.vector_store = vector_store
+        self.commit_interval = commit_interval_ms / 1000.0
+        self.max_batch_chunks = max_batch_chunks
+        
+        self._queue: "queue.Queue[Optional[_PendingBatch]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._pending_chunks = 0
+        self._commits = 0
+        self._committed_chunks = 0
+        self._total_commit_ms = 0.0
+        self._last_commit_ms = 0.0
+        self._max_commit_ms = 0.0
+        self._last_ack_ms = 0.0
+        
+        self._writer = threading.Thread(target=self._run, name="ingestion-writer", daemon=True)
+        self._writer.start()
+        
+        logger.info(
+            f"Started ingestion queue (interval={commit_interval_ms}ms, "
+            f"max_batch={max_batch_chunks} chunks)"
+        )
+    
+    def submit(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
+    ) -> Future:
+        """
+        Embed a batch of chunks and enqueue it for the next group commit.
+        
+        Args:
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Optional precomputed embeddings, one per chunk
+            embedding_model: Model the precomputed embeddings were made with
+        
+        Returns:
+            Future resolved with the number of chunks once they are durable
+        """
+        if embeddings is None:
+            embedding_manager = self.vector_store.embedding_manager
+            embeddings = embedding_manager.get_embeddings([chunk["text"] for chunk in chunks])
+            embedding_model = embedding_manager.model
+        
+        batch = _PendingBatch(chunks, embeddings, embedding_model or self.vector_store.embedding_model)
+        with self._stats_lock:
+            self._pending_chunks += len(chunks)
+        self._queue.put(batch)
+        return batch.future
+    
+    def add_documents(self, chunks: List[Dict], timeout: Optional[float] = None) -> int:
+        """
+        Enqueue chunks and block until they have been committed.
+        
+        Args:
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            timeout: Optional maximum number of seconds to wait
+        
+        Returns:
+            Number of chunks committed
+        """
+        if not chunks:
+            return 0
+        return self.submit(chunks).result(timeout=timeout)
+    
+    def stats(self) -> Dict:
+        """
+        Get queue depth and commit latency statistics.
+        
+        Returns:
+            Dictionary with pending batches/chunks and commit timings in ms
+        """
+        with self._stats_lock:
+            return {
+                "pending_batches": self._queue.qsize(),
+                "pending_chunks": self._pending_chunks,
+                "commits": self._commits,
+                "committed_chunks": self._committed_chunks,
+                "last_commit_ms": self._last_commit_ms,
+                "avg_commit_ms": self._total_commit_ms / self._commits if self._commits else 0.0,
+                "max_commit_ms": self._max_commit_ms,
+                "last_ack_ms": self._last_ack_ms
+            }
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Commit everything still queued and stop the writer thread.
+        
+        Args:
+            timeout: Optional maximum number of seconds to wait
+        """
+        self._queue.put(None)
+        self._writer.join(timeout=timeout)
+        logger.info("Stopped ingestion queue")
+    
+    def _run(self) -> None:
+        """Writer loop: collect batches for one interval and commit them together."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            
+            group = [first]
+            size = len(first.chunks)
+            deadline = time.perf_counter() + self.commit_interval
+            stopping = False
+            
+            while size < self.max_batch_chunks:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if batch is None:
+                    stopping = True
+                    break
+                group.append(batch)
+                size += len(batch.chunks)
+            
+            self._commit(group)
+            
+            if stopping:
+                return
+    
+    def _write(self, group: List[_PendingBatch]) -> int:
+        """
+        Write the deduplicated chunks of several batches in one vector store call.
+        
+        Args:
+            group: Batches to write
+        
+        Returns:
+            Number of chunks written
+        """
+        chunks, embeddings, models, seen = [], [], [], set()
+        for batch in group:
+            for chunk, embedding in zip(batch.chunks, batch.embeddings):
+                chunk_id = make_chunk_id(chunk)
+                if chunk_id in seen:
+                    continue
+                seen.add(chunk_id)
+                chunks.append(chunk)
+                embeddings.append(embedding)
+                models.append(batch.embedding_model)
+        
+        # Chunks embedded before an embedding model switch are redone
+        self.vector_store.refresh()
+        stale = [i for i, model in enumerate(models) if model != self.vector_store.embedding_model]
+        if stale:
+            redone = self.vector_store.embedding_manager.get_embeddings([chunks[i]["text"] for i in stale])
+            for i, embedding in zip(stale, redone):
+                embeddings[i] = embedding
+        
+        if chunks:
+            self.vector_store.add_documents(
+                chunks,
+                embeddings=embeddings,
+                embedding_model=self.vector_store.embedding_model
+            )
+        return len(chunks)
+    
+    def _commit(self, group: List[_PendingBatch]) -> None:
+        """Write a group of batches in one call and acknowledge their producers."""
+        start = time.perf_counter()
+        errors: Dict[int, Exception] = {}
+        try:
+            written = self._write(group)
+        except Exception as e:
+            logger.error(f"Group commit of {len(group)} batches failed: {str(e)}")
+            written = 0
+            if len(group) == 1:
+                errors[0] = e
+            else:
+                # One bad batch must not fail its neighbours, so each is retried on its own
+                for i, batch in enumerate(group):
+                    try:
+                        written += self._write([batch])
+                    except Exception as batch_error:
+                        logger.error(f"Commit of a {len(batch.chunks)} chunk batch failed: {str(batch_error)}")
+                        errors[i] = batch_error
+        commit_ms = (time.perf_counter() - start) * 1000
+        
+        done = time.perf_counter()
+        committed = [batch for i, batch in enumerate(group) if i not in errors]
+        with self._stats_lock:
+            self._pending_chunks -= sum(len(batch.chunks) for batch in group)
+            if committed:
+                self._commits += 1
+                self._committed_chunks += written
+                self._total_commit_ms += commit_ms
+                self._last_commit_ms = commit_ms
+                self._max_commit_ms = max(self._max_commit_ms, commit_ms)
+                self._last_ack_ms = max((done - batch.enqueued_at) * 1000 for batch in committed)
+        
+        for i, batch in enumerate(group):
+            if i in errors:
+                batch.future.set_exception(errors[i])
+            else:
+                batch.future.set_result(len(batch.chunks))
+        
+        if committed:
+            logger.info(
+                f"Group commit: {written} chunks from {len(committed)} batches in {commit_ms:.1f}ms"
+            )
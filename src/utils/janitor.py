@@ -0,0 +1,219 @@
+"""Background garbage collection for uploads, session data and cached artifacts."""
+
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Optional
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    UPLOADS_DIR,
+    OUTPUTS_DIR,
+    STUDY_PLANS_DIR,
+    JANITOR_INTERVAL_MINUTES,
+    UPLOADS_TTL_HOURS,
+    UPLOADS_QUOTA_MB,
+    ARTIFACTS_TTL_HOURS,
+    ARTIFACTS_QUOTA_MB,
+    SESSION_DATA_TTL_HOURS,
+    UPLOADED_DATA_TTL_HOURS,
+    JANITOR_COMPACT_MIN_DELETED
+)
+from src.utils.document_registry import get_document_registry
+from src.utils.vector_store import BaseVectorStore
+
+
+def sweep_directory(
+    directory: Path,
+    ttl_hours: float,
+    quota_mb: float,
+    exclude: Optional[List[Path]] = None
+) -> Dict:
+    """
+    Delete files older than the TTL, then the oldest files until under quota.
+    
+    Args:
+        directory: Directory to sweep recursively
+        ttl_hours: Maximum file age in hours (0 disables the TTL)
+        quota_mb: Maximum total size in MB (0 disables the quota)
+        exclude: Subdirectories whose files are kept and not counted
+    
+    Returns:
+        Dictionary with the number of files and bytes reclaimed
+    """
+    reclaimed = {"files": 0, "bytes": 0}
+    if not directory.exists():
+        return reclaimed
+    
+    excluded = [Path(path).resolve() for path in exclude or []]
+    files = [
+        path for path in directory.rglob("*")
+        if path.is_file() and not path.name.startswith(".")
+        and not any(path.resolve().is_relative_to(root) for root in excluded)
+    ]
+    files.sort(key=lambda path: path.stat().st_mtime)
+    
+    def remove(path: Path) -> None:
+        size = path.stat().st_size
+        path.unlink()
+        reclaimed["files"] += 1
+        reclaimed["bytes"] += size
+    
+    remaining = []
+    cutoff = time.time() - ttl_hours * 3600
+    for path in files:
+        try:
+            if ttl_hours and path.stat().st_mtime < cutoff:
+                remove(path)
+            else:
+                remaining.append(path)
+        except FileNotFoundError:
+            continue
+    
+    if quota_mb:
+        quota = quota_mb * 1024 * 1024
+        total = sum(path.stat().st_size for path in remaining if path.exists())
+        for path in remaining:
+            if total <= quota:
+                break
+            try:
+                size = path.stat().st_size
+                remove(path)
+                total -= size
+            except FileNotFoundError:
+                continue
+    
+    return reclaimed
+
+
+class Janitor:
+    """Apply TTLs and size quotas on a background thread and report what was reclaimed."""
+    
+    def __init__(
+        self,
+        vector_store: Optional[BaseVectorStore] = None,
+        session_manager=None,
+        artifact_dirs: Optional[List[Path]] = None,
+        interval_minutes: float = JANITOR_INTERVAL_MINUTES,
+        summary_index=None,
+        keep_dirs: Optional[List[Path]] = None
+    ):
+        """
+        Initialize the janitor.
+        
+        Args:
+            vector_store: Persistent VectorStore holding uploads and saved session data
+            session_manager: Optional SessionIndexManager whose idle sessions are dropped
+            artifact_dirs: Directories of cached artifacts (defaults to OUTPUTS_DIR)
+            interval_minutes: Minutes between background sweeps
+            summary_index: Optional SummaryIndex whose summaries of deleted documents are dropped
+            keep_dirs: Directories inside artifact_dirs that are never swept (defaults to STUDY_PLANS_DIR)
+        """
+        self.vector_store = vector_store
+        self.session_manager = session_manager
+        self.summary_index = summary_index
+        self.artifact_dirs = artifact_dirs or [OUTPUTS_DIR]
+        self.keep_dirs = [STUDY_PLANS_DIR] if keep_dirs is None else keep_dirs
+        self.interval = interval_minutes * 60
+        self.last_report: Optional[Dict] = None
+        
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def run_once(self) -> Dict:
+        """
+        Run one garbage collection pass.
+        
+        Returns:
+            Report of files, chunks and sessions reclaimed
+        """
+        start = time.perf_counter()
+        report = {
+            "uploads": sweep_directory(UPLOADS_DIR, UPLOADS_TTL_HOURS, UPLOADS_QUOTA_MB),
+            "artifacts": {"files": 0, "bytes": 0},
+            "session_chunks": 0,
+            "uploaded_chunks": 0,
+            "idle_sessions": 0,
+            "documents": 0,
+            "summaries": 0,
+            "compacted": False
+        }
+        
+        for directory in self.artifact_dirs:
+            swept = sweep_directory(Path(directory), ARTIFACTS_TTL_HOURS, ARTIFACTS_QUOTA_MB, exclude=self.keep_dirs)
+            report["artifacts"]["files"] += swept["files"]
+            report["artifacts"]["bytes"] += swept["bytes"]
+        
+        if self.session_manager is not None:
+            before = self.session_manager.stats()["sessions"]
+            self.session_manager.evict_idle()
+            report["idle_sessions"] = before - self.session_manager.stats()["sessions"]
+        
+        if self.vector_store is not None:
+            # Only the registry documents of chunks deleted here are pruned, other processes may still use the rest
+            deleted_doc_ids = set()
+            now = time.time()
+            for key, tag, ttl_hours in (
+                ("session_chunks", "session_saved_at", SESSION_DATA_TTL_HOURS),
+                ("uploaded_chunks", "uploaded_at", UPLOADED_DATA_TTL_HOURS)
+            ):
+                if not ttl_hours:
+                    continue
+                where = {tag: {"$lt": int(now - ttl_hours * 3600)}}
+                metadatas = self.vector_store.get_records(where)["metadatas"]
+                if metadatas:
+                    deleted_doc_ids.update(m["doc_id"] for m in metadatas if m and "doc_id" in m)
+                    self.vector_store.delete_documents(where)
+                    report[key] = len(metadatas)
+            
+            if report["session_chunks"] + report["uploaded_chunks"] >= JANITOR_COMPACT_MIN_DELETED:
+                self.vector_store.compact()
+                report["compacted"] = True
+            
+            if deleted_doc_ids:
+                report["documents"] = get_document_registry().prune(deleted_doc_ids)
+        
+        # Summaries of documents that left the registry, here or in another process
+        if self.summary_index is not None:
+            report["summaries"] = self.summary_index.prune()
+        
+        report["duration_seconds"] = time.perf_counter() - start
+        self.last_report = report
+        
+        logger.info(
+            f"Janitor reclaimed {report['uploads']['files']} uploads "
+            f"({report['uploads']['bytes'] / 1024 / 1024:.1f}MB), "
+            f"{report['artifacts']['files']} artifacts "
+            f"({report['artifacts']['bytes'] / 1024 / 1024:.1f}MB), "
+            f"{report['session_chunks']} session chunks, "
+            f"{report['uploaded_chunks']} uploaded chunks, "
+            f"{report['idle_sessions']} idle sessions, "
+            f"{report['documents']} documents, "
+            f"{report['summaries']} summaries"
+            f"{', compacted vector store' if report['compacted'] else ''}"
+        )
+        return report
+    
+    def start(self) -> None:
+        """Start sweeping on a background thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Janitor pass failed: {str(e)}")
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="janitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Started janitor (every {self.interval / 60:.0f} minutes)")
+    
+    def stop(self) -> None:
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,180 @@
+"""Persistent, size-bounded cache of LLM responses."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_MB
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Cache chat model responses in SQLite, keyed by model settings and prompt.
+    
+    LangChain passes the serialized messages as the prompt and the model
+    parameters (model name, temperature, stop sequences and bound tool
+    schemas) as the llm string, so identical calls hit the cache regardless
+    of which agent makes them. The least recently used entries are evicted
+    once the stored responses exceed the size limit.
+    """
+    
+    def __init__(self, db_path: str = LLM_CACHE_PATH, max_mb: float = LLM_CACHE_MAX_MB):
+        """
+        Initialize the cache database.
+        
+        Args:
+            db_path: SQLite file path
+            max_mb: Maximum total size of stored responses in MB
+        """
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, last_access REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        
+        logger.info(f"Initialized LLM response cache at {db_path} ({self._total_bytes / 1024 / 1024:.1f}MB)")
+    
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection and commit on success."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        """Hash the model settings and prompt into a cache key."""
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """
+        Look up a cached response.
+        
+        Args:
+            prompt: Serialized prompt messages
+            llm_string: Serialized model parameters
+        
+        Returns:
+            Cached generations, or None on a miss
+        """
+        key = self._key(prompt, llm_string)
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            conn.execute(
+                "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key)
+            )
+            self._hits += 1
+        
+        try:
+            generations = loads(row[0])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable LLM cache entry: {str(e)}")
+            return None
+        
+        logger.info(f"LLM cache hit ({self._hits} hits, {self._misses} misses)")
+        return generations
+    
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """
+        Store a response and evict the least recently used entries over the size limit.
+        
+        Args:
+            prompt: Serialized prompt messages
+            llm_string: Serialized model parameters
+            return_val: Generations returned by the model
+        """
+        key = self._key(prompt, llm_string)
+        value = dumps(list(return_val))
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        
+        with self._lock, self._connect() as conn:
+            previous = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, 0)",
+                (key, value, size, now, now)
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            
+            while self._total_bytes > self.max_bytes:
+                oldest = conn.execute(
+                    "SELECT key, size FROM responses ORDER BY last_access LIMIT 100"
+                ).fetchall()
+                if not oldest:
+                    break
+                evicted = []
+                for old_key, old_size in oldest:
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    evicted.append((old_key,))
+                    self._total_bytes -= old_size
+                conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+    
+    def clear(self, **kwargs: Any) -> None:
+        """Remove all cached responses."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
+        logger.info("Cleared LLM response cache")
+    
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with hits, misses, hit rate, entries and stored bytes
+        """
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._total_bytes
+            }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Get the process-wide LLM response cache, or None when LLM_CACHE_ENABLED is off."""
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache()
+        return _llm_cache
@@ -0,0 +1,619 @@
+"""Process-wide registry of chat model clients sharing one connection pool."""
+
+import asyncio
+import copy
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+import httpx
+import openai
+from langchain_core.outputs import Generation
+from langchain_openai import ChatOpenAI
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    LLM_MAX_CONCURRENT_REQUESTS,
+    LLM_KEEPALIVE_SECONDS,
+    LLM_REQUEST_TIMEOUT_SECONDS,
+    LLM_POOL_TIMEOUT_SECONDS,
+    LLM_FALLBACK_MODEL,
+    LLM_PRIMARY_TIMEOUT_SECONDS,
+    LLM_PRIMARY_MAX_RETRIES
+)
+from src.utils.llm_cache import get_llm_cache
+from src.utils.streaming import follow_stream
+
+
+class _RequestStats:
+    """Counters shared by the sync and async transports."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.total_ms = 0.0
+        self.fallbacks = 0
+    
+    def start(self) -> float:
+        """Record a request start and return its start time."""
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return time.perf_counter()
+    
+    def finish(self, started: float) -> None:
+        """Record a request end."""
+        with self.lock:
+            self.in_flight -= 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+
+
+_stats = _RequestStats()
+
+
+class _SlotLimiter:
+    """
+    Cap on requests in flight, shared by threads and event loops.
+    
+    Freed slots are handed to waiters in arrival order. Async waiters wait on
+    a future of their own event loop, so nothing polls, and a waiter that
+    times out or is cancelled never keeps a slot.
+    """
+    
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._free = limit
+        self._waiters: deque = deque()
+    
+    def acquire(self, request: httpx.Request, timeout: Optional[float]) -> None:
+        """Wait for a slot, raising httpx.PoolTimeout after timeout seconds."""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        
+        if waiter.wait(timeout):
+            return
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                raise self._timeout(request, timeout)
+        # Granted while timing out
+    
+    async def acquire_async(self, request: httpx.Request, timeout: Optional[float]) -> None:
+        """Wait for a slot without blocking the event loop, raising httpx.PoolTimeout after timeout seconds."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+        
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except BaseException as e:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and waiter.done() and not waiter.cancelled():
+                self.release()
+            # A grant still on its way to the loop sees the cancelled waiter and releases itself
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._timeout(request, timeout) from None
+            raise
+    
+    def release(self) -> None:
+        """Free a slot, handing it to the next waiter."""
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+    
+    def _grant(self, waiter: asyncio.Future) -> None:
+        """Hand a slot to an async waiter, or pass it on if it stopped waiting."""
+        if waiter.done():
+            self.release()
+        else:
+            waiter.set_result(None)
+    
+    @staticmethod
+    def _timeout(request: httpx.Request, timeout: Optional[float]) -> httpx.PoolTimeout:
+        return httpx.PoolTimeout(
+            f"No free LLM request slot within {timeout:.0f}s ({LLM_MAX_CONCURRENT_REQUESTS} in flight)",
+            request=request
+        )
+
+
+# One cap for the sync and async pools together
+_slots = _SlotLimiter(LLM_MAX_CONCURRENT_REQUESTS)
+
+
+def _pool_timeout(request: httpx.Request) -> float:
+    """How long a request may wait for a slot: its own pool timeout, or LLM_POOL_TIMEOUT_SECONDS."""
+    timeout = (request.extensions.get("timeout") or {}).get("pool")
+    return timeout if timeout is not None else LLM_POOL_TIMEOUT_SECONDS
+
+
+class _Slot:
+    """A request's hold on the shared cap, released once when its response is done."""
+    
+    def __init__(self):
+        self.started = _stats.start()
+        self._released = False
+        self._lock = threading.Lock()
+    
+    def release(self) -> None:
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        _stats.finish(self.started)
+        _slots.release()
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that frees its slot when closed."""
+    
+    def __init__(self, stream: httpx.SyncByteStream, slot: _Slot):
+        self._stream = stream
+        self._slot = slot
+    
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+    
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._slot.release()
+
+
+class _ReleasingAsyncStream(httpx.AsyncByteStream):
+    """Async response body that frees its slot when closed."""
+    
+    def __init__(self, stream: httpx.AsyncByteStream, slot: _Slot):
+        self._stream = stream
+        self._slot = slot
+    
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+    
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._slot.release()
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """HTTP transport that holds a shared slot per request and records counts and latency."""
+    
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        _slots.acquire(request, _pool_timeout(request))
+        slot = _Slot()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        # Streamed bodies are still being read after the headers arrive
+        response.stream = _ReleasingStream(response.stream, slot)
+        return response
+
+
+class _CountingAsyncTransport(httpx.AsyncHTTPTransport):
+    """Async HTTP transport that holds a shared slot per request and records counts and latency."""
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await _slots.acquire_async(request, _pool_timeout(request))
+        slot = _Slot()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+        response.stream = _ReleasingAsyncStream(response.stream, slot)
+        return response
+
+
+# Errors worth retrying on another model; bad requests would fail there too
+FALLBACK_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+
+class FallbackChatOpenAI(ChatOpenAI):
+    """
+    Chat model that retries a failed call once on a secondary model.
+    
+    Timeouts, connection errors, rate limits and server errors of the primary
+    model trigger the fallback; a stream that already produced tokens is not
+    restarted.
+    """
+    
+    fallback_model: Optional[str] = None
+    
+    def _fallback(self, error: Exception) -> ChatOpenAI:
+        """Log the failure and return the secondary model."""
+        logger.warning(f"{self.model_name} failed ({type(error).__name__}), falling back to {self.fallback_model}")
+        with _stats.lock:
+            _stats.fallbacks += 1
+        return self.model_copy(update={"model_name": self.fallback_model, "fallback_model": None})
+    
+    def _generate(self, *args: Any, **kwargs: Any):
+        try:
+            return super()._generate(*args, **kwargs)
+        except FALLBACK_ERRORS as e:
+            if not self.fallback_model:
+                raise
+            return self._fallback(e)._generate(*args, **kwargs)
+    
+    async def _agenerate(self, *args: Any, **kwargs: Any):
+        try:
+            return await super()._agenerate(*args, **kwargs)
+        except FALLBACK_ERRORS as e:
+            if not self.fallback_model:
+                raise
+            return await self._fallback(e)._agenerate(*args, **kwargs)
+    
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator:
+        started = False
+        try:
+            for chunk in super()._stream(*args, **kwargs):
+                started = True
+                yield chunk
+        except FALLBACK_ERRORS as e:
+            if started or not self.fallback_model:
+                raise
+            yield from self._fallback(e)._stream(*args, **kwargs)
+    
+    async def _astream(self, *args: Any, **kwargs: Any) -> AsyncIterator:
+        started = False
+        try:
+            async for chunk in super()._astream(*args, **kwargs):
+                started = True
+                yield chunk
+        except FALLBACK_ERRORS as e:
+            if started or not self.fallback_model:
+                raise
+            async for chunk in self._fallback(e)._astream(*args, **kwargs):
+                yield chunk
+
+
+def default_fallback_model(model: str) -> Optional[str]:
+    """Secondary model for a primary: LLM_FALLBACK_MODEL, or OPENAI_MODEL when they are the same."""
+    fallback = LLM_FALLBACK_MODEL if LLM_FALLBACK_MODEL != model else OPENAI_MODEL
+    return fallback if fallback and fallback != model else None
+
+
+def llm_model(llm: Any) -> Optional[str]:
+    """Model name of a crewai LLM or a LangChain chat model."""
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None)
+
+
+def _fallback_error(error: BaseException) -> Optional[BaseException]:
+    """Find an error worth a fallback in an exception and the errors it wraps."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, FALLBACK_ERRORS):
+            return error
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return None
+
+
+_lock = threading.Lock()
+_llms: Dict[Tuple, ChatOpenAI] = {}
+_agent_llms: Dict[Tuple, Any] = {}
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    """Connection limits shared by the sync and async pools."""
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONCURRENT_REQUESTS,
+        max_keepalive_connections=LLM_MAX_CONCURRENT_REQUESTS,
+        keepalive_expiry=LLM_KEEPALIVE_SECONDS
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    """Request timeout, and how long a request may wait for a free slot."""
+    return httpx.Timeout(LLM_REQUEST_TIMEOUT_SECONDS, pool=LLM_POOL_TIMEOUT_SECONDS)
+
+
+def get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Get the process-wide HTTP clients used for LLM requests.
+    
+    Both keep connections alive between requests and share one cap of
+    LLM_MAX_CONCURRENT_REQUESTS requests in flight; further requests wait
+    for a free slot, and fail with httpx.PoolTimeout after the pool timeout.
+    
+    Returns:
+        Tuple of the sync and async clients
+    """
+    global _http_client, _http_async_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(
+                transport=_CountingTransport(limits=_limits()),
+                timeout=_timeout()
+            )
+            _http_async_client = httpx.AsyncClient(
+                transport=_CountingAsyncTransport(limits=_limits()),
+                timeout=_timeout()
+            )
+            _share_with_litellm(_http_client, _http_async_client)
+            logger.info(
+                f"Initialized LLM connection pool (max {LLM_MAX_CONCURRENT_REQUESTS} requests, "
+                f"keep-alive {LLM_KEEPALIVE_SECONDS:.0f}s)"
+            )
+        return _http_client, _http_async_client
+
+
+def _share_with_litellm(http_client: httpx.Client, http_async_client: httpx.AsyncClient) -> None:
+    """Route litellm, which crewai uses for non-native providers, through the pool."""
+    try:
+        import litellm
+    except ImportError:
+        return
+    litellm.client_session = http_client
+    litellm.aclient_session = http_async_client
+
+
+def _pool_openai_clients(llm: Any, http_client: httpx.Client, http_async_client: httpx.AsyncClient) -> None:
+    """Point the OpenAI SDK clients of a crewai LLM at the pooled connections."""
+    for name, client_class, pooled in (
+        ("client", openai.OpenAI, http_client),
+        ("async_client", openai.AsyncOpenAI, http_async_client)
+    ):
+        client = getattr(llm, name, None)
+        if isinstance(client, client_class):
+            # with_options keeps the key, base URL, timeout and retries
+            setattr(llm, name, client.with_options(http_client=pooled))
+
+
+def get_llm(
+    temperature: float,
+    model: str = OPENAI_MODEL,
+    fallback_model: Optional[str] = "default",
+    **settings: Any
+) -> ChatOpenAI:
+    """
+    Get a chat model from the registry.
+    
+    One client is built per (model, temperature, fallback, settings) and every
+    client shares the pooled HTTP connections. Callers get a shallow copy, so
+    per-agent attributes such as callbacks stay separate while the
+    underlying OpenAI client and connections are reused. Models with a
+    fallback get a shorter timeout and fewer retries, then switch to the
+    fallback model instead of retrying the slow primary. Only temperature 0
+    clients use the LLM response cache; sampled calls such as a regenerated
+    plan must not replay an earlier answer.
+    
+    Args:
+        temperature: Sampling temperature
+        model: OpenAI chat model
+        fallback_model: Secondary model ("default" picks one, None disables the fallback)
+        **settings: Additional ChatOpenAI settings
+    
+    Returns:
+        ChatOpenAI instance
+    """
+    if fallback_model == "default":
+        fallback_model = default_fallback_model(model)
+    
+    key = (
+        model,
+        float(temperature),
+        fallback_model,
+        tuple(sorted((name, repr(value)) for name, value in settings.items()))
+    )
+    http_client, http_async_client = get_http_clients()
+    
+    # Streamed responses report token usage too, for usage accounting
+    with _lock:
+        llm = _llms.get(key)
+        if llm is None:
+            llm_class = ChatOpenAI
+            if fallback_model:
+                llm_class = FallbackChatOpenAI
+                settings = {
+                    "timeout": LLM_PRIMARY_TIMEOUT_SECONDS,
+                    "max_retries": LLM_PRIMARY_MAX_RETRIES,
+                    **settings,
+                    "fallback_model": fallback_model
+                }
+            llm = llm_class(
+                model=model,
+                temperature=temperature,
+                openai_api_key=OPENAI_API_KEY,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                cache=get_llm_cache() if temperature == 0 else False,
+                **{"stream_usage": True, **settings}
+            )
+            _llms[key] = llm
+            logger.info(
+                f"Registered LLM client {model} (temperature={temperature}"
+                + (f", fallback {fallback_model}" if fallback_model else "")
+                + f", {len(_llms)} total)"
+            )
+    
+    return llm.model_copy()
+
+
+def get_agent_llm(temperature: float, model: str = OPENAI_MODEL, **settings: Any) -> Any:
+    """
+    Get a crewai LLM from the registry for an Agent.
+    
+    crewai turns a LangChain chat model into its own LLM object and drops the
+    pooled HTTP clients on the way, so agents get a crewai LLM whose OpenAI
+    clients are rebuilt on the pooled connections instead. Callers get a
+    shallow copy, so per-agent attributes stay separate. Models with a
+    fallback get a shorter timeout and fewer retries; run their crews with
+    kickoff_with_fallback to switch models on failure.
+    
+    Args:
+        temperature: Sampling temperature
+        model: OpenAI chat model
+        **settings: Additional crewai LLM settings
+    
+    Returns:
+        crewai LLM instance
+    """
+    from crewai import LLM
+    
+    key = (model, float(temperature), tuple(sorted((name, repr(value)) for name, value in settings.items())))
+    http_client, http_async_client = get_http_clients()
+    
+    with _lock:
+        llm = _agent_llms.get(key)
+        if llm is None:
+            if default_fallback_model(model):
+                settings = {
+                    "timeout": LLM_PRIMARY_TIMEOUT_SECONDS,
+                    "max_retries": LLM_PRIMARY_MAX_RETRIES,
+                    **settings
+                }
+            llm = LLM(model=model, temperature=temperature, api_key=OPENAI_API_KEY, **settings)
+            _pool_openai_clients(llm, http_client, http_async_client)
+            _agent_llms[key] = llm
+            logger.info(
+                f"Registered agent LLM {model} (temperature={temperature}, "
+                f"{len(_llms) + len(_agent_llms)} total)"
+            )
+    
+    return copy.copy(llm)
+
+
+def _kickoff_cache_key(crew: Any, inputs: Dict) -> Optional[Tuple[str, str]]:
+    """
+    Cache key of a crew run, or None when its output is not reproducible.
+    
+    Only crews whose agents all run at temperature 0 without tools qualify;
+    the key covers every agent's model and instructions and every task.
+    """
+    agents = []
+    for agent in crew.agents:
+        if getattr(agent.llm, "temperature", None) != 0 or getattr(agent, "tools", None):
+            return None
+        agents.append([llm_model(agent.llm), agent.role, agent.goal, agent.backstory])
+    tasks = [[task.description, task.expected_output] for task in crew.tasks]
+    prompt = json.dumps({"agents": agents, "tasks": tasks, "inputs": inputs}, sort_keys=True, default=str)
+    return prompt, "crewai-kickoff"
+
+
+def kickoff_with_fallback(crew: Any, **kwargs: Any) -> Any:
+    """
+    Run a crew, retrying it once on the agents' fallback models.
+    
+    crewai does not keep FallbackChatOpenAI, so timeouts, connection errors,
+    rate limits and server errors of an agent model are caught around the
+    kickoff instead. The retry runs a copy of the crew whose agents use their
+    fallback models, leaving the original agents untouched, and streams into
+    the stream of the agents it replaces.
+    
+    crewai does not use the LangChain response cache either, so deterministic
+    crews (temperature 0, no tools) are memoized in the LLM response cache by
+    their agents, tasks and inputs; a hit returns the cached output text.
+    
+    Args:
+        crew: crewai Crew
+        **kwargs: Arguments of Crew.kickoff
+    
+    Returns:
+        The kickoff result, or the cached output text
+    """
+    cache = get_llm_cache()
+    cache_key = _kickoff_cache_key(crew, kwargs) if cache is not None else None
+    if cache_key is not None:
+        cached = cache.lookup(*cache_key)
+        if cached:
+            return cached[0].text
+    
+    result = _kickoff_with_fallback(crew, **kwargs)
+    if cache_key is not None:
+        cache.update(*cache_key, [Generation(text=str(result))])
+    return result
+
+
+def _kickoff_with_fallback(crew: Any, **kwargs: Any) -> Any:
+    """Run a crew, retrying it once on the agents' fallback models."""
+    try:
+        return crew.kickoff(**kwargs)
+    except Exception as e:
+        error = _fallback_error(e)
+        fallbacks = [
+            default_fallback_model(llm_model(agent.llm)) if llm_model(agent.llm) else None
+            for agent in crew.agents
+        ]
+        if error is None or not any(fallbacks):
+            raise
+        
+        logger.warning(
+            f"Crew failed ({type(error).__name__}), retrying on {', '.join(sorted(set(filter(None, fallbacks))))}"
+        )
+        with _stats.lock:
+            _stats.fallbacks += 1
+        
+        # Agents may be shared with concurrent runs, so the retry gets its own copies
+        retry_crew = crew.copy()
+        for agent, retry_agent, fallback in zip(crew.agents, retry_crew.agents, fallbacks):
+            if fallback:
+                retry_agent.llm = get_agent_llm(
+                    temperature=getattr(agent.llm, "temperature", None) or 0.0,
+                    model=fallback
+                )
+                follow_stream(agent.llm, retry_agent.llm)
+        return retry_crew.kickoff(**kwargs)
+
+
+def get_pool_stats() -> Dict:
+    """
+    Get statistics of the LLM client pool.
+    
+    Returns:
+        Dictionary with registered clients, open connections and request counts/latency;
+        in-flight counts cover requests from sending until their response is read
+    """
+    open_connections = 0
+    with _lock:
+        clients = len(_llms) + len(_agent_llms)
+        for client in (_http_client, _http_async_client):
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            open_connections += len(getattr(pool, "connections", []))
+    
+    with _stats.lock:
+        return {
+            "clients": clients,
+            "open_connections": open_connections,
+            "max_connections": LLM_MAX_CONCURRENT_REQUESTS,
+            "requests": _stats.requests,
+            "in_flight": _stats.in_flight,
+            "max_in_flight": _stats.max_in_flight,
+            "fallbacks": _stats.fallbacks,
+            "avg_request_ms": _stats.total_ms / _stats.requests if _stats.requests else 0.0
+        }
@@ -0,0 +1,186 @@
+"""Model tier routing for crew agents under per-run latency and cost budgets."""
+
+import threading
+import time
+from typing import Dict, Optional
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    OPENAI_MODEL,
+    MODEL_TIER_SMALL,
+    EXTRACTION_MODEL,
+    RESEARCH_MODEL,
+    PLANNING_MODEL,
+    RAG_MODEL,
+    MODEL_ROUTER_ENABLED,
+    ROUTER_LARGE_INPUT_TOKENS,
+    ROUTER_LATENCY_BUDGET_SECONDS,
+    ROUTER_COST_BUDGET_USD
+)
+
+
+# Configured model of each agent
+AGENT_MODELS = {
+    "extraction": EXTRACTION_MODEL,
+    "research": RESEARCH_MODEL,
+    "planning": PLANNING_MODEL,
+    "rag": RAG_MODEL
+}
+
+# Agents whose output quality must not be traded for latency or cost
+PINNED_AGENTS = {"planning", "rag"}
+
+# USD per million tokens and rough generation speed, used for estimates
+MODEL_PROFILES = {
+    "gpt-4o": {"input_usd_per_1m": 2.50, "output_usd_per_1m": 10.00, "base_ms": 600, "ms_per_output_token": 15},
+    "gpt-4o-mini": {"input_usd_per_1m": 0.15, "output_usd_per_1m": 0.60, "base_ms": 400, "ms_per_output_token": 8},
+    "gpt-4.1": {"input_usd_per_1m": 2.00, "output_usd_per_1m": 8.00, "base_ms": 600, "ms_per_output_token": 15},
+    "gpt-4.1-mini": {"input_usd_per_1m": 0.40, "output_usd_per_1m": 1.60, "base_ms": 400, "ms_per_output_token": 8}
+}
+
+
+def estimate_call(model: str, input_tokens: int, output_tokens: int) -> Dict:
+    """
+    Estimate the latency and cost of one model call.
+    
+    Args:
+        model: OpenAI chat model
+        input_tokens: Prompt tokens
+        output_tokens: Expected completion tokens
+    
+    Returns:
+        Dictionary with latency_seconds and cost_usd (None for unknown models)
+    """
+    profile = MODEL_PROFILES.get(model)
+    if profile is None:
+        return {"latency_seconds": None, "cost_usd": None}
+    return {
+        "latency_seconds": (profile["base_ms"] + output_tokens * profile["ms_per_output_token"]) / 1000,
+        "cost_usd": (
+            input_tokens * profile["input_usd_per_1m"] + output_tokens * profile["output_usd_per_1m"]
+        ) / 1_000_000
+    }
+
+
+class RunBudget:
+    """Latency and cost allowance of one crew run (0 disables a limit)."""
+    
+    def __init__(
+        self,
+        latency_seconds: float = ROUTER_LATENCY_BUDGET_SECONDS,
+        cost_usd: float = ROUTER_COST_BUDGET_USD
+    ):
+        """
+        Initialize the budget.
+        
+        Args:
+            latency_seconds: Wall-clock allowance of the run
+            cost_usd: Estimated spend allowance of the run
+        """
+        self.latency_seconds = latency_seconds
+        self.cost_usd = cost_usd
+        self.started = time.monotonic()
+        self.spent_usd = 0.0
+        self._lock = threading.Lock()
+    
+    def remaining_seconds(self) -> Optional[float]:
+        """Seconds left in the latency budget, or None without one."""
+        if not self.latency_seconds:
+            return None
+        return self.latency_seconds - (time.monotonic() - self.started)
+    
+    def remaining_usd(self) -> Optional[float]:
+        """Dollars left in the cost budget, or None without one."""
+        if not self.cost_usd:
+            return None
+        with self._lock:
+            return self.cost_usd - self.spent_usd
+    
+    def charge(self, cost_usd: Optional[float]) -> None:
+        """Record the estimated cost of a routed call."""
+        if cost_usd:
+            with self._lock:
+                self.spent_usd += cost_usd
+
+
+class ModelRouter:
+    """
+    Pick the model tier of each agent call.
+    
+    Unpinned agents move up to OPENAI_MODEL for inputs above
+    ROUTER_LARGE_INPUT_TOKENS, and down to the small tier whenever the
+    estimate of the chosen model would overrun what is left of the run's
+    latency or cost budget. Pinned agents always get their configured model.
+    """
+    
+    def __init__(self, enabled: bool = MODEL_ROUTER_ENABLED, large_input_tokens: int = ROUTER_LARGE_INPUT_TOKENS):
+        """
+        Initialize the router.
+        
+        Args:
+            enabled: Route calls; when off every agent gets its configured model
+            large_input_tokens: Input size above which the large tier is preferred
+        """
+        self.enabled = enabled
+        self.large_input_tokens = large_input_tokens
+    
+    def route(
+        self,
+        agent: str,
+        input_tokens: int = 0,
+        output_tokens: int = 1000,
+        budget: Optional[RunBudget] = None,
+        calls: int = 1
+    ) -> str:
+        """
+        Choose the model for an agent call.
+        
+        Args:
+            agent: Agent name (extraction, research, planning, rag)
+            input_tokens: Prompt tokens of the call
+            output_tokens: Expected completion tokens of the call
+            budget: Budget of the current crew run
+            calls: Number of parallel calls made with this routing decision
+        
+        Returns:
+            Model name
+        """
+        model = AGENT_MODELS.get(agent, OPENAI_MODEL)
+        if not self.enabled or agent in PINNED_AGENTS:
+            return model
+        
+        reason = None
+        if input_tokens > self.large_input_tokens and model != OPENAI_MODEL:
+            model, reason = OPENAI_MODEL, f"{input_tokens} input tokens"
+        
+        if budget is not None and model != MODEL_TIER_SMALL:
+            estimate = estimate_call(model, input_tokens, output_tokens)
+            remaining_seconds = budget.remaining_seconds()
+            remaining_usd = budget.remaining_usd()
+            if remaining_seconds is not None and estimate["latency_seconds"] is not None \
+                    and estimate["latency_seconds"] > remaining_seconds:
+                model, reason = MODEL_TIER_SMALL, f"{remaining_seconds:.1f}s of latency budget left"
+            elif remaining_usd is not None and estimate["cost_usd"] is not None \
+                    and estimate["cost_usd"] * calls > remaining_usd:
+                model, reason = MODEL_TIER_SMALL, f"${remaining_usd:.4f} of cost budget left"
+        
+        if budget is not None:
+            budget.charge((estimate_call(model, input_tokens, output_tokens)["cost_usd"] or 0.0) * calls)
+        
+        if reason:
+            logger.info(f"Routed {agent} to {model} ({reason})")
+        return model
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,190 @@
+"""Second-stage cross-encoder reranking of retrieved chunks."""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import RERANK_MODEL, RERANK_LATENCY_BUDGET_MS, RERANK_CACHE_SIZE, RERANK_PROBE_EVERY
+
+
+class CrossEncoderReranker:
+    """
+    Rerank vector search candidates with a local CPU cross-encoder.
+    
+    The model loads on a background thread; until it is ready, or whenever the
+    estimated cost of scoring the uncached pairs exceeds the latency budget,
+    candidates are returned in their original order. Every probe_every-th
+    skipped call still scores the pairs the budget allows, so the per-pair
+    cost estimate recovers once the machine is less loaded.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS,
+        cache_size: int = RERANK_CACHE_SIZE,
+        probe_every: int = RERANK_PROBE_EVERY
+    ):
+        """
+        Initialize the reranker and start loading the model.
+        
+        Args:
+            model_name: sentence-transformers cross-encoder model
+            latency_budget_ms: Maximum expected scoring time per call
+            cache_size: Number of (query, chunk) scores kept in memory
+            probe_every: Re-measure the per-pair cost on every this many skipped calls (0 disables)
+        """
+        self.model_name = model_name
+        self.latency_budget_ms = latency_budget_ms
+        self.cache_size = cache_size
+        self.probe_every = probe_every
+        
+        self.model = None
+        self._ms_per_pair: Optional[float] = None
+        self._scores: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._predict_lock = threading.Lock()
+        self._reranked = 0
+        self._skipped = 0
+        self._probes = 0
+        
+        self._loader = threading.Thread(target=self._load, name="reranker-loader", daemon=True)
+        self._loader.start()
+    
+    def _load(self) -> None:
+        """Load the model and calibrate the per-pair scoring cost."""
+        try:
+            from sentence_transformers import CrossEncoder
+            
+            model = CrossEncoder(self.model_name, device="cpu")
+            
+            # Warm up and measure one batch so the budget check has an estimate
+            pairs = [("warm up query", "warm up passage " * 50)] * 16
+            start = time.perf_counter()
+            model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+            self._ms_per_pair = (time.perf_counter() - start) * 1000 / len(pairs)
+            self.model = model
+            
+            logger.info(f"Loaded reranker {self.model_name} ({self._ms_per_pair:.2f}ms per pair)")
+            
+        except ImportError:
+            logger.warning("sentence-transformers is not installed; reranking is disabled")
+        except Exception as e:
+            logger.error(f"Error loading reranker {self.model_name}: {str(e)}")
+    
+    @property
+    def ready(self) -> bool:
+        """Whether the model is loaded."""
+        return self.model is not None
+    
+    @staticmethod
+    def _pair_key(query: str, chunk_id: str, text: str) -> Tuple[str, str]:
+        """Build the cache key of a (query, chunk) pair."""
+        return (
+            hashlib.md5(query.encode("utf-8")).hexdigest(),
+            chunk_id or hashlib.md5(text.encode("utf-8")).hexdigest()
+        )
+    
+    def rerank(self, query: str, results: Dict, top_n: int = 5) -> Dict:
+        """
+        Reorder query results by cross-encoder relevance and keep the top_n.
+        
+        Args:
+            query: Query string
+            results: Dictionary with ids, documents, metadatas, and distances
+            top_n: Number of results to keep
+        
+        Returns:
+            Results of the same shape, reranked when within the latency budget
+        """
+        documents = results.get("documents") or []
+        keep = {key: values[:top_n] for key, values in results.items()}
+        if len(documents) <= 1 or not self.ready:
+            return keep
+        
+        ids = results.get("ids") or [None] * len(documents)
+        keys = [self._pair_key(query, chunk_id, doc or "") for chunk_id, doc in zip(ids, documents)]
+        
+        with self._lock:
+            scores = [self._scores.get(key) for key in keys]
+            for key, score in zip(keys, scores):
+                if score is not None:
+                    self._scores.move_to_end(key)
+        
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            estimate_ms = len(missing) * self._ms_per_pair
+            if estimate_ms > self.latency_budget_ms:
+                with self._lock:
+                    self._skipped += 1
+                    probe = bool(self.probe_every) and self._skipped % self.probe_every == 0
+                    if probe:
+                        self._probes += 1
+                logger.info(
+                    f"Skipped rerank of {len(missing)} pairs "
+                    f"(estimated {estimate_ms:.0f}ms > {self.latency_budget_ms:.0f}ms budget)"
+                )
+                if probe:
+                    # Score what the budget allows so a stale, pessimistic estimate gets corrected
+                    affordable = max(1, int(self.latency_budget_ms / self._ms_per_pair))
+                    self._score(query, documents, keys, scores, missing[:affordable])
+                return keep
+            
+            self._score(query, documents, keys, scores, missing)
+        
+        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)[:top_n]
+        with self._lock:
+            self._reranked += 1
+        
+        logger.info(f"Reranked {len(documents)} candidates ({len(missing)} scored, {len(documents) - len(missing)} cached)")
+        return {key: [values[i] for i in order] for key, values in results.items()}
+    
+    def _score(self, query: str, documents: List, keys: List[Tuple[str, str]], scores: List, indices: List[int]) -> None:
+        """Score the uncached pairs at indices in one forward pass, then update the cost estimate and cache."""
+        pairs = [(query, documents[i] or "") for i in indices]
+        start = time.perf_counter()
+        with self._predict_lock:
+            predicted = self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        with self._lock:
+            self._ms_per_pair = 0.8 * self._ms_per_pair + 0.2 * elapsed_ms / len(pairs)
+            for i, score in zip(indices, predicted):
+                scores[i] = float(score)
+                self._scores[keys[i]] = scores[i]
+            while len(self._scores) > self.cache_size:
+                self._scores.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        """
+        Get reranker statistics.
+        
+        Returns:
+            Dictionary with readiness, per-pair cost, cache size and call and probe counts
+        """
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "ms_per_pair": self._ms_per_pair,
+                "cached_scores": len(self._scores),
+                "reranked": self._reranked,
+                "skipped": self._skipped,
+                "probes": self._probes
+            }
+
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker:
+    """Get the process-wide reranker."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
@@ -0,0 +1,98 @@
+"""Parse key topics out of extraction output and merge per-topic research results."""
+
+import re
+from typing import Dict, List
+from urllib.parse import urlsplit
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import RESEARCH_MAX_TOPICS
+
+
+KEY_TOPICS_HEADING = re.compile(r"^[#*\s\d.]*key topics\b", re.IGNORECASE)
+LIST_ITEM = re.compile(r"^\s*(?:[-*+\u2022]|\d+[.)])\s+(.*)$")
+
+URL_PATTERN = re.compile(r"https?://[^\s)\]>\"'<]+")
+
+
+def extract_key_topics(assignment_details: str, max_topics: int = RESEARCH_MAX_TOPICS) -> List[str]:
+    """
+    Read the key topics list from the extraction output.
+    
+    Args:
+        assignment_details: Output of the extraction task
+        max_topics: Maximum number of topics to return
+    
+    Returns:
+        Distinct topic names in order (empty if no list was found)
+    """
+    topics: List[str] = []
+    seen = set()
+    in_section = False
+    
+    for line in assignment_details.splitlines():
+        if KEY_TOPICS_HEADING.match(line):
+            in_section = True
+            # Topics may follow the heading on the same line
+            inline = line.split(":", 1)[1] if ":" in line else ""
+            candidates = [part for part in re.split(r"[;,]", inline) if part.strip()]
+        elif in_section:
+            item = LIST_ITEM.match(line)
+            if item:
+                candidates = [item.group(1)]
+            elif not line.strip():
+                if topics:
+                    break
+                continue
+            else:
+                break
+        else:
+            continue
+        
+        for candidate in candidates:
+            # Keep the topic name, not its description
+            topic = re.split(r"\s+[-\u2013\u2014]\s+|:\s", candidate.replace("**", "").strip(), maxsplit=1)[0]
+            topic = topic.strip(" .:*`")
+            if topic and topic.lower() not in seen:
+                seen.add(topic.lower())
+                topics.append(topic)
+    
+    return topics[:max_topics]
+
+
+def _normalize_url(url: str) -> str:
+    """Normalize a URL for duplicate detection."""
+    parts = urlsplit(url.rstrip(".,;:"))
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}" + (f"?{parts.query}" if parts.query else "")
+
+
+def merge_resources(topic_results: Dict[str, str]) -> str:
+    """
+    Merge per-topic resource lists, dropping resources already listed for an earlier topic.
+    
+    Args:
+        topic_results: Research output keyed by topic, in topic order
+    
+    Returns:
+        Resources grouped under one heading per topic
+    """
+    seen = set()
+    sections = []
+    duplicates = 0
+    
+    for topic, text in topic_results.items():
+        lines = []
+        for line in text.splitlines():
+            urls = {_normalize_url(url) for url in URL_PATTERN.findall(line)}
+            if urls and urls <= seen:
+                duplicates += 1
+                continue
+            seen.update(urls)
+            lines.append(line)
+        sections.append(f"## {topic}\n" + "\n".join(lines).strip())
+    
+    logger.info(f"Merged resources for {len(topic_results)} topics ({len(seen)} unique URLs, {duplicates} duplicates dropped)")
+    return "\n\n".join(sections)
@@ -0,0 +1,114 @@
+"""Calendar skeleton of a study plan computed from the current date and deadline."""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import STUDY_HOURS_PER_DAY, STUDY_BUFFER_RATIO
+
+
+def _format_day(day: date) -> str:
+    """Format a date compactly, e.g. 'Mon Oct 19'."""
+    return day.strftime("%a %b %d")
+
+
+def build_schedule_skeleton(
+    current_date: datetime,
+    deadline: datetime,
+    hours_per_day: float = STUDY_HOURS_PER_DAY,
+    buffer_ratio: float = STUDY_BUFFER_RATIO
+) -> Dict:
+    """
+    Split the time until the deadline into study weeks and a final buffer.
+    
+    Today counts as a study day; the deadline day does not unless the
+    deadline is today. About buffer_ratio of the days (at least one when
+    three or more days are available) are reserved at the end for review and
+    submission.
+    
+    Args:
+        current_date: Current datetime
+        deadline: The deadline datetime
+        hours_per_day: Planned study hours per day
+        buffer_ratio: Share of days reserved as buffer
+    
+    Returns:
+        Dictionary with day counts, hour budgets, weeks and the buffer period
+    """
+    start = current_date.date()
+    days = (deadline.date() - start).days
+    if deadline > current_date:
+        days = max(days, 1)
+    days = max(days, 0)
+    
+    buffer_days = min(max(round(days * buffer_ratio), 1 if days >= 3 else 0), max(days - 1, 0))
+    study_days = days - buffer_days
+    
+    weeks: List[Dict] = []
+    for week_start in range(0, study_days, 7):
+        week_days = min(7, study_days - week_start)
+        weeks.append({
+            "week": len(weeks) + 1,
+            "start": start + timedelta(days=week_start),
+            "end": start + timedelta(days=week_start + week_days - 1),
+            "days": week_days,
+            "hours": week_days * hours_per_day
+        })
+    
+    buffer = None
+    if buffer_days:
+        buffer = {
+            "start": start + timedelta(days=study_days),
+            "end": start + timedelta(days=days - 1),
+            "days": buffer_days,
+            "hours": buffer_days * hours_per_day
+        }
+    
+    return {
+        "current_date": start,
+        "deadline": deadline,
+        "days_remaining": days,
+        "study_days": study_days,
+        "buffer_days": buffer_days,
+        "hours_per_day": hours_per_day,
+        "study_hours": study_days * hours_per_day,
+        "total_hours": days * hours_per_day,
+        "weeks": weeks,
+        "buffer": buffer
+    }
+
+
+def format_schedule_skeleton(skeleton: Dict) -> str:
+    """
+    Render a schedule skeleton as compact prompt input.
+    
+    Args:
+        skeleton: Output of build_schedule_skeleton
+    
+    Returns:
+        One line per fact, week and buffer period
+    """
+    if not skeleton["days_remaining"]:
+        return (
+            f"Today: {_format_day(skeleton['current_date'])}; the deadline "
+            f"({skeleton['deadline'].strftime('%a %b %d %I:%M %p')}) has passed. Plan an immediate catch-up."
+        )
+    
+    lines = [
+        f"Today: {_format_day(skeleton['current_date'])}; "
+        f"deadline: {skeleton['deadline'].strftime('%a %b %d %I:%M %p')}",
+        f"{skeleton['days_remaining']} days = {skeleton['study_days']} study + {skeleton['buffer_days']} buffer; "
+        f"{skeleton['hours_per_day']:g}h/day; {skeleton['total_hours']:g}h total",
+    ]
+    for week in skeleton["weeks"]:
+        lines.append(
+            f"Week {week['week']}: {_format_day(week['start'])} - {_format_day(week['end'])} "
+            f"({week['days']}d, {week['hours']:g}h)"
+        )
+    if skeleton["buffer"]:
+        buffer = skeleton["buffer"]
+        lines.append(
+            f"Buffer: {_format_day(buffer['start'])} - {_format_day(buffer['end'])} "
+            f"({buffer['days']}d, {buffer['hours']:g}h) for review and submission"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,762 @@
+"""In-memory session index tier with spill to the persistent vector store."""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional, Set, Tuple
+import numpy as np
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    SESSION_MEMORY_BUDGET_MB,
+    SESSION_TOTAL_MEMORY_MB,
+    SESSION_IDLE_TTL_MINUTES
+)
+from src.utils.document_registry import get_document_registry
+from src.utils.snapshot import read_snapshot, write_snapshot
+from src.utils.vector_store import BaseVectorStore, make_chunk_id
+
+
+SESSION_TAGS = ("session_id", "session_saved_at")
+
+_FILTER_OPERATORS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$gt": lambda value, operand: value > operand,
+    "$gte": lambda value, operand: value >= operand,
+    "$lt": lambda value, operand: value < operand,
+    "$lte": lambda value, operand: value <= operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand
+}
+
+
+def matches_where(metadata: Dict, where: Dict) -> bool:
+    """
+    Evaluate a ChromaDB metadata filter against the metadata of one chunk.
+    
+    Args:
+        metadata: Chunk metadata
+        where: Filter using $and, $or and the $eq, $ne, $gt, $gte, $lt, $lte, $in and $nin operators
+    
+    Returns:
+        True if the chunk matches
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        else:
+            # Like ChromaDB, a chunk without the key matches no condition on it
+            if key not in metadata:
+                return False
+            conditions = condition if isinstance(condition, dict) else {"$eq": condition}
+            for operator, operand in conditions.items():
+                if operator not in _FILTER_OPERATORS:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if not _FILTER_OPERATORS[operator](metadata[key], operand):
+                    return False
+    return True
+
+
+def _chunk_nbytes(chunk: Dict) -> int:
+    """Approximate memory held by a chunk's text and metadata."""
+    return len(chunk["text"].encode("utf-8")) + len(json.dumps(chunk.get("metadata") or {}))
+
+
+class InMemoryIndex:
+    """Brute-force cosine index over normalized vectors held in RAM."""
+    
+    def __init__(self):
+        """Initialize an empty index."""
+        self.ids: List[str] = []
+        self.chunks: List[Dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.nbytes = 0
+    
+    def add(self, chunks: List[Dict], embeddings: List[List[float]]) -> None:
+        """
+        Add chunks and their embeddings, skipping ids already present.
+        
+        Args:
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Embeddings, one per chunk
+        """
+        known = set(self.ids)
+        new_chunks, new_vectors = [], []
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk_id = make_chunk_id(chunk)
+            if chunk_id in known:
+                continue
+            known.add(chunk_id)
+            self.ids.append(chunk_id)
+            new_chunks.append(chunk)
+            new_vectors.append(embedding)
+        
+        if not new_chunks:
+            return
+        
+        vectors = np.asarray(new_vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors /= norms
+        
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        self.chunks.extend(new_chunks)
+        self.nbytes += vectors.nbytes + sum(_chunk_nbytes(chunk) for chunk in new_chunks)
+    
+    def _matching(self, where: Optional[Dict] = None) -> List[int]:
+        """Get the positions of the chunks matching a metadata filter."""
+        if where is None:
+            return list(range(len(self.ids)))
+        return [i for i, chunk in enumerate(self.chunks) if matches_where(chunk.get("metadata") or {}, where)]
+    
+    def query(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        include_embeddings: bool = False,
+        where: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Return the nearest chunks by cosine distance.
+        
+        Args:
+            query_embedding: Query embedding vector
+            n_results: Number of results to return
+            include_embeddings: Also return the result embeddings
+            where: Optional metadata filter
+        
+        Returns:
+            Dictionary with ids, documents, metadatas, and distances (and embeddings)
+        """
+        candidates = np.asarray(self._matching(where), dtype=int) if self.vectors is not None else np.empty(0, dtype=int)
+        if not len(candidates):
+            empty = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            if include_embeddings:
+                empty["embeddings"] = []
+            return empty
+        
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        distances = 1.0 - self.vectors[candidates] @ query
+        
+        k = min(n_results, len(candidates))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        rows = candidates[top]
+        
+        results = {
+            "ids": [self.ids[i] for i in rows],
+            "documents": [self.chunks[i]["text"] for i in rows],
+            "metadatas": [self.chunks[i]["metadata"] for i in rows],
+            "distances": [float(distance) for distance in distances[top]]
+        }
+        if include_embeddings:
+            results["embeddings"] = [self.vectors[i] for i in rows]
+        return results
+    
+    def count(self, where: Optional[Dict] = None) -> int:
+        """Get the number of chunks in the index, optionally matching a metadata filter."""
+        return len(self.ids) if where is None else len(self._matching(where))
+    
+    def delete(self, where: Dict) -> List[Dict]:
+        """
+        Remove the chunks matching a metadata filter.
+        
+        Args:
+            where: Metadata filter
+        
+        Returns:
+            Removed chunks
+        """
+        removed = set(self._matching(where))
+        if not removed:
+            return []
+        
+        kept = [i for i in range(len(self.ids)) if i not in removed]
+        deleted = [self.chunks[i] for i in sorted(removed)]
+        self.ids = [self.ids[i] for i in kept]
+        self.chunks = [self.chunks[i] for i in kept]
+        self.vectors = self.vectors[kept] if kept else None
+        self.nbytes = (self.vectors.nbytes if kept else 0) + sum(_chunk_nbytes(chunk) for chunk in self.chunks)
+        return deleted
+
+
+class _Session:
+    """State of one session in the hot tier."""
+    
+    def __init__(self):
+        self.index = InMemoryIndex()
+        self.last_access = time.monotonic()
+        self.spilled = False
+        self.embedding_model: Optional[str] = None
+        self.write_lock = threading.Lock()
+
+
+class SessionIndexManager:
+    """
+    Hold per-session indexes in memory and spill them to the persistent store.
+    
+    Sessions are served from RAM until they are explicitly saved or grow past
+    the per-session memory budget; then their chunks are written to the
+    persistent store tagged with 'session_id' and queried from there. When the
+    hot tier exceeds its total budget, the least recently used in-memory
+    sessions are spilled as well, and sessions idle longer than the TTL are
+    spilled and released from memory; nothing is lost until the persistent
+    copy expires.
+    """
+    
+    def __init__(
+        self,
+        persistent_store: BaseVectorStore,
+        ingestion_queue=None,
+        session_budget_mb: float = SESSION_MEMORY_BUDGET_MB,
+        total_budget_mb: float = SESSION_TOTAL_MEMORY_MB,
+        idle_ttl_minutes: float = SESSION_IDLE_TTL_MINUTES
+    ):
+        """
+        Initialize the session tier.
+        
+        Args:
+            persistent_store: Store that spilled sessions are written to
+            ingestion_queue: Optional IngestionQueue used for spill writes
+            session_budget_mb: Memory budget per session before it spills
+            total_budget_mb: Memory budget for all in-memory sessions
+            idle_ttl_minutes: Idle time after which a session is spilled and released
+        """
+        self.persistent_store = persistent_store
+        self.ingestion_queue = ingestion_queue
+        self.session_budget = int(session_budget_mb * 1024 * 1024)
+        self.total_budget = int(total_budget_mb * 1024 * 1024)
+        self.idle_ttl = idle_ttl_minutes * 60
+        
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.RLock()
+        get_document_registry().add_reference_source(self)
+        
+        logger.info(
+            f"Initialized SessionIndexManager (session budget={session_budget_mb}MB, "
+            f"total budget={total_budget_mb}MB, idle TTL={idle_ttl_minutes}min)"
+        )
+    
+    def _touch(self, session_id: str) -> _Session:
+        """Get or create a session and mark it most recently used (call without holding the lock)."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = time.monotonic()
+                self._sessions.move_to_end(session_id)
+                return session
+        
+        # Sessions released after a spill, or saved before a restart, live in the persistent store;
+        # looking them up there must not hold up the other sessions
+        spilled = self.persistent_store.count_documents({"session_id": session_id}) > 0
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = _Session()
+                session.spilled = spilled
+                self._sessions[session_id] = session
+            session.last_access = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return session
+    
+    def _write_persistent(
+        self,
+        session_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        embedding_model: Optional[str] = None
+    ) -> None:
+        """Write chunks tagged with the session id to the persistent store."""
+        saved_at = int(time.time())
+        tagged = [
+            {
+                **chunk,
+                "metadata": {
+                    **(chunk.get("metadata") or {}),
+                    "session_id": session_id,
+                    "session_saved_at": saved_at
+                }
+            }
+            for chunk in chunks
+        ]
+        if self.ingestion_queue is not None:
+            self.ingestion_queue.submit(tagged, embeddings=embeddings, embedding_model=embedding_model).result()
+        else:
+            self.persistent_store.add_documents(tagged, embeddings=embeddings, embedding_model=embedding_model)
+    
+    @staticmethod
+    def _scoped(session_id: str, where: Optional[Dict] = None) -> Dict:
+        """Restrict a metadata filter to the persistent chunks of one session."""
+        return {"$and": [{"session_id": session_id}, where]} if where else {"session_id": session_id}
+    
+    def _spill(self, session_id: str, session: _Session) -> None:
+        """Move a session's in-memory chunks to the persistent store (caller holds its write lock)."""
+        index = session.index
+        if index.count():
+            self._write_persistent(session_id, index.chunks, index.vectors.tolist(), session.embedding_model)
+        
+        with self._lock:
+            session.index = InMemoryIndex()
+            session.spilled = True
+        
+        logger.info(f"Spilled session {session_id} ({index.count()} chunks) to persistent store")
+    
+    def add(
+        self,
+        session_id: str,
+        chunks: List[Dict],
+        embeddings: List[List[float]],
+        embedding_model: Optional[str] = None
+    ) -> None:
+        """
+        Add embedded chunks to a session.
+        
+        Args:
+            session_id: Session identifier
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Embeddings, one per chunk
+            embedding_model: Model the embeddings were made with (defaults to the persistent store's)
+        """
+        embedding_model = embedding_model or self.persistent_store.embedding_model
+        session = self._touch(session_id)
+        
+        # Persistent writes happen outside the manager lock so other sessions keep serving queries
+        victims = []
+        with session.write_lock:
+            # Never mix vectors of two embedding models in one in-memory index
+            if not session.spilled and session.index.count() and session.embedding_model != embedding_model:
+                self._spill(session_id, session)
+            
+            if session.spilled:
+                self._write_persistent(session_id, chunks, embeddings, embedding_model)
+                return
+            
+            with self._lock:
+                session.embedding_model = embedding_model
+                session.index.add(chunks, embeddings)
+                over_budget = session.index.nbytes > self.session_budget
+                victims = self._select_evictions(keep=session_id)
+            
+            if over_budget:
+                self._spill(session_id, session)
+        
+        # Other sessions are spilled after releasing this one's write lock
+        self._evict(victims)
+    
+    def query(
+        self,
+        session_id: str,
+        query_embedding: List[float],
+        n_results: int = 5,
+        include_embeddings: bool = False,
+        where: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Query a session from RAM, or from the persistent store once spilled.
+        
+        Args:
+            session_id: Session identifier
+            query_embedding: Query embedding vector
+            n_results: Number of results to return
+            include_embeddings: Also return the result embeddings
+            where: Optional metadata filter
+        
+        Returns:
+            Dictionary with ids, documents, metadatas, and distances (and embeddings)
+        """
+        session = self._touch(session_id)
+        with self._lock:
+            stale = (
+                not session.spilled
+                and session.index.count() > 0
+                and session.embedding_model != self.persistent_store.embedding_model
+            )
+        
+        # After an embedding model switch the session is re-embedded into the persistent store
+        if stale:
+            with session.write_lock:
+                if not session.spilled:
+                    self._spill(session_id, session)
+        
+        with self._lock:
+            if not session.spilled:
+                return session.index.query(
+                    query_embedding,
+                    n_results=n_results,
+                    include_embeddings=include_embeddings,
+                    where=where
+                )
+        
+        return self.persistent_store.query_by_embedding(
+            query_embedding,
+            n_results=n_results,
+            where=self._scoped(session_id, where),
+            include_embeddings=include_embeddings,
+            hydrate=False
+        )
+    
+    def count(self, session_id: str, where: Optional[Dict] = None) -> int:
+        """Get the number of chunks stored for a session, optionally matching a metadata filter."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and not session.spilled:
+                return session.index.count(where)
+        
+        return self.persistent_store.count_documents(self._scoped(session_id, where))
+    
+    def delete(self, session_id: str, where: Dict) -> None:
+        """
+        Remove the chunks of a session that match a metadata filter.
+        
+        Args:
+            session_id: Session identifier
+            where: Metadata filter
+        """
+        session = self._touch(session_id)
+        
+        with session.write_lock:
+            if session.spilled:
+                self.persistent_store.delete_documents(self._scoped(session_id, where))
+                return
+            with self._lock:
+                deleted = session.index.delete(where)
+        
+        doc_ids = {chunk["metadata"]["doc_id"] for chunk in deleted if "doc_id" in (chunk.get("metadata") or {})}
+        if doc_ids:
+            get_document_registry().prune(doc_ids)
+    
+    def records(self, session_id: str, where: Optional[Dict] = None) -> Dict:
+        """
+        Get the chunks of a session together with their embeddings.
+        
+        Args:
+            session_id: Session identifier
+            where: Optional metadata filter
+        
+        Returns:
+            Dictionary with ids, embeddings, documents, metadatas and the embedding_model
+        """
+        session = self._touch(session_id)
+        with self._lock:
+            if not session.spilled:
+                index = session.index
+                rows = index._matching(where)
+                return {
+                    "ids": [index.ids[i] for i in rows],
+                    "embeddings": [index.vectors[i] for i in rows],
+                    "documents": [index.chunks[i]["text"] for i in rows],
+                    "metadatas": [index.chunks[i]["metadata"] for i in rows],
+                    "embedding_model": session.embedding_model or self.persistent_store.embedding_model
+                }
+        
+        records = self.persistent_store.get_records(self._scoped(session_id, where))
+        return {**records, "embedding_model": self.persistent_store.embedding_model}
+    
+    def save(self, session_id: str) -> None:
+        """
+        Persist a session so it survives eviction and restarts.
+        
+        Args:
+            session_id: Session identifier
+        """
+        session = self._touch(session_id)
+        
+        with session.write_lock:
+            if not session.spilled:
+                self._spill(session_id, session)
+    
+    def clear(self, session_id: str) -> None:
+        """
+        Remove all chunks of a session from both tiers.
+        
+        Args:
+            session_id: Session identifier
+        """
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        
+        # Released sessions are no longer tracked but may still have persistent chunks
+        if session is None or session.spilled:
+            self.persistent_store.delete_documents({"session_id": session_id})
+        logger.info(f"Cleared session {session_id}")
+    
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """
+        Get the registry documents that in-memory sessions still point to.
+        
+        Args:
+            doc_ids: Document ids to check
+        
+        Returns:
+            Subset of doc_ids with at least one chunk held in memory
+        """
+        wanted = set(doc_ids)
+        with self._lock:
+            return {
+                chunk["metadata"]["doc_id"]
+                for session in self._sessions.values()
+                for chunk in session.index.chunks
+                if (chunk.get("metadata") or {}).get("doc_id") in wanted
+            }
+    
+    def _select_evictions(self, keep: Optional[str] = None) -> List[Tuple[str, _Session]]:
+        """Pick idle sessions, then LRU in-memory sessions until under the total budget (caller holds the lock)."""
+        now = time.monotonic()
+        victims = [
+            (session_id, session) for session_id, session in self._sessions.items()
+            if session_id != keep and now - session.last_access > self.idle_ttl
+        ]
+        chosen = {id(session) for _, session in victims}
+        memory = self.memory_bytes() - sum(session.index.nbytes for _, session in victims)
+        
+        for session_id, session in self._sessions.items():
+            if memory <= self.total_budget:
+                break
+            if session_id == keep or session.spilled or id(session) in chosen:
+                continue
+            victims.append((session_id, session))
+            memory -= session.index.nbytes
+        return victims
+    
+    def _evict(self, victims: List[Tuple[str, _Session]]) -> None:
+        """Spill evicted sessions to the persistent store and release the idle ones from memory."""
+        for session_id, session in victims:
+            with session.write_lock:
+                if not session.spilled:
+                    self._spill(session_id, session)
+                    logger.info(f"Evicted session {session_id} to the persistent store")
+            
+            with self._lock:
+                idle = time.monotonic() - session.last_access > self.idle_ttl
+                if idle and self._sessions.get(session_id) is session:
+                    del self._sessions[session_id]
+                    logger.info(f"Released idle session {session_id}")
+    
+    def evict_idle(self) -> None:
+        """Spill and release sessions idle longer than the TTL, and enforce the total budget."""
+        with self._lock:
+            victims = self._select_evictions()
+        self._evict(victims)
+    
+    def memory_bytes(self) -> int:
+        """Get the approximate memory held by all in-memory sessions."""
+        return sum(session.index.nbytes for session in self._sessions.values())
+    
+    def stats(self) -> Dict:
+        """
+        Get hot-tier statistics.
+        
+        Returns:
+            Dictionary with session counts and memory usage
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "spilled_sessions": sum(1 for s in self._sessions.values() if s.spilled),
+                "memory_bytes": self.memory_bytes(),
+                "total_budget_bytes": self.total_budget
+            }
+
+
+class SessionVectorStore(BaseVectorStore):
+    """Session-scoped view of the vector store backed by the in-memory tier."""
+    
+    def __init__(self, session_id: str, manager: SessionIndexManager):
+        """
+        Initialize a session-scoped store.
+        
+        Args:
+            session_id: Session identifier
+            manager: Shared SessionIndexManager
+        """
+        super().__init__(f"session_{session_id}")
+        self.session_id = session_id
+        self.manager = manager
+        
+        logger.info(f"Initialized SessionVectorStore for session: {session_id}")
+    
+    @property
+    def embedding_manager(self):
+        """Embedding manager of the persistent store's current model."""
+        return self.manager.persistent_store.embedding_manager
+    
+    def refresh(self, force: bool = False) -> None:
+        """Re-read the persistent store's collection alias."""
+        self.manager.persistent_store.refresh(force=force)
+    
+    def add_documents(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
+    ) -> None:
+        """
+        Embed chunks and add them to the session's in-memory index.
+        
+        Args:
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Optional precomputed embeddings, one per chunk
+            embedding_model: Model the precomputed embeddings were made with
+        """
+        try:
+            if embeddings is None:
+                embedding_manager = self.embedding_manager
+                embeddings = embedding_manager.get_embeddings([chunk["text"] for chunk in chunks])
+                embedding_model = embedding_manager.model
+            
+            self.manager.add(self.session_id, chunks, embeddings, embedding_model=embedding_model)
+            logger.info(f"Added {len(chunks)} documents to session {self.session_id}")
+            
+        except Exception as e:
+            logger.error(f"Error adding documents to session store: {str(e)}")
+            raise
+    
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False,
+        hydrate: bool = True
+    ) -> Dict:
+        """
+        Query the session's chunks with a precomputed query embedding.
+        
+        Args:
+            query_embedding: Query embedding vector
+            n_results: Number of results to return
+            where: Optional metadata filter
+            include_embeddings: Also return the result embeddings
+            hydrate: Resolve document metadata and externalized text from the registry
+        
+        Returns:
+            Dictionary with ids, documents, metadatas, and distances (and embeddings)
+        """
+        results = self.manager.query(
+            self.session_id,
+            query_embedding,
+            n_results=n_results,
+            include_embeddings=include_embeddings,
+            where=where
+        )
+        return get_document_registry().hydrate(results) if hydrate else results
+    
+    def save(self) -> None:
+        """Spill the session to the persistent store."""
+        self.manager.save(self.session_id)
+    
+    def clear_collection(self) -> None:
+        """Clear all documents of the session."""
+        self.manager.clear(self.session_id)
+    
+    def get_collection_count(self) -> int:
+        """Get the number of documents in the session."""
+        return self.manager.count(self.session_id)
+    
+    def delete_collection(self) -> None:
+        """Delete the session's documents."""
+        self.manager.clear(self.session_id)
+    
+    def delete_documents(self, where: Dict) -> None:
+        """Delete the session's documents matching a metadata filter."""
+        self.manager.delete(self.session_id, where)
+    
+    def count_documents(self, where: Dict) -> int:
+        """Count the session's documents matching a metadata filter."""
+        return self.manager.count(self.session_id, where)
+    
+    def get_records(self, where: Optional[Dict] = None) -> Dict:
+        """Get the session's chunks matching a filter, with embeddings."""
+        records = self.manager.records(self.session_id, where)
+        records.pop("embedding_model")
+        return records
+    
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """Get the registry documents that the session's chunks still point to."""
+        wanted = set(doc_ids)
+        return {m["doc_id"] for m in self.get_records()["metadatas"] if m and m.get("doc_id") in wanted}
+    
+    def export_snapshot(self, path: str, vector_dtype: str = "float32") -> Dict:
+        """
+        Export the session's chunks, without their session tags, to a snapshot directory.
+        
+        Args:
+            path: Target snapshot directory
+            vector_dtype: Storage dtype for vectors ('float32' or 'float16')
+        
+        Returns:
+            Snapshot manifest
+        """
+        try:
+            records = self.manager.records(self.session_id)
+            vectors = np.asarray(records["embeddings"], dtype=vector_dtype)
+            return write_snapshot(
+                path,
+                records["ids"],
+                vectors if len(records["ids"]) else np.empty((0, 0), dtype=vector_dtype),
+                records["documents"],
+                [
+                    {key: value for key, value in (metadata or {}).items() if key not in SESSION_TAGS}
+                    for metadata in records["metadatas"]
+                ],
+                self.collection_name,
+                embedding_model=records["embedding_model"],
+                registry=get_document_registry()
+            )
+        except Exception as e:
+            logger.error(f"Error exporting session snapshot: {str(e)}")
+            raise
+    
+    def import_snapshot(self, path: str, replace: bool = False) -> int:
+        """
+        Load a snapshot into the session.
+        
+        Args:
+            path: Snapshot directory
+            replace: Clear the session's chunks first
+        
+        Returns:
+            Number of records imported
+        """
+        try:
+            registry = get_document_registry()
+            snapshot = read_snapshot(path, self.embedding_model, registry=registry)
+            
+            chunks = []
+            for position, (document, metadata) in enumerate(zip(snapshot["documents"], snapshot["metadatas"])):
+                metadata = {key: value for key, value in (metadata or {}).items() if key not in SESSION_TAGS}
+                text = document if document is not None else registry.get_chunk_text(metadata)
+                chunks.append({"text": text, "chunk_id": position, "metadata": metadata})
+            
+            if replace:
+                self.manager.clear(self.session_id)
+            if chunks:
+                self.manager.add(
+                    self.session_id,
+                    chunks,
+                    np.asarray(snapshot["vectors"], dtype=np.float32).tolist(),
+                    embedding_model=snapshot["manifest"]["embedding_model"]
+                )
+            return len(chunks)
+            
+        except Exception as e:
+            logger.error(f"Error importing session snapshot: {str(e)}")
+            raise
+    
+    def compact(self) -> int:
+        """
+        Nothing to reclaim for a session: in-memory deletes rebuild the index, and
+        spilled chunks are compacted with the persistent store.
+        
+        Returns:
+            Number of documents in the session
+        """
+        return self.get_collection_count()
@@ -0,0 +1,384 @@
+"""Sharded vector store with parallel scatter-gather queries."""
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional, Set
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import CHROMA_PERSIST_DIR, CHROMA_SERVER_HOST, EMBEDDING_MODEL
+from src.utils.document_registry import get_document_registry
+from src.utils.embeddings import EmbeddingManager
+from src.utils.vector_store import BaseVectorStore, VectorStore
+
+
+def document_key(chunk: Dict) -> str:
+    """
+    Get the key identifying the document a chunk belongs to.
+    
+    Args:
+        chunk: Chunk dictionary with 'text' and 'metadata'
+    
+    Returns:
+        Document key used for shard routing
+    """
+    metadata = chunk.get("metadata") or {}
+    return str(
+        metadata.get("doc_id") or metadata.get("file_name") or metadata.get("source") or chunk["text"]
+    )
+
+
+def shard_for_key(key: str, num_shards: int) -> int:
+    """
+    Map a document key to a shard index with a stable hash.
+    
+    Args:
+        key: Document key
+        num_shards: Number of shards
+    
+    Returns:
+        Shard index in [0, num_shards)
+    """
+    digest = hashlib.md5(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % num_shards
+
+
+class ShardedVectorStore(BaseVectorStore):
+    """
+    Partition a collection across several ChromaDB persist directories.
+    
+    Every shard keeps its own collection alias and embedding model, so a shard
+    that has not been migrated yet is still written and queried with the model
+    its vectors were made with.
+    """
+    
+    def __init__(
+        self,
+        collection_name: str = "assignment_documents",
+        num_shards: int = 2,
+        hnsw_params: Optional[Dict[str, int]] = None,
+        persist_dir: Optional[str] = None
+    ):
+        """
+        Initialize one VectorStore per shard.
+        
+        Args:
+            collection_name: Name of the collection in every shard
+            num_shards: Number of shards
+            hnsw_params: Optional HNSW overrides applied to every shard
+            persist_dir: Root directory holding the shard directories
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
+        if CHROMA_SERVER_HOST:
+            raise ValueError("Sharding is not supported with a shared vector-store server")
+        
+        super().__init__(collection_name)
+        self.persist_dir = persist_dir or CHROMA_PERSIST_DIR
+        
+        self.shards = [
+            VectorStore(
+                collection_name=collection_name,
+                hnsw_params=hnsw_params,
+                persist_dir=str(Path(self.persist_dir) / f"shard_{i:02d}")
+            )
+            for i in range(num_shards)
+        ]
+        self.executor = ThreadPoolExecutor(
+            max_workers=num_shards,
+            thread_name_prefix="vector-shard"
+        )
+        
+        logger.info(f"Initialized ShardedVectorStore with {num_shards} shards for collection: {collection_name}")
+    
+    def _map_shards(self, func, shards: Optional[List[VectorStore]] = None) -> List:
+        """Run a function on every shard in parallel and return the results in shard order."""
+        return list(self.executor.map(func, shards or self.shards))
+    
+    @property
+    def embedding_manager(self) -> EmbeddingManager:
+        """Embedding manager of EMBEDDING_MODEL if a shard uses it, otherwise of the first shard."""
+        managers = [shard.embedding_manager for shard in self.shards]
+        return next((manager for manager in managers if manager.model == EMBEDDING_MODEL), managers[0])
+    
+    def _shards_by_model(self) -> Dict[str, List[VectorStore]]:
+        """Group the shards by the embedding model their collection is served with."""
+        groups = {}
+        for shard in self.shards:
+            groups.setdefault(shard.embedding_model, []).append(shard)
+        return groups
+    
+    def refresh(self, force: bool = False) -> None:
+        """Re-read the collection alias of every shard."""
+        self._map_shards(lambda shard: shard.refresh(force=force))
+    
+    def add_documents(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
+    ) -> None:
+        """
+        Route chunks to their shards by document hash, embedding them once per shard model.
+        
+        Args:
+            chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Optional precomputed embeddings, one per chunk
+            embedding_model: Model the precomputed embeddings were made with
+        """
+        try:
+            if embeddings is not None and not embedding_model:
+                embedding_model = self.embedding_model
+            
+            routed = {}
+            for position, chunk in enumerate(chunks):
+                index = shard_for_key(document_key(chunk), len(self.shards))
+                routed.setdefault(index, []).append(position)
+            
+            # Chunks of shards on another model than the precomputed embeddings are embedded together
+            vectors = {}
+            by_model = {}
+            for index, positions in routed.items():
+                model = self.shards[index].embedding_model
+                if embeddings is not None and model == embedding_model:
+                    vectors.update({(model, position): embeddings[position] for position in positions})
+                else:
+                    by_model.setdefault(model, (self.shards[index].embedding_manager, set()))[1].update(positions)
+            for model, (manager, positions) in by_model.items():
+                positions = sorted(positions)
+                for position, vector in zip(positions, manager.get_embeddings([chunks[p]["text"] for p in positions])):
+                    vectors[(model, position)] = vector
+            
+            futures = []
+            for index, positions in routed.items():
+                shard = self.shards[index]
+                model = shard.embedding_model
+                futures.append(self.executor.submit(
+                    shard.add_documents,
+                    [chunks[position] for position in positions],
+                    [vectors[(model, position)] for position in positions],
+                    model
+                ))
+            for future in futures:
+                future.result()
+            
+            logger.info(f"Added {len(chunks)} documents across {len(routed)} shards")
+            
+        except Exception as e:
+            logger.error(f"Error adding documents to sharded vector store: {str(e)}")
+            raise
+    
+    def _merge_shard_queries(
+        self,
+        query_embeddings: Dict[str, List[float]],
+        n_results: int,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False
+    ) -> Dict:
+        """Query the non-empty shards of each model with that model's query embedding and merge by distance."""
+        counts = self._map_shards(lambda shard: shard.get_collection_count())
+        active = [
+            shard for shard, count in zip(self.shards, counts)
+            if count > 0 and shard.embedding_model in query_embeddings
+        ]
+        
+        merged = []
+        if active:
+            for results in self._map_shards(
+                lambda shard: shard.query_by_embedding(
+                    query_embeddings[shard.embedding_model],
+                    n_results=n_results,
+                    where=where,
+                    include_embeddings=include_embeddings,
+                    hydrate=False
+                ),
+                active
+            ):
+                merged.extend(zip(
+                    results["distances"],
+                    results["ids"],
+                    results["documents"],
+                    results["metadatas"],
+                    results.get("embeddings") or [None] * len(results["ids"])
+                ))
+        
+        merged.sort(key=lambda item: item[0])
+        merged = merged[:n_results]
+        
+        output = {
+            "ids": [item[1] for item in merged],
+            "documents": [item[2] for item in merged],
+            "metadatas": [item[3] for item in merged],
+            "distances": [item[0] for item in merged]
+        }
+        if include_embeddings:
+            output["embeddings"] = [item[4] for item in merged]
+        return output
+    
+    def query(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        use_mmr: Optional[bool] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
+    ) -> Dict:
+        """
+        Query the shards, embedding the query once per embedding model in use.
+        
+        While shards are on different models their vectors cannot be compared,
+        so results are merged by distance without MMR re-ranking.
+        
+        Args:
+            query_text: Query string
+            n_results: Number of results to return
+            use_mmr: Re-rank with maximal marginal relevance (defaults to MMR_ENABLED)
+            mmr_lambda: MMR relevance/diversity trade-off (defaults to MMR_LAMBDA)
+            fetch_k: Size of the MMR candidate pool (defaults to MMR_FETCH_K)
+        
+        Returns:
+            Dictionary with documents, metadatas, and distances
+        """
+        groups = self._shards_by_model()
+        if len(groups) == 1:
+            return super().query(query_text, n_results, use_mmr=use_mmr, mmr_lambda=mmr_lambda, fetch_k=fetch_k)
+        
+        try:
+            query_embeddings = {
+                model: shards[0].embedding_manager.get_embedding(query_text)
+                for model, shards in groups.items()
+            }
+            results = self._merge_shard_queries(query_embeddings, n_results)
+            return get_document_registry().hydrate(results)
+            
+        except Exception as e:
+            logger.error(f"Error querying sharded vector store: {str(e)}")
+            raise
+    
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False,
+        hydrate: bool = True
+    ) -> Dict:
+        """
+        Query the non-empty shards of this store's embedding model in parallel and merge the top-k.
+        
+        Args:
+            query_embedding: Query embedding made with self.embedding_manager
+            n_results: Number of results to return
+            where: Optional metadata filter
+            include_embeddings: Also return the result embeddings
+            hydrate: Resolve document metadata and externalized text from the registry
+        
+        Returns:
+            Dictionary with ids, documents, metadatas, and distances (and embeddings)
+        """
+        try:
+            model = self.embedding_model
+            skipped = sum(1 for shard in self.shards if shard.embedding_model != model)
+            if skipped:
+                logger.warning(f"Skipping {skipped} shards not embedded with {model} for this query")
+            
+            output = self._merge_shard_queries(
+                {model: query_embedding},
+                n_results,
+                where=where,
+                include_embeddings=include_embeddings
+            )
+            return get_document_registry().hydrate(output) if hydrate else output
+            
+        except Exception as e:
+            logger.error(f"Error querying sharded vector store: {str(e)}")
+            raise
+    
+    def get_records(self, where: Optional[Dict] = None) -> Dict:
+        """Get the chunks matching a filter, with embeddings, from the shards of this store's model."""
+        model = self.embedding_model
+        shards = [shard for shard in self.shards if shard.embedding_model == model]
+        records = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        for shard_records in self._map_shards(lambda shard: shard.get_records(where), shards):
+            for key in records:
+                records[key].extend(shard_records[key])
+        return records
+    
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """Get the registry documents that chunks in any shard still point to."""
+        return set().union(*self._map_shards(lambda shard: shard.referenced_doc_ids(doc_ids)))
+    
+    def clear_collection(self) -> None:
+        """Clear all documents from every shard."""
+        self._map_shards(lambda shard: shard.clear_collection())
+        logger.info(f"Cleared {len(self.shards)} shards of collection: {self.collection_name}")
+    
+    def get_collection_count(self) -> int:
+        """Get the number of documents across all shards."""
+        return sum(self._map_shards(lambda shard: shard.get_collection_count()))
+    
+    def delete_documents(self, where: Dict) -> None:
+        """Delete documents matching a metadata filter from every shard."""
+        self._map_shards(lambda shard: shard.delete_documents(where))
+    
+    def count_documents(self, where: Dict) -> int:
+        """Count documents matching a metadata filter across all shards."""
+        return sum(self._map_shards(lambda shard: shard.count_documents(where)))
+    
+    def delete_collection(self) -> None:
+        """Delete the collection in every shard."""
+        self._map_shards(lambda shard: shard.delete_collection())
+        logger.info(f"Deleted {len(self.shards)} shards of collection: {self.collection_name}")
+    
+    def compact(self) -> int:
+        """Rebuild every shard to reclaim space left behind by deletions."""
+        return sum(self._map_shards(lambda shard: shard.compact()))
+    
+    def export_snapshot(self, path: str, vector_dtype: str = "float32") -> Dict:
+        """
+        Export every shard to its own subdirectory of the snapshot.
+        
+        Args:
+            path: Target snapshot directory
+            vector_dtype: Storage dtype for vectors ('float32' or 'float16')
+        
+        Returns:
+            Dictionary with one manifest per shard
+        """
+        manifests = self._map_shards(
+            lambda shard: shard.export_snapshot(
+                str(Path(path) / Path(shard.persist_dir).name),
+                vector_dtype=vector_dtype
+            )
+        )
+        return {"shards": manifests}
+    
+    def import_snapshot(self, path: str, replace: bool = False) -> int:
+        """
+        Restore a sharded snapshot, one shard subdirectory per shard.
+        
+        Args:
+            path: Snapshot directory written by export_snapshot
+            replace: Clear the shards before importing
+        
+        Returns:
+            Number of records imported
+        """
+        missing = [
+            shard.persist_dir for shard in self.shards
+            if not (Path(path) / Path(shard.persist_dir).name).exists()
+        ]
+        if missing:
+            raise ValueError(
+                f"Snapshot at {path} does not match {len(self.shards)} shards "
+                f"(missing {len(missing)} shard directories)"
+            )
+        
+        counts = self._map_shards(
+            lambda shard: shard.import_snapshot(
+                str(Path(path) / Path(shard.persist_dir).name),
+                replace=replace
+            )
+        )
+        return sum(counts)
@@ -0,0 +1,290 @@
+"""Columnar snapshot export/import for ChromaDB collections."""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import EMBEDDING_MODEL
+
+
+SNAPSHOT_FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.parquet"
+REGISTRY_DOCUMENTS_FILE = "registry_documents.parquet"
+REGISTRY_PAGES_FILE = "registry_pages.parquet"
+VECTOR_DTYPES = ("float32", "float16")
+
+
+def write_snapshot(
+    path: str,
+    ids: List[str],
+    vectors: np.ndarray,
+    documents: List[Optional[str]],
+    metadatas: List[Optional[Dict]],
+    collection_name: str,
+    collection_metadata: Optional[Dict] = None,
+    embedding_model: str = EMBEDDING_MODEL,
+    registry=None
+) -> Dict:
+    """
+    Write records to a snapshot directory.
+    
+    The snapshot holds the vectors as a raw NumPy array, the ids, documents
+    and metadata in a zstd-compressed Parquet table, and a JSON manifest.
+    With a registry, the documents the chunks point to are written as well.
+    
+    Args:
+        path: Target snapshot directory
+        ids: Record ids
+        vectors: 2-D array of vectors, one row per record, in the storage dtype
+        documents: Record texts (None for externalized text)
+        metadatas: Record metadata
+        collection_name: Name of the exported collection
+        collection_metadata: Metadata of the exported collection
+        embedding_model: Embedding model the vectors were made with
+        registry: Optional DocumentRegistry holding the chunks' documents
+    
+    Returns:
+        Snapshot manifest
+    """
+    if str(vectors.dtype) not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {vectors.dtype}")
+    
+    snapshot_dir = Path(path)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    np.save(snapshot_dir / VECTORS_FILE, vectors)
+    
+    table = pa.table({
+        "id": pa.array(ids, type=pa.string()),
+        "document": pa.array(documents, type=pa.string()),
+        "metadata": pa.array([json.dumps(m or {}) for m in metadatas], type=pa.string())
+    })
+    pq.write_table(table, snapshot_dir / RECORDS_FILE, compression="zstd")
+    
+    registry_counts = None
+    if registry is not None:
+        rows = registry.dump(m["doc_id"] for m in metadatas if m and "doc_id" in m)
+        doc_ids, doc_metadata, created_at = zip(*rows["documents"]) if rows["documents"] else ((), (), ())
+        pq.write_table(pa.table({
+            "doc_id": pa.array(doc_ids, type=pa.string()),
+            "metadata": pa.array(doc_metadata, type=pa.string()),
+            "created_at": pa.array(created_at, type=pa.float64())
+        }), snapshot_dir / REGISTRY_DOCUMENTS_FILE, compression="zstd")
+        page_doc_ids, page_numbers, texts = zip(*rows["pages"]) if rows["pages"] else ((), (), ())
+        pq.write_table(pa.table({
+            "doc_id": pa.array(page_doc_ids, type=pa.string()),
+            "page_number": pa.array(page_numbers, type=pa.int64()),
+            "text": pa.array(texts, type=pa.binary())
+        }), snapshot_dir / REGISTRY_PAGES_FILE, compression="zstd")
+        registry_counts = {"documents": len(doc_ids), "pages": len(page_doc_ids)}
+    
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection_name": collection_name,
+        "collection_metadata": collection_metadata,
+        "embedding_model": embedding_model,
+        "count": len(ids),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "vector_dtype": str(vectors.dtype),
+        "registry": registry_counts,
+        "created_at": datetime.now().isoformat()
+    }
+    (snapshot_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def export_collection(
+    collection,
+    path: str,
+    vector_dtype: str = "float32",
+    page_size: int = 5000,
+    embedding_model: str = EMBEDDING_MODEL,
+    registry=None
+) -> Dict:
+    """
+    Export a collection to a snapshot directory.
+    
+    Args:
+        collection: ChromaDB collection to export
+        path: Target snapshot directory
+        vector_dtype: Storage dtype for vectors ('float32' or 'float16')
+        page_size: Number of records read from ChromaDB per request
+        embedding_model: Embedding model the vectors were made with
+        registry: Optional DocumentRegistry holding the chunks' documents
+    
+    Returns:
+        Snapshot manifest
+    """
+    if vector_dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {vector_dtype}")
+    
+    start = time.perf_counter()
+    total = collection.count()
+    ids, documents, metadatas, vector_pages = [], [], [], []
+    
+    for offset in range(0, total, page_size):
+        page = collection.get(
+            limit=page_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        vector_pages.append(np.asarray(page["embeddings"], dtype=vector_dtype))
+    
+    vectors = np.concatenate(vector_pages) if vector_pages else np.empty((0, 0), dtype=vector_dtype)
+    manifest = write_snapshot(
+        path,
+        ids,
+        vectors,
+        documents,
+        metadatas,
+        collection.name,
+        collection_metadata=collection.metadata,
+        embedding_model=embedding_model,
+        registry=registry
+    )
+    
+    logger.info(
+        f"Exported {len(ids)} records from {collection.name} to {path} "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return manifest
+
+
+def read_manifest(path: str) -> Dict:
+    """
+    Read the manifest of a snapshot directory.
+    
+    Args:
+        path: Snapshot directory
+    
+    Returns:
+        Snapshot manifest
+    """
+    manifest_path = Path(path) / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No snapshot manifest found at {manifest_path}")
+    return json.loads(manifest_path.read_text())
+
+
+def validate_snapshot(path: str, embedding_model: str = EMBEDDING_MODEL) -> Dict:
+    """
+    Check that a snapshot can be imported into a collection.
+    
+    Args:
+        path: Snapshot directory
+        embedding_model: Embedding model of the target collection
+    
+    Returns:
+        Snapshot manifest
+    """
+    snapshot_dir = Path(path)
+    manifest = read_manifest(path)
+    
+    if manifest.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+        raise ValueError(f"Unsupported snapshot format: {manifest.get('format_version')}")
+    if manifest.get("embedding_model") != embedding_model:
+        raise ValueError(
+            f"Snapshot was embedded with {manifest.get('embedding_model')}, "
+            f"but the collection uses {embedding_model}"
+        )
+    required = [VECTORS_FILE, RECORDS_FILE]
+    if manifest.get("registry"):
+        required += [REGISTRY_DOCUMENTS_FILE, REGISTRY_PAGES_FILE]
+    for name in required:
+        if not (snapshot_dir / name).exists():
+            raise FileNotFoundError(f"Snapshot at {snapshot_dir} is missing {name}")
+    
+    return manifest
+
+
+def read_snapshot(path: str, embedding_model: str = EMBEDDING_MODEL, registry=None) -> Dict:
+    """
+    Read the records of a snapshot directory.
+    
+    Args:
+        path: Snapshot directory
+        embedding_model: Embedding model of the target collection
+        registry: Optional DocumentRegistry to restore the snapshot's documents into
+    
+    Returns:
+        Dictionary with the manifest, ids, vectors (memory-mapped), documents and metadatas
+    """
+    snapshot_dir = Path(path)
+    manifest = validate_snapshot(path, embedding_model)
+    
+    # Documents go in first so no imported chunk points at a missing document
+    if registry is not None and manifest.get("registry"):
+        documents_table = pq.read_table(snapshot_dir / REGISTRY_DOCUMENTS_FILE)
+        pages_table = pq.read_table(snapshot_dir / REGISTRY_PAGES_FILE)
+        registry.load({
+            "documents": list(zip(*(documents_table.column(c).to_pylist() for c in ("doc_id", "metadata", "created_at")))),
+            "pages": list(zip(*(pages_table.column(c).to_pylist() for c in ("doc_id", "page_number", "text"))))
+        })
+    
+    table = pq.read_table(snapshot_dir / RECORDS_FILE)
+    return {
+        "manifest": manifest,
+        "ids": table.column("id").to_pylist(),
+        "vectors": np.load(snapshot_dir / VECTORS_FILE, mmap_mode="r"),
+        "documents": table.column("document").to_pylist(),
+        "metadatas": [json.loads(m) or None for m in table.column("metadata").to_pylist()]
+    }
+
+
+def import_collection(
+    collection,
+    path: str,
+    batch_size: Optional[int] = None,
+    embedding_model: str = EMBEDDING_MODEL,
+    registry=None
+) -> int:
+    """
+    Bulk-load a snapshot directory into a collection.
+    
+    Args:
+        collection: ChromaDB collection to write into
+        path: Snapshot directory
+        batch_size: Records per write (defaults to 5000)
+        embedding_model: Embedding model of the target collection
+        registry: Optional DocumentRegistry to restore the snapshot's documents into
+    
+    Returns:
+        Number of records imported
+    """
+    start = time.perf_counter()
+    snapshot = read_snapshot(path, embedding_model, registry=registry)
+    ids = snapshot["ids"]
+    vectors = snapshot["vectors"]
+    documents = snapshot["documents"]
+    metadatas = snapshot["metadatas"]
+    
+    # Collections with externalized chunk text store no documents
+    has_documents = any(document is not None for document in documents)
+    
+    batch_size = batch_size or 5000
+    for offset in range(0, len(ids), batch_size):
+        end = offset + batch_size
+        collection.upsert(
+            ids=ids[offset:end],
+            embeddings=np.asarray(vectors[offset:end], dtype=np.float32),
+            documents=documents[offset:end] if has_documents else None,
+            metadatas=metadatas[offset:end]
+        )
+    
+    logger.info(
+        f"Imported {len(ids)} records into {collection.name} from {path} "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+    return len(ids)
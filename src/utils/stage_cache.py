@@ -0,0 +1,153 @@
+"""File-backed cache of study plan pipeline stage outputs."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import (
+    STAGE_CACHE_ENABLED,
+    STAGE_CACHE_DIR,
+    EXTRACTION_CACHE_TTL_HOURS,
+    RESEARCH_CACHE_TTL_HOURS
+)
+
+
+class StageCache:
+    """
+    Store stage outputs as JSON artifacts with a per-stage TTL.
+    
+    Keys hash the stage inputs together with the model and prompt version,
+    so editing a prompt or switching models never serves stale artifacts.
+    Expired artifacts are ignored on read and overwritten by the next run;
+    the janitor removes abandoned ones with the other output artifacts.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str = STAGE_CACHE_DIR,
+        ttl_hours: Optional[Dict[str, float]] = None
+    ):
+        """
+        Initialize the cache directory.
+        
+        Args:
+            cache_dir: Directory holding one subdirectory per stage
+            ttl_hours: TTL per stage name in hours (0 or missing means no expiry)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl_hours = ttl_hours if ttl_hours is not None else {
+            "extraction": EXTRACTION_CACHE_TTL_HOURS,
+            "research": RESEARCH_CACHE_TTL_HOURS
+        }
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        
+        logger.info(f"Initialized stage cache at {self.cache_dir}")
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Hash stage inputs into a cache key.
+        
+        Args:
+            *parts: Inputs the stage output depends on (text, model, prompt version, ...)
+        
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+    
+    def _path(self, stage: str, key: str) -> Path:
+        """Path of a stage artifact."""
+        return self.cache_dir / stage / f"{key}.json"
+    
+    def get(self, stage: str, key: str) -> Optional[Dict]:
+        """
+        Get a stage artifact if present and not expired.
+        
+        Args:
+            stage: Stage name
+            key: Cache key from make_key
+        
+        Returns:
+            Stored data, or None on a miss
+        """
+        path = self._path(stage, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                artifact = json.load(f)
+        except FileNotFoundError:
+            artifact = None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable {stage} artifact {path.name}: {str(e)}")
+            artifact = None
+        
+        ttl = self.ttl_hours.get(stage)
+        if artifact is not None and ttl and time.time() - artifact["created_at"] > ttl * 3600:
+            logger.info(f"Cached {stage} output expired ({ttl:.0f}h TTL)")
+            artifact = None
+        
+        with self._lock:
+            if artifact is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+        
+        logger.info(f"Reusing cached {stage} output")
+        return artifact["data"]
+    
+    def put(self, stage: str, key: str, data: Dict) -> None:
+        """
+        Store a stage artifact.
+        
+        Args:
+            stage: Stage name
+            key: Cache key from make_key
+            data: JSON-serializable stage output
+        """
+        path = self._path(stage, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"stage": stage, "created_at": time.time(), "data": data}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # A failed write only costs a recomputation next time
+            logger.warning(f"Could not cache {stage} output: {str(e)}")
+    
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Dictionary with hits and misses
+        """
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses}
+
+
+_stage_cache: Optional[StageCache] = None
+_stage_cache_lock = threading.Lock()
+
+
+def get_stage_cache() -> Optional[StageCache]:
+    """Get the process-wide stage cache, or None when STAGE_CACHE_ENABLED is off."""
+    global _stage_cache
+    if not STAGE_CACHE_ENABLED:
+        return None
+    with _stage_cache_lock:
+        if _stage_cache is None:
+            _stage_cache = StageCache()
+        return _stage_cache
@@ -0,0 +1,195 @@
+"""Stream final-answer tokens and stage changes out of crew runs."""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from loguru import logger
+
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+Emit = Callable[[Dict], None]
+
+
+class FinalAnswerStreamer:
+    """
+    Forward the tokens an agent writes after its "Final Answer:" marker.
+    
+    Agents reason in Thought/Action/Observation steps before answering, so
+    each LLM call is buffered until the marker shows up and only what
+    follows it is emitted.
+    """
+    
+    def __init__(self, emit: Emit):
+        """
+        Initialize the streamer.
+        
+        Args:
+            emit: Callback receiving token events
+        """
+        self.emit = emit
+        self._lock = threading.Lock()
+        self._buffer = ""
+        self._answering = False
+    
+    def reset(self) -> None:
+        """Reset the buffer for a new LLM call."""
+        with self._lock:
+            self._buffer = ""
+            self._answering = False
+    
+    def feed(self, token: str) -> None:
+        """Emit the token once the final answer has started."""
+        if not token:
+            return
+        
+        with self._lock:
+            self._feed(token)
+    
+    def _feed(self, token: str) -> None:
+        """Emit or buffer a token; called with the lock held."""
+        if self._answering:
+            self.emit({"type": "token", "text": token})
+            return
+        
+        self._buffer += token
+        marker = self._buffer.find(FINAL_ANSWER_MARKER)
+        if marker >= 0:
+            self._answering = True
+            text = self._buffer[marker + len(FINAL_ANSWER_MARKER):].lstrip()
+            if text:
+                self.emit({"type": "token", "text": text})
+
+
+# LLMs being streamed, by id, with the streamer their chunks go to
+_streams: Dict[int, Tuple[Any, FinalAnswerStreamer]] = {}
+_streams_lock = threading.Lock()
+
+
+def _streamer_of(source: Any) -> Optional[FinalAnswerStreamer]:
+    """Streamer receiving the chunks of an LLM, if it is being streamed."""
+    with _streams_lock:
+        entry = _streams.get(id(source))
+    return entry[1] if entry is not None and entry[0] is source else None
+
+
+def follow_stream(llm: Any, replacement: Any) -> None:
+    """
+    Stream a replacement LLM, such as a fallback model, into the stream of the LLM it replaces.
+    
+    Args:
+        llm: LLM that may be streamed by stream_final_answer
+        replacement: LLM taking over its calls; it must not be shared with other runs
+    """
+    streamer = _streamer_of(llm)
+    if streamer is None:
+        return
+    replacement.stream = True
+    with _streams_lock:
+        _streams[id(replacement)] = (replacement, streamer)
+
+
+def _llm_events() -> Tuple[Any, Any, Any]:
+    """crewai's event bus with its LLM call start and stream chunk events."""
+    try:
+        from crewai.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+    except ImportError:
+        from crewai.utilities.events import crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+    return crewai_event_bus, LLMCallStartedEvent, LLMStreamChunkEvent
+
+
+@contextmanager
+def stream_final_answer(agent: Any, emit: Optional[Emit]):
+    """
+    Stream an agent's final answer tokens for the duration of the block.
+    
+    crewai reports streamed chunks on its event bus rather than through
+    LangChain callbacks, so the agent's LLM is switched to stream and the
+    chunk events it is the source of are forwarded, along with those of
+    replacements registered with follow_stream. Events of other LLM objects
+    are ignored, so concurrent runs only stay apart when each has its own
+    agent; get_agent_llm hands every agent its own LLM copy.
+    
+    Args:
+        agent: crewai Agent of this run only, whose LLM should stream
+        emit: Callback receiving token events; streaming is off when None
+    """
+    llm = getattr(agent, "llm", None)
+    if emit is None or llm is None:
+        yield
+        return
+    
+    event_bus, started_event, chunk_event = _llm_events()
+    streamer = FinalAnswerStreamer(emit)
+    with _streams_lock:
+        _streams[id(llm)] = (llm, streamer)
+    
+    def on_started(source: Any, event: Any) -> None:
+        if _streamer_of(source) is streamer:
+            streamer.reset()
+    
+    def on_chunk(source: Any, event: Any) -> None:
+        if _streamer_of(source) is streamer:
+            streamer.feed(getattr(event, "chunk", ""))
+    
+    event_bus.on(started_event)(on_started)
+    event_bus.on(chunk_event)(on_chunk)
+    previous_stream = getattr(llm, "stream", False)
+    llm.stream = True
+    try:
+        yield
+    finally:
+        llm.stream = previous_stream
+        # Also drops replacements that followed this stream
+        with _streams_lock:
+            for key, (_, entry_streamer) in list(_streams.items()):
+                if entry_streamer is streamer:
+                    del _streams[key]
+        # Older crewai versions cannot unregister handlers; the inactive ones stay as no-ops
+        off = getattr(event_bus, "off", None)
+        if off is not None:
+            off(started_event, on_started)
+            off(chunk_event, on_chunk)
+
+
+def stream_events(run: Callable[[Emit], Dict]) -> Iterator[Dict]:
+    """
+    Run a crew workflow on a background thread and yield its events as they happen.
+    
+    Args:
+        run: Function taking an emit callback and returning the final result dictionary
+    
+    Yields:
+        Stage events ({"type": "stage", "stage": ...}), token events
+        ({"type": "token", "text": ...}) and finally a result event
+        ({"type": "result", "result": ...}) carrying time_to_first_token_ms
+    """
+    events: "queue.Queue[Dict]" = queue.Queue()
+    started = time.perf_counter()
+    first_token_ms: Optional[float] = None
+    
+    def execute():
+        try:
+            result = run(events.put)
+        except Exception as e:
+            logger.error(f"Streaming run failed: {str(e)}")
+            result = {"success": False, "error": str(e)}
+        events.put({"type": "result", "result": result})
+    
+    thread = threading.Thread(target=execute, name="crew-stream", daemon=True)
+    thread.start()
+    
+    while True:
+        event = events.get()
+        if event["type"] == "token" and first_token_ms is None:
+            first_token_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"First answer token after {first_token_ms:.0f}ms")
+        if event["type"] == "result":
+            event["result"]["time_to_first_token_ms"] = first_token_ms
+            yield event
+            break
+        yield event
+    
+    thread.join()
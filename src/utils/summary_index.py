@@ -0,0 +1,277 @@
+"""Hierarchical page and document summary index built at ingestion."""
+
+import hashlib
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional
+from langchain_openai import ChatOpenAI
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import SUMMARY_MODEL, SUMMARY_MAX_CONCURRENCY
+from src.utils.document_registry import DocumentRegistry, get_document_registry
+from src.utils.llm_pool import get_llm
+from src.utils.vector_store import VectorStore
+
+
+SUMMARY_COLLECTION = "assignment_summaries"
+
+PAGE_SUMMARY_PROMPT = (
+    "Summarize this page of the document '{file_name}' in at most 120 words. "
+    "Keep every requirement, deliverable, deadline, grading criterion and key concept it mentions.\n\n"
+    "Page {page_number}:\n{text}"
+)
+
+DOCUMENT_SUMMARY_PROMPT = (
+    "Write an overview of the document '{file_name}' in at most 300 words from its page summaries. "
+    "List all deliverables, deadlines and grading criteria explicitly.\n\n{summaries}"
+)
+
+OVERVIEW_PATTERNS = re.compile(
+    r"\b(summar\w*|overview|outline|gist|tl;?dr|main (points|ideas|topics)|key (points|ideas|topics)|"
+    r"what is (this|the) (document|assignment|course) about|"
+    r"(all|every|list( all)?( of)?) (the )?(deliverables|requirements|tasks|topics|sections|deadlines|criteria))\b",
+    re.IGNORECASE
+)
+
+MAX_PAGE_CHARS = 12000
+
+
+def is_overview_question(query: str) -> bool:
+    """
+    Check whether a question asks about a document as a whole.
+    
+    Args:
+        query: User question
+    
+    Returns:
+        True for summary/overview style questions
+    """
+    return bool(OVERVIEW_PATTERNS.search(query))
+
+
+def content_hash(text: str) -> str:
+    """Hash the content of a page."""
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+class SummaryIndex:
+    """
+    Store per-page and per-document summaries in their own collection.
+    
+    Page summaries are keyed by the content hash of their page, so unchanged
+    pages are never summarized twice and edited pages are re-summarized. The
+    document summary is keyed by the document id, itself a hash of all pages,
+    and lookups are scoped to the document ids found in the caller's store.
+    """
+    
+    def __init__(
+        self,
+        collection_name: str = SUMMARY_COLLECTION,
+        llm: Optional[ChatOpenAI] = None,
+        max_concurrency: int = SUMMARY_MAX_CONCURRENCY
+    ):
+        """
+        Initialize the summary collection and summarization model.
+        
+        Args:
+            collection_name: Name of the summary collection
+            llm: Optional chat model used for summarization
+            max_concurrency: Maximum parallel page summarization requests
+        """
+        # Summaries carry their own text, so they do not keep registry documents alive
+        self.store = VectorStore(collection_name=collection_name, references_documents=False)
+        self.llm = llm or get_llm(temperature=0, model=SUMMARY_MODEL)
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary-index")
+        
+        logger.info(f"Initialized SummaryIndex with model: {SUMMARY_MODEL}")
+    
+    def _cached_page_summaries(self, hashes: List[str]) -> Dict[str, Dict]:
+        """Look up existing page summaries by content hash."""
+        if not hashes:
+            return {}
+        existing = self.store.collection.get(
+            where={"$and": [{"level": "page"}, {"content_hash": {"$in": hashes}}]},
+            include=["documents", "metadatas", "embeddings"]
+        )
+        return {
+            metadata["content_hash"]: {"summary": document, "embedding": embedding}
+            for metadata, document, embedding in zip(
+                existing["metadatas"], existing["documents"], existing["embeddings"]
+            )
+        } if existing["ids"] else {}
+    
+    def build(self, pages: List[Dict], file_metadata: Optional[Dict] = None) -> str:
+        """
+        Summarize a document's pages in parallel, then the document.
+        
+        Args:
+            pages: List of page dictionaries with 'page_number' and 'text'
+            file_metadata: File-level metadata
+        
+        Returns:
+            Document id the summaries are stored under
+        """
+        try:
+            file_metadata = file_metadata or {}
+            doc_id = DocumentRegistry.make_doc_id(file_metadata, pages)
+            file_name = file_metadata.get("file_name") or file_metadata.get("source") or "Unknown file"
+            
+            if self.store.collection.get(ids=[f"doc_{doc_id}"], include=[])["ids"]:
+                logger.info(f"Summaries for {file_name} are up to date")
+                return doc_id
+            
+            pages = [page for page in pages if page.get("text", "").strip()]
+            hashes = [content_hash(page["text"]) for page in pages]
+            cached = self._cached_page_summaries(hashes)
+            
+            # Summarize only pages whose content has no summary yet
+            missing = [i for i, page_hash in enumerate(hashes) if page_hash not in cached]
+            if missing:
+                responses = self.llm.batch(
+                    [
+                        PAGE_SUMMARY_PROMPT.format(
+                            file_name=file_name,
+                            page_number=pages[i].get("page_number"),
+                            text=pages[i]["text"][:MAX_PAGE_CHARS]
+                        )
+                        for i in missing
+                    ],
+                    config={"max_concurrency": self.max_concurrency}
+                )
+                summaries = [response.content.strip() for response in responses]
+                embeddings = self.store.embedding_manager.get_embeddings(summaries)
+                for i, summary, embedding in zip(missing, summaries, embeddings):
+                    cached[hashes[i]] = {"summary": summary, "embedding": embedding}
+            
+            page_summaries = [cached[page_hash]["summary"] for page_hash in hashes]
+            document_summary = self.llm.invoke(
+                DOCUMENT_SUMMARY_PROMPT.format(
+                    file_name=file_name,
+                    summaries="\n\n".join(
+                        f"Page {page.get('page_number')}: {summary}"
+                        for page, summary in zip(pages, page_summaries)
+                    )
+                )
+            ).content.strip()
+            document_embedding = self.store.embedding_manager.get_embedding(document_summary)
+            
+            ids = [f"doc_{doc_id}"]
+            documents = [document_summary]
+            embeddings = [document_embedding]
+            metadatas = [{"level": "document", "doc_id": doc_id, "file_name": file_name, "content_hash": doc_id}]
+            for page, page_hash in zip(pages, hashes):
+                ids.append(f"page_{doc_id}_{page.get('page_number')}")
+                documents.append(cached[page_hash]["summary"])
+                embeddings.append(cached[page_hash]["embedding"])
+                metadatas.append({
+                    "level": "page",
+                    "doc_id": doc_id,
+                    "file_name": file_name,
+                    "page_number": page.get("page_number") or 0,
+                    "content_hash": page_hash
+                })
+            
+            self.store.collection.upsert(
+                ids=ids,
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=metadatas
+            )
+            
+            logger.info(
+                f"Built summaries for {file_name}: {len(pages)} pages "
+                f"({len(missing)} summarized, {len(pages) - len(missing)} reused)"
+            )
+            return doc_id
+            
+        except Exception as e:
+            logger.error(f"Error building summaries: {str(e)}")
+            raise
+    
+    def submit(self, pages: List[Dict], file_metadata: Optional[Dict] = None) -> Future:
+        """
+        Build summaries on the background thread.
+        
+        Args:
+            pages: List of page dictionaries with 'page_number' and 'text'
+            file_metadata: File-level metadata
+        
+        Returns:
+            Future resolved with the document id
+        """
+        return self.executor.submit(self.build, pages, file_metadata)
+    
+    def prune(self) -> int:
+        """
+        Delete the summaries of documents that are no longer in the document registry.
+        
+        Returns:
+            Number of summaries deleted
+        """
+        summaries = self.store.collection.get(include=["metadatas"])
+        doc_ids = {metadata["doc_id"] for metadata in summaries["metadatas"] if metadata and "doc_id" in metadata}
+        if not doc_ids:
+            return 0
+        
+        registered = get_document_registry().get_documents(sorted(doc_ids))
+        orphaned = [
+            summary_id for summary_id, metadata in zip(summaries["ids"], summaries["metadatas"])
+            if metadata and metadata.get("doc_id") in doc_ids - set(registered)
+        ]
+        if orphaned:
+            self.store.collection.delete(ids=orphaned)
+            logger.info(f"Deleted {len(orphaned)} summaries of deleted documents")
+        return len(orphaned)
+    
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        doc_ids: List[str],
+        n_results: int = 5
+    ) -> Dict:
+        """
+        Get the document summaries and most relevant page summaries of some documents.
+        
+        Args:
+            query_embedding: Query embedding vector
+            doc_ids: Documents to restrict the search to
+            n_results: Number of page summaries to return
+        
+        Returns:
+            Dictionary with ids, documents, metadatas, and distances (empty if no summaries exist)
+        """
+        empty = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        doc_ids = sorted(set(doc_ids))
+        if not doc_ids:
+            return empty
+        
+        documents = self.store.query_by_embedding(
+            query_embedding,
+            n_results=len(doc_ids),
+            where={"$and": [{"level": "document"}, {"doc_id": {"$in": doc_ids}}]}
+        )
+        if not documents["ids"]:
+            return empty
+        
+        pages = self.store.query_by_embedding(
+            query_embedding,
+            n_results=n_results,
+            where={"$and": [{"level": "page"}, {"doc_id": {"$in": doc_ids}}]}
+        )
+        return {key: documents[key] + pages[key] for key in empty}
+
+
+_summary_index: Optional[SummaryIndex] = None
+_summary_index_lock = threading.Lock()
+
+
+def get_summary_index() -> SummaryIndex:
+    """Get the process-wide summary index."""
+    global _summary_index
+    with _summary_index_lock:
+        if _summary_index is None:
+            _summary_index = SummaryIndex()
+        return _summary_index
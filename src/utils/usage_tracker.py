@@ -0,0 +1,365 @@
+"""Token, cost, call and latency accounting of crew runs."""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from loguru import logger
+import sys
+sys.path.append(str(__file__).rsplit('/', 3)[0])
+from config.settings import USAGE_LOG_PATH, USAGE_TOOL_CALL_WARN
+from src.utils.llm_pool import llm_model
+from src.utils.model_router import estimate_call
+
+
+def _empty_usage() -> Dict:
+    """Counters of one agent, task or run."""
+    return {
+        "llm_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": 0.0,
+        "tool_calls": 0,
+        "llm_seconds": 0.0,
+        "wall_seconds": 0.0
+    }
+
+
+def _add_usage(total: Dict, usage: Dict) -> None:
+    """Add one set of counters to another."""
+    for key, value in usage.items():
+        if key in total and not isinstance(total[key], str):
+            total[key] += value
+
+
+def _response_usage(response: Any) -> Dict:
+    """Read token usage and model name from an LLM result."""
+    llm_output = response.llm_output or {}
+    token_usage = llm_output.get("token_usage") or {}
+    prompt_tokens = token_usage.get("prompt_tokens", 0)
+    completion_tokens = token_usage.get("completion_tokens", 0)
+    
+    # Streaming results carry usage on the message instead
+    if not token_usage:
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += metadata.get("input_tokens", 0)
+                completion_tokens += metadata.get("output_tokens", 0)
+    
+    return {
+        "model": llm_output.get("model_name"),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens
+    }
+
+
+def _token_usage(output: Any) -> Dict:
+    """Read the token usage crewai reports on a kickoff output."""
+    usage = getattr(output, "token_usage", None)
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else vars(usage)
+    return usage
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """Record LLM calls, tokens and LLM time of direct chat model calls into a run."""
+    
+    def __init__(self, run: "RunUsage", agent: str, task: str, model: Optional[str] = None):
+        """
+        Initialize the handler.
+        
+        Args:
+            run: Run the usage is recorded into
+            agent: Agent name
+            task: Task name
+            model: Model name used when the response does not report one
+        """
+        self.run = run
+        self.agent = agent
+        self.task = task
+        self.model = model
+        self._started: Dict[Any, float] = {}
+    
+    def on_llm_start(self, serialized: Any, prompts: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        """Remember when an LLM call started."""
+        self._started[run_id] = time.perf_counter()
+    
+    def on_chat_model_start(self, serialized: Any, messages: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        """Remember when a chat model call started."""
+        self._started[run_id] = time.perf_counter()
+    
+    def on_llm_end(self, response: Any, *, run_id: Any = None, **kwargs: Any) -> None:
+        """Record the tokens, cost and duration of a finished call."""
+        started = self._started.pop(run_id, None)
+        usage = _response_usage(response)
+        model = usage["model"] or self.model
+        cost = estimate_call(model, usage["prompt_tokens"], usage["completion_tokens"])["cost_usd"] if model else None
+        self.run.record(self.agent, self.task, {
+            "llm_calls": 1,
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "cost_usd": cost or 0.0,
+            "llm_seconds": time.perf_counter() - started if started else 0.0
+        })
+    
+    def on_llm_error(self, error: BaseException, *, run_id: Any = None, **kwargs: Any) -> None:
+        """Record the duration of a failed call."""
+        started = self._started.pop(run_id, None)
+        self.run.record(self.agent, self.task, {
+            "llm_calls": 1,
+            "llm_seconds": time.perf_counter() - started if started else 0.0
+        })
+
+
+class TaskUsage:
+    """
+    Usage recorder of one agent task.
+    
+    crewai never calls LangChain callback handlers, so crew runs are
+    accounted from the token usage of their kickoff output, and the recorder
+    itself is the crewai step callback counting tool calls. Direct chat model
+    calls pass callbacks in their config instead.
+    """
+    
+    def __init__(self, run: Optional["RunUsage"], agent: str, task: str, model: Optional[str] = None):
+        """
+        Initialize the recorder.
+        
+        Args:
+            run: Run the usage is recorded into, or None to record nothing
+            agent: Agent name
+            task: Task name
+            model: Model name used to price the tokens
+        """
+        self.run = run
+        self.agent = agent
+        self.task = task
+        self.model = model
+    
+    @property
+    def callbacks(self) -> List[BaseCallbackHandler]:
+        """LangChain callbacks of a direct chat model call, e.g. config={"callbacks": usage.callbacks}."""
+        if self.run is None:
+            return []
+        return [UsageCallbackHandler(self.run, self.agent, self.task, self.model)]
+    
+    def __call__(self, step_output: Any) -> None:
+        """Count the tool calls of a crewai agent step."""
+        if self.run is None:
+            return
+        # Older crewai versions pass (action, observation) pairs, newer ones one step object
+        if isinstance(step_output, list):
+            tool_calls = len(step_output)
+        else:
+            tool_calls = 1 if getattr(step_output, "tool", None) else 0
+        if tool_calls:
+            self.run.record(self.agent, self.task, {"tool_calls": tool_calls})
+    
+    def record_output(self, output: Any) -> None:
+        """
+        Record the LLM calls and tokens reported on a crew kickoff output.
+        
+        Args:
+            output: Result of Crew.kickoff; cached text results carry no usage
+        """
+        usage = _token_usage(output)
+        if self.run is None or not usage:
+            return
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+        cost = estimate_call(self.model, prompt_tokens, completion_tokens)["cost_usd"] if self.model else None
+        self.run.record(self.agent, self.task, {
+            "llm_calls": usage.get("successful_requests") or 0,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": cost or 0.0
+        })
+
+
+class RunUsage:
+    """Usage of one crew run, broken down by agent and by task."""
+    
+    def __init__(self, crew: str):
+        """
+        Initialize the run.
+        
+        Args:
+            crew: Crew name
+        """
+        self.run_id = uuid.uuid4().hex[:12]
+        self.crew = crew
+        self.started_at = datetime.now().isoformat()
+        self.totals = _empty_usage()
+        self.agents: Dict[str, Dict] = {}
+        self.tasks: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._warned = set()
+    
+    def record(self, agent: str, task: str, usage: Dict) -> None:
+        """
+        Add usage to an agent, a task and the run totals.
+        
+        Args:
+            agent: Agent name
+            task: Task name
+            usage: Counters to add
+        """
+        with self._lock:
+            for bucket in (
+                self.agents.setdefault(agent, _empty_usage()),
+                self.tasks.setdefault(task, {**_empty_usage(), "agent": agent})
+            ):
+                _add_usage(bucket, usage)
+            # The run's own wall time is measured around the whole run
+            _add_usage(self.totals, {key: value for key, value in usage.items() if key != "wall_seconds"})
+            tool_calls = self.tasks[task]["tool_calls"]
+            warn = bool(USAGE_TOOL_CALL_WARN) and tool_calls > USAGE_TOOL_CALL_WARN and task not in self._warned
+            if warn:
+                self._warned.add(task)
+        
+        if warn:
+            logger.warning(f"Task {task} of {self.crew} made {tool_calls} tool calls; possible tool loop")
+    
+    @contextmanager
+    def track(self, agent_obj: Any, agent: str, task: str):
+        """
+        Record the usage of an agent while it runs a task.
+        
+        Pass the yielded recorder to the Crew as its step callback and hand it
+        the kickoff output, or pass its callbacks to direct chat model calls.
+        
+        Args:
+            agent_obj: crewai Agent, or a chat model called directly
+            agent: Agent name
+            task: Task name
+        
+        Yields:
+            TaskUsage recorder
+        """
+        task_usage = TaskUsage(self, agent, task, llm_model(getattr(agent_obj, "llm", agent_obj)))
+        started = time.perf_counter()
+        try:
+            yield task_usage
+        finally:
+            # Crew.kickoff copies its step callback onto the agent; do not leave it pointing at this run
+            if getattr(agent_obj, "step_callback", None) is task_usage:
+                agent_obj.step_callback = None
+            self.record(agent, task, {"wall_seconds": time.perf_counter() - started})
+    
+    def to_dict(self) -> Dict:
+        """Serialize the run."""
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "crew": self.crew,
+                "started_at": self.started_at,
+                "totals": dict(self.totals),
+                "agents": {name: dict(usage) for name, usage in self.agents.items()},
+                "tasks": {name: dict(usage) for name, usage in self.tasks.items()}
+            }
+
+
+def track_agent(run: Optional[RunUsage], agent_obj: Any, agent: str, task: str):
+    """
+    Track an agent task within a run, or do nothing without a run.
+    
+    Args:
+        run: Run being tracked, or None
+        agent_obj: crewai Agent
+        agent: Agent name
+        task: Task name
+    
+    Returns:
+        Context manager yielding a TaskUsage recorder, which records nothing without a run
+    """
+    if run is None:
+        return nullcontext(TaskUsage(None, agent, task))
+    return run.track(agent_obj, agent, task)
+
+
+class UsageTracker:
+    """Append finished runs to a JSONL log and keep process-wide aggregates."""
+    
+    def __init__(self, log_path: str = USAGE_LOG_PATH, recent_runs: int = 20):
+        """
+        Initialize the tracker.
+        
+        Args:
+            log_path: JSONL file every finished run is appended to
+            recent_runs: Number of runs kept in memory
+        """
+        self.log_path = Path(log_path)
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=recent_runs)
+        self._totals: Dict[str, Dict] = {}
+    
+    @contextmanager
+    def track_run(self, crew: str):
+        """
+        Track one crew run and log it when it ends.
+        
+        Args:
+            crew: Crew name
+        
+        Yields:
+            RunUsage to attach agents to
+        """
+        run = RunUsage(crew)
+        started = time.perf_counter()
+        try:
+            yield run
+        finally:
+            run.totals["wall_seconds"] = time.perf_counter() - started
+            self._finish(run)
+    
+    def _finish(self, run: RunUsage) -> None:
+        """Aggregate and persist a finished run."""
+        record = run.to_dict()
+        with self._lock:
+            self._recent.append(record)
+            _add_usage(self._totals.setdefault(run.crew, {**_empty_usage(), "runs": 0}), {**record["totals"], "runs": 1})
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except Exception as e:
+                logger.warning(f"Could not write usage log: {str(e)}")
+        
+        totals = record["totals"]
+        logger.info(
+            f"{run.crew} run {run.run_id}: {totals['llm_calls']} LLM calls, "
+            f"{totals['prompt_tokens']}+{totals['completion_tokens']} tokens (~${totals['cost_usd']:.4f}), "
+            f"{totals['tool_calls']} tool calls, {totals['wall_seconds']:.1f}s"
+        )
+    
+    def recent(self) -> List[Dict]:
+        """Most recent runs, newest last."""
+        with self._lock:
+            return list(self._recent)
+    
+    def totals(self) -> Dict[str, Dict]:
+        """Aggregated usage per crew since the process started."""
+        with self._lock:
+            return {crew: dict(usage) for crew, usage in self._totals.items()}
+
+
+_usage_tracker: Optional[UsageTracker] = None
+_usage_tracker_lock = threading.Lock()
+
+
+def get_usage_tracker() -> UsageTracker:
+    """Get the process-wide usage tracker."""
+    global _usage_tracker
+    with _usage_tracker_lock:
+        if _usage_tracker is None:
+            _usage_tracker = UsageTracker()
+        return _usage_tracker
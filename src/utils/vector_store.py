@@ -1,64 +1,507 @@
 """Vector store management with ChromaDB."""
 
-from typing import List, Dict, Optional
+import hashlib
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional, Set
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from loguru import logger
 import sys
 sys.path.append(str(__file__).rsplit('/', 3)[0])
-from config.settings import CHROMA_PERSIST_DIR
+from config.settings import (
+    CHROMA_PERSIST_DIR,
+    EMBEDDING_MODEL,
+    EMBEDDING_ALIAS_REFRESH_SECONDS,
+    HNSW_M,
+    HNSW_CONSTRUCTION_EF,
+    HNSW_SEARCH_EF,
+    VECTORSTORE_SHARDS,
+    CHROMA_SERVER_HOST,
+    CHROMA_SERVER_PORT,
+    EXTERNAL_CHUNK_TEXT,
+    MMR_ENABLED,
+    MMR_LAMBDA,
+    MMR_FETCH_K
+)
 from src.utils.embeddings import EmbeddingManager
+from src.utils.document_registry import get_document_registry
+from src.utils.snapshot import export_collection, import_collection, validate_snapshot
 
 
-class VectorStore:
+HNSW_PARAM_KEYS = ("M", "construction_ef", "search_ef")
+
+# Maps each logical collection to its physical collection and embedding model
+ALIAS_COLLECTION = "collection_aliases"
+
+
+def make_chunk_id(chunk: Dict) -> str:
+    """
+    Build a stable id for a chunk that is unique across uploads.
+    
+    Args:
+        chunk: Chunk dictionary with 'text', 'chunk_id' and 'metadata'
+    
+    Returns:
+        Chunk id combining the chunk index and a content digest
+    """
+    metadata = chunk.get("metadata") or {}
+    source = metadata.get("doc_id") or metadata.get("file_name") or metadata.get("source") or ""
+    scope = f"{metadata.get('session_id', '')}|{source}|{metadata.get('page_number', '')}"
+    digest = hashlib.md5(f"{scope}|{chunk['text']}".encode("utf-8")).hexdigest()
+    return f"chunk_{chunk['chunk_id']}_{digest[:12]}"
+
+
+_http_clients: Dict[str, object] = {}
+_http_clients_lock = threading.Lock()
+
+
+def get_http_client(host: str = CHROMA_SERVER_HOST, port: int = CHROMA_SERVER_PORT):
+    """
+    Get the process-wide HTTP client for a vector-store server.
+    
+    One client is shared per server so every VectorStore in the process
+    reuses the same keep-alive connection pool.
+    
+    Args:
+        host: Server host
+        port: Server port
+    
+    Returns:
+        ChromaDB HttpClient instance
+    """
+    key = f"{host}:{port}"
+    with _http_clients_lock:
+        if key not in _http_clients:
+            _http_clients[key] = chromadb.HttpClient(
+                host=host,
+                port=port,
+                settings=Settings(anonymized_telemetry=False)
+            )
+            logger.info(f"Connected to vector-store server at {key}")
+        return _http_clients[key]
+
+
+def maximal_marginal_relevance(
+    query_embedding: List[float],
+    embeddings: List[List[float]],
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Select a relevant but diverse subset of candidates.
+    
+    Args:
+        query_embedding: Query embedding vector
+        embeddings: Candidate embeddings
+        k: Number of candidates to select
+        lambda_mult: Trade-off between relevance (1.0) and diversity (0.0)
+    
+    Returns:
+        Indices of the selected candidates in selection order
+    """
+    candidates = np.asarray(embeddings, dtype=np.float32)
+    if candidates.size == 0:
+        return []
+    
+    candidates /= np.linalg.norm(candidates, axis=1, keepdims=True).clip(min=1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+    
+    selected = [int(np.argmax(relevance))]
+    max_similarity = similarity[selected[0]].copy()
+    
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[best])
+    
+    return selected
+
+
+def get_collection_alias(client, name: str) -> Optional[Dict]:
+    """
+    Look up which physical collection and embedding model serve a logical collection.
+    
+    Args:
+        client: ChromaDB client
+        name: Logical collection name
+    
+    Returns:
+        Dictionary with 'collection' and 'embedding_model', or None if not registered
+    """
+    aliases = client.get_or_create_collection(name=ALIAS_COLLECTION)
+    record = aliases.get(ids=[name], include=["metadatas"])
+    return record["metadatas"][0] if record["ids"] else None
+
+
+def set_collection_alias(client, name: str, collection: str, embedding_model: str) -> None:
+    """
+    Point a logical collection at a physical collection in a single write.
+    
+    Args:
+        client: ChromaDB client
+        name: Logical collection name
+        collection: Physical collection name
+        embedding_model: Embedding model the physical collection was built with
+    """
+    aliases = client.get_or_create_collection(name=ALIAS_COLLECTION)
+    aliases.upsert(
+        ids=[name],
+        embeddings=[[0.0]],
+        metadatas=[{
+            "collection": collection,
+            "embedding_model": embedding_model,
+            "updated_at": time.time()
+        }]
+    )
+
+
+def sync_collections(source, target, delete_removed: bool = True, batch_size: int = 1000) -> Dict[str, int]:
+    """
+    Copy records missing from one collection of the same embedding model into another.
+    
+    Args:
+        source: ChromaDB collection holding the authoritative records
+        target: ChromaDB collection to bring up to date
+        delete_removed: Also delete records of the target that are not in the source
+        batch_size: Records copied per write
+    
+    Returns:
+        Dictionary with the number of records 'copied' and 'deleted' (or left 'target_only')
+    """
+    source_ids = set(source.get(include=[])["ids"])
+    target_ids = set(target.get(include=[])["ids"])
+    missing = sorted(source_ids - target_ids)
+    target_only = sorted(target_ids - source_ids)
+    
+    for offset in range(0, len(missing), batch_size):
+        records = source.get(
+            ids=missing[offset:offset + batch_size],
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if not records["ids"]:
+            continue
+        has_documents = any(document is not None for document in records["documents"])
+        target.upsert(
+            ids=records["ids"],
+            embeddings=records["embeddings"],
+            documents=records["documents"] if has_documents else None,
+            metadatas=records["metadatas"]
+        )
+    
+    if delete_removed and target_only:
+        target.delete(ids=target_only)
+        return {"copied": len(missing), "deleted": len(target_only)}
+    return {"copied": len(missing), "target_only": len(target_only)}
+
+
+def build_collection_metadata(hnsw_params: Optional[Dict[str, int]] = None) -> Dict:
+    """
+    Build ChromaDB collection metadata including HNSW index parameters.
+    
+    Args:
+        hnsw_params: Optional overrides for 'M', 'construction_ef' and 'search_ef'
+    
+    Returns:
+        Collection metadata dictionary
+    """
+    params = {
+        "M": HNSW_M,
+        "construction_ef": HNSW_CONSTRUCTION_EF,
+        "search_ef": HNSW_SEARCH_EF
+    }
+    
+    for key, value in (hnsw_params or {}).items():
+        if key not in HNSW_PARAM_KEYS:
+            raise ValueError(f"Unknown HNSW parameter: {key}")
+        params[key] = int(value)
+    
+    metadata = {"hnsw:space": "cosine"}
+    for key, value in params.items():
+        metadata[f"hnsw:{key}"] = value
+    
+    return metadata
+
+
+class BaseVectorStore(ABC):
+    """
+    Interface shared by the single-collection, sharded and session-scoped stores.
+    
+    Subclasses store and filter the chunks and expose the 'embedding_manager' of
+    the model their vectors are made with; embedding the query text, MMR
+    re-ranking and registry hydration are shared here.
+    """
+    
+    def __init__(self, collection_name: str):
+        """
+        Initialize the store.
+        
+        Args:
+            collection_name: Name of the logical collection
+        """
+        self.collection_name = collection_name
+    
+    @property
+    def embedding_model(self) -> str:
+        """Embedding model of the collection currently being served."""
+        return self.embedding_manager.model
+    
+    @abstractmethod
+    def refresh(self, force: bool = False) -> None:
+        """Re-read the collection alias so a completed embedding migration is picked up."""
+    
+    @abstractmethod
+    def add_documents(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
+    ) -> None:
+        """Add document chunks, embedding them unless matching embeddings are given."""
+    
+    def query(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        use_mmr: Optional[bool] = None,
+        mmr_lambda: Optional[float] = None,
+        fetch_k: Optional[int] = None
+    ) -> Dict:
+        """
+        Query the vector store for similar documents.
+        
+        Args:
+            query_text: Query string
+            n_results: Number of results to return
+            use_mmr: Re-rank with maximal marginal relevance (defaults to MMR_ENABLED)
+            mmr_lambda: MMR relevance/diversity trade-off (defaults to MMR_LAMBDA)
+            fetch_k: Size of the MMR candidate pool (defaults to MMR_FETCH_K)
+        
+        Returns:
+            Dictionary with documents, metadatas, and distances
+        """
+        try:
+            self.refresh()
+            
+            # Generate query embedding
+            query_embedding = self.embedding_manager.get_embedding(query_text)
+            
+            if MMR_ENABLED if use_mmr is None else use_mmr:
+                results = self.query_by_embedding(
+                    query_embedding,
+                    n_results=max(fetch_k or MMR_FETCH_K, n_results),
+                    include_embeddings=True,
+                    hydrate=False
+                )
+                selected = maximal_marginal_relevance(
+                    query_embedding,
+                    results.pop("embeddings"),
+                    n_results,
+                    MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+                )
+                results = {key: [values[i] for i in selected] for key, values in results.items()}
+            else:
+                results = self.query_by_embedding(query_embedding, n_results=n_results, hydrate=False)
+            
+            # Resolve document metadata and externalized text for the final top-k only
+            return get_document_registry().hydrate(results)
+            
+        except Exception as e:
+            logger.error(f"Error querying vector store: {str(e)}")
+            raise
+    
+    @abstractmethod
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False,
+        hydrate: bool = True
+    ) -> Dict:
+        """Query with an embedding made by this store's embedding manager."""
+    
+    @abstractmethod
+    def get_records(self, where: Optional[Dict] = None) -> Dict:
+        """Get the ids, embeddings, documents and metadatas of the chunks matching a filter."""
+    
+    @abstractmethod
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """Get the registry documents that stored chunks still point to."""
+    
+    @abstractmethod
+    def clear_collection(self) -> None:
+        """Clear all documents from the collection."""
+    
+    @abstractmethod
+    def get_collection_count(self) -> int:
+        """Get the number of documents in the collection."""
+    
+    @abstractmethod
+    def delete_documents(self, where: Dict) -> None:
+        """Delete documents matching a metadata filter."""
+    
+    @abstractmethod
+    def count_documents(self, where: Dict) -> int:
+        """Count documents matching a metadata filter."""
+    
+    @abstractmethod
+    def delete_collection(self) -> None:
+        """Delete the entire collection."""
+    
+    @abstractmethod
+    def export_snapshot(self, path: str, vector_dtype: str = "float32") -> Dict:
+        """Export the collection to a snapshot directory."""
+    
+    @abstractmethod
+    def import_snapshot(self, path: str, replace: bool = False) -> int:
+        """Restore a snapshot into the collection."""
+    
+    @abstractmethod
+    def compact(self) -> int:
+        """Rebuild the collection to reclaim space left behind by deletions."""
+
+
+class VectorStore(BaseVectorStore):
     """Manage ChromaDB vector store for document retrieval."""
     
-    def __init__(self, collection_name: str = "assignment_documents"):
+    def __init__(
+        self,
+        collection_name: str = "assignment_documents",
+        hnsw_params: Optional[Dict[str, int]] = None,
+        persist_dir: Optional[str] = None,
+        embedding_manager: Optional[EmbeddingManager] = None,
+        references_documents: bool = True
+    ):
         """
         Initialize ChromaDB vector store.
         
         Args:
             collection_name: Name of the collection to use
+            hnsw_params: Optional HNSW overrides ('M', 'construction_ef', 'search_ef')
+            persist_dir: Optional persistence directory (defaults to CHROMA_PERSIST_DIR)
+            embedding_manager: Optional shared EmbeddingManager instance
+            references_documents: Keep the registry documents of stored chunks alive
         """
-        self.collection_name = collection_name
-        self.embedding_manager = EmbeddingManager()
-        
-        # Initialize ChromaDB client with persistence
-        self.client = chromadb.PersistentClient(
-            path=CHROMA_PERSIST_DIR,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
+        super().__init__(collection_name)
+        self.collection_metadata = build_collection_metadata(hnsw_params)
+        self.persist_dir = persist_dir or CHROMA_PERSIST_DIR
+        self.physical_name: Optional[str] = None
+        self.collection = None
+        self.embedding_manager: Optional[EmbeddingManager] = None
+        self._embedding_managers: Dict[str, EmbeddingManager] = {}
+        if embedding_manager is not None:
+            self._embedding_managers[embedding_manager.model] = embedding_manager
+        self._alias_lock = threading.Lock()
+        self._alias_checked_at = 0.0
+        
+        # Use the shared server when configured, otherwise open the store in-process
+        if CHROMA_SERVER_HOST:
+            self.client = get_http_client()
+        else:
+            self.client = chromadb.PersistentClient(
+                path=self.persist_dir,
+                settings=Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
             )
-        )
         
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
+        # Resolve the physical collection and embedding model behind the name
+        self.refresh(force=True)
+        if references_documents:
+            get_document_registry().add_reference_source(self)
         
         logger.info(f"Initialized VectorStore with collection: {collection_name}")
     
-    def add_documents(self, chunks: List[Dict]) -> None:
+    def refresh(self, force: bool = False) -> None:
+        """
+        Re-read the collection alias so a completed embedding migration is picked up.
+        
+        Collections without an alias are pinned to the configured EMBEDDING_MODEL,
+        so changing the setting later does not mix vectors from two models.
+        
+        Args:
+            force: Check even if the last check is recent
+        """
+        if not force and time.monotonic() - self._alias_checked_at < EMBEDDING_ALIAS_REFRESH_SECONDS:
+            return
+        
+        with self._alias_lock:
+            alias = get_collection_alias(self.client, self.collection_name)
+            if alias is None:
+                alias = {"collection": self.collection_name, "embedding_model": EMBEDDING_MODEL}
+                set_collection_alias(self.client, self.collection_name, **alias)
+            
+            if alias["collection"] != self.physical_name:
+                self.collection = self.client.get_or_create_collection(
+                    name=alias["collection"],
+                    metadata=self.collection_metadata
+                )
+                self.physical_name = alias["collection"]
+            
+            model = alias["embedding_model"]
+            if self.embedding_manager is None or self.embedding_manager.model != model:
+                if model not in self._embedding_managers:
+                    self._embedding_managers[model] = EmbeddingManager(model)
+                self.embedding_manager = self._embedding_managers[model]
+                
+                if model != EMBEDDING_MODEL:
+                    logger.warning(
+                        f"Collection {self.collection_name} is embedded with {model}, not EMBEDDING_MODEL "
+                        f"({EMBEDDING_MODEL}); queries keep using {model} until it is migrated"
+                    )
+            
+            self._alias_checked_at = time.monotonic()
+    
+    def add_documents(
+        self,
+        chunks: List[Dict],
+        embeddings: Optional[List[List[float]]] = None,
+        embedding_model: Optional[str] = None
+    ) -> None:
         """
         Add document chunks to the vector store.
         
         Args:
             chunks: List of chunk dictionaries with 'text' and 'metadata'
+            embeddings: Optional precomputed embeddings, one per chunk
+            embedding_model: Model the precomputed embeddings were made with
         """
         try:
+            self.refresh()
             texts = [chunk["text"] for chunk in chunks]
-            metadatas = [chunk["metadata"] for chunk in chunks]
-            ids = [f"chunk_{chunk['chunk_id']}" for chunk in chunks]
+            # Every chunk carries its upload time so the janitor can expire it (re-adds keep the original)
+            uploaded_at = int(time.time())
+            metadatas = [{"uploaded_at": uploaded_at, **chunk["metadata"]} for chunk in chunks]
+            ids = [make_chunk_id(chunk) for chunk in chunks]
+            
+            # Embeddings made before a model switch are redone with the current model
+            if embeddings is not None and embedding_model and embedding_model != self.embedding_model:
+                logger.info(f"Re-embedding {len(chunks)} chunks made with {embedding_model}")
+                embeddings = None
             
             # Generate embeddings
-            embeddings = self.embedding_manager.get_embeddings(texts)
+            if embeddings is None:
+                embeddings = self.embedding_manager.get_embeddings(texts)
+            
+            # Chunks registered with the document registry can keep their text outside ChromaDB
+            external = EXTERNAL_CHUNK_TEXT and all("doc_id" in metadata for metadata in metadatas)
             
             # Add to ChromaDB
             self.collection.add(
                 embeddings=embeddings,
-                documents=texts,
+                documents=None if external else texts,
                 metadatas=metadatas,
                 ids=ids
             )
@@ -69,50 +512,140 @@ class VectorStore:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             raise
     
-    def query(self, query_text: str, n_results: int = 5) -> Dict:
+    def query_by_embedding(
+        self,
+        query_embedding: List[float],
+        n_results: int = 5,
+        where: Optional[Dict] = None,
+        include_embeddings: bool = False,
+        hydrate: bool = True
+    ) -> Dict:
         """
-        Query the vector store for similar documents.
+        Query the vector store with a precomputed query embedding.
         
         Args:
-            query_text: Query string
+            query_embedding: Query embedding vector
             n_results: Number of results to return
-            
+            where: Optional metadata filter
+            include_embeddings: Also return the result embeddings
+            hydrate: Resolve document metadata and externalized text from the registry
+        
         Returns:
-            Dictionary with documents, metadatas, and distances
+            Dictionary with ids, documents, metadatas, and distances (and embeddings)
         """
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_manager.get_embedding(query_text)
+            self.refresh()
+            include = ["documents", "metadatas", "distances"]
+            if include_embeddings:
+                include.append("embeddings")
             
             # Query ChromaDB
             results = self.collection.query(
                 query_embeddings=[query_embedding],
                 n_results=n_results,
-                include=["documents", "metadatas", "distances"]
+                where=where,
+                include=include
             )
             
             logger.info(f"Retrieved {len(results['documents'][0])} results for query")
             
-            return {
+            output = {
+                "ids": results["ids"][0],
                 "documents": results["documents"][0],
                 "metadatas": results["metadatas"][0],
                 "distances": results["distances"][0]
             }
+            if include_embeddings:
+                output["embeddings"] = list(results["embeddings"][0])
+            
+            return get_document_registry().hydrate(output) if hydrate else output
             
         except Exception as e:
             logger.error(f"Error querying vector store: {str(e)}")
             raise
     
+    def _new_physical_collection(self):
+        """Create an empty physical collection to rebuild the logical collection into."""
+        return self.client.create_collection(
+            name=f"{self.collection_name}__{uuid.uuid4().hex[:8]}",
+            metadata=self.collection_metadata
+        )
+    
+    def _switch_collection(self, collection) -> str:
+        """
+        Point the alias at another physical collection in one write.
+        
+        Args:
+            collection: Physical collection to serve from now on
+        
+        Returns:
+            Name of the physical collection served before
+        """
+        with self._alias_lock:
+            previous = self.physical_name
+            set_collection_alias(self.client, self.collection_name, collection.name, self.embedding_model)
+            self.collection = collection
+            self.physical_name = collection.name
+        logger.info(f"Switched {self.collection_name} from {previous} to {collection.name}")
+        return previous
+    
+    def get_records(self, where: Optional[Dict] = None) -> Dict:
+        """
+        Get stored chunks together with their embeddings.
+        
+        Args:
+            where: Optional metadata filter
+        
+        Returns:
+            Dictionary with ids, embeddings, documents, and metadatas
+        """
+        self.refresh()
+        records = self.collection.get(where=where, include=["embeddings", "documents", "metadatas"])
+        return {key: list(records[key]) for key in ("ids", "embeddings", "documents", "metadatas")}
+    
+    def referenced_doc_ids(self, doc_ids: List[str]) -> Set[str]:
+        """
+        Get the registry documents that chunks in this collection still point to.
+        
+        Args:
+            doc_ids: Document ids to check
+        
+        Returns:
+            Subset of doc_ids with at least one chunk in the collection
+        """
+        try:
+            self.refresh()
+            return {
+                doc_id for doc_id in doc_ids
+                if self.collection.get(where={"doc_id": doc_id}, limit=1, include=[])["ids"]
+            }
+        except Exception as e:
+            # Keep the documents when their references cannot be checked
+            logger.warning(f"Could not check document references of {self.collection_name}: {str(e)}")
+            return set(doc_ids)
+    
+    def _doc_ids(self, where: Optional[Dict] = None) -> Set[str]:
+        """Get the registry documents of the chunks matching a filter."""
+        metadatas = self.collection.get(where=where, include=["metadatas"])["metadatas"]
+        return {m["doc_id"] for m in metadatas if m and "doc_id" in m}
+    
+    def _prune_documents(self, doc_ids: Set[str]) -> None:
+        """Drop registry documents that no store references after a delete."""
+        if doc_ids:
+            get_document_registry().prune(doc_ids)
+    
     def clear_collection(self) -> None:
         """Clear all documents from the collection."""
         try:
+            doc_ids = self._doc_ids()
             # Delete and recreate collection
-            self.client.delete_collection(name=self.collection_name)
+            self.client.delete_collection(name=self.physical_name)
             self.collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
+                name=self.physical_name,
+                metadata=self.collection_metadata
             )
             logger.info(f"Cleared collection: {self.collection_name}")
+            self._prune_documents(doc_ids)
             
         except Exception as e:
             logger.error(f"Error clearing collection: {str(e)}")
@@ -127,11 +660,189 @@ class VectorStore:
             logger.error(f"Error getting collection count: {str(e)}")
             return 0
     
+    def delete_documents(self, where: Dict) -> None:
+        """
+        Delete documents matching a metadata filter.
+        
+        Args:
+            where: Metadata filter selecting the documents to delete
+        """
+        try:
+            doc_ids = self._doc_ids(where)
+            self.collection.delete(where=where)
+            logger.info(f"Deleted documents matching {where} from {self.collection_name}")
+            self._prune_documents(doc_ids)
+        except Exception as e:
+            logger.error(f"Error deleting documents: {str(e)}")
+            raise
+    
+    def count_documents(self, where: Dict) -> int:
+        """
+        Count documents matching a metadata filter.
+        
+        Args:
+            where: Metadata filter
+        
+        Returns:
+            Number of matching documents
+        """
+        try:
+            return len(self.collection.get(where=where, include=[])["ids"])
+        except Exception as e:
+            logger.error(f"Error counting documents: {str(e)}")
+            return 0
+    
     def delete_collection(self) -> None:
         """Delete the entire collection."""
         try:
-            self.client.delete_collection(name=self.collection_name)
+            doc_ids = self._doc_ids()
+            self.client.delete_collection(name=self.physical_name)
+            self.client.get_or_create_collection(name=ALIAS_COLLECTION).delete(ids=[self.collection_name])
             logger.info(f"Deleted collection: {self.collection_name}")
+            get_document_registry().remove_reference_source(self)
+            self._prune_documents(doc_ids)
         except Exception as e:
             logger.error(f"Error deleting collection: {str(e)}")
             raise
+    
+    def export_snapshot(self, path: str, vector_dtype: str = "float32") -> Dict:
+        """
+        Export the collection to a columnar snapshot directory.
+        
+        Args:
+            path: Target snapshot directory
+            vector_dtype: Storage dtype for vectors ('float32' or 'float16')
+        
+        Returns:
+            Snapshot manifest
+        """
+        try:
+            return export_collection(
+                self.collection,
+                path,
+                vector_dtype=vector_dtype,
+                embedding_model=self.embedding_model,
+                registry=get_document_registry()
+            )
+        except Exception as e:
+            logger.error(f"Error exporting snapshot: {str(e)}")
+            raise
+    
+    def import_snapshot(self, path: str, replace: bool = False) -> int:
+        """
+        Restore a snapshot into the collection with bulk writes.
+        
+        With replace, the snapshot is validated and loaded into a new physical
+        collection that the alias is switched to once the import succeeded, so
+        a bad snapshot never leaves the live collection empty.
+        
+        Args:
+            path: Snapshot directory
+            replace: Replace the collection's contents with the snapshot
+        
+        Returns:
+            Number of records imported
+        """
+        try:
+            validate_snapshot(path, self.embedding_model)
+            if not replace:
+                return import_collection(
+                    self.collection,
+                    path,
+                    batch_size=self.client.get_max_batch_size(),
+                    embedding_model=self.embedding_model,
+                    registry=get_document_registry()
+                )
+            
+            collection = self._new_physical_collection()
+            try:
+                count = import_collection(
+                    collection,
+                    path,
+                    batch_size=self.client.get_max_batch_size(),
+                    embedding_model=self.embedding_model,
+                    registry=get_document_registry()
+                )
+            except Exception:
+                self.client.delete_collection(name=collection.name)
+                raise
+            
+            previous = self._switch_collection(collection)
+            self.client.delete_collection(name=previous)
+            return count
+            
+        except Exception as e:
+            logger.error(f"Error importing snapshot: {str(e)}")
+            raise
+    
+    def compact(self) -> int:
+        """
+        Rebuild the collection to reclaim space left behind by deletions.
+        
+        The collection is bulk-loaded into a new physical collection, which drops
+        deleted entries from the HNSW index, then the alias is switched to it.
+        Readers keep using the old collection until the switch, writes made
+        during the rebuild are copied over before and after it, and the old
+        collection is only deleted once other processes re-read the alias.
+        
+        Returns:
+            Number of records in the rebuilt collection
+        """
+        try:
+            self.refresh(force=True)
+            source = self.collection
+            target = self._new_physical_collection()
+            try:
+                with tempfile.TemporaryDirectory(prefix="compact_") as snapshot_dir:
+                    export_collection(source, snapshot_dir, embedding_model=self.embedding_model)
+                    import_collection(
+                        target,
+                        snapshot_dir,
+                        batch_size=self.client.get_max_batch_size(),
+                        embedding_model=self.embedding_model
+                    )
+                sync_collections(source, target)
+            except Exception:
+                self.client.delete_collection(name=target.name)
+                raise
+            
+            self._switch_collection(target)
+            
+            # Other processes may write to the old collection until their next alias refresh;
+            # records only in the new collection were written after the switch and are kept
+            time.sleep(EMBEDDING_ALIAS_REFRESH_SECONDS)
+            synced = sync_collections(source, target, delete_removed=False)
+            self.client.delete_collection(name=source.name)
+            
+            count = target.count()
+            logger.info(
+                f"Compacted collection {self.collection_name} ({count} records, "
+                f"{synced['copied']} late writes copied)"
+            )
+            return count
+            
+        except Exception as e:
+            logger.error(f"Error compacting collection: {str(e)}")
+            raise
+
+
+def create_vector_store(collection_name: str = "assignment_documents") -> BaseVectorStore:
+    """
+    Create the vector store configured for this deployment.
+    
+    Args:
+        collection_name: Name of the collection to use
+    
+    Returns:
+        ShardedVectorStore when VECTORSTORE_SHARDS > 1, otherwise VectorStore
+    """
+    if CHROMA_SERVER_HOST:
+        if VECTORSTORE_SHARDS > 1:
+            logger.warning("VECTORSTORE_SHARDS is ignored when CHROMA_SERVER_HOST is set")
+        return VectorStore(collection_name)
+    
+    if VECTORSTORE_SHARDS > 1:
+        from src.utils.sharded_vector_store import ShardedVectorStore
+        return ShardedVectorStore(collection_name, num_shards=VECTORSTORE_SHARDS)
+    
+    return VectorStore(collection_name)
@@ -11,14 +11,29 @@ import time
 import io
 from contextlib import redirect_stdout, redirect_stderr
 import queue
-import threading
+import uuid
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from config.settings import UPLOADS_DIR, MAX_UPLOAD_SIZE_MB
+from config.settings import (
+    UPLOADS_DIR,
+    MAX_UPLOAD_SIZE_MB,
+    SESSION_INDEX_ENABLED,
+    SUMMARY_INDEX_ENABLED,
+    EMBEDDING_MIGRATION_AUTO
+)
 from src.utils.pdf_processor import PDFProcessor
-from src.utils.vector_store import VectorStore
+from src.utils.document_registry import get_document_registry
+from src.utils.vector_store import create_vector_store
+from src.utils.ingestion_queue import IngestionQueue
+from src.utils.session_index import SessionIndexManager, SessionVectorStore
+from src.utils.janitor import Janitor
+from src.utils.summary_index import get_summary_index
+from src.utils.embedding_migration import EmbeddingMigration
+from src.utils.llm_cache import get_llm_cache
+from src.utils.llm_pool import get_pool_stats
+from src.utils.usage_tracker import get_usage_tracker
 from src.crews.study_plan_crew import StudyPlanCrew
 from src.crews.rag_crew import RAGCrew
 from loguru import logger
@@ -94,6 +109,9 @@ st.markdown("""
 # Initialize session state
 def init_session_state():
     """Initialize session state variables."""
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    
     if "vector_store" not in st.session_state:
         st.session_state.vector_store = None
     
@@ -114,6 +132,9 @@ def init_session_state():
     
     if "agent_logs" not in st.session_state:
         st.session_state.agent_logs = []
+    
+    if "last_run_id" not in st.session_state:
+        st.session_state.last_run_id = None
 
 
 class OutputCapture:
@@ -122,7 +143,7 @@ class OutputCapture:
     def __init__(self):
         self.logs = []
         self.output_queue = queue.Queue()
-        
+    
     def write(self, text):
         """Capture written text."""
         if text and text.strip():
@@ -175,7 +196,61 @@ class OutputCapture:
 @st.cache_resource
 def get_vector_store():
     """Get cached vector store instance."""
-    return VectorStore()
+    return create_vector_store()
+
+
+@st.cache_resource
+def get_ingestion_queue():
+    """Get cached single-writer ingestion queue shared by all sessions."""
+    return IngestionQueue(get_vector_store())
+
+
+@st.cache_resource
+def get_session_index_manager():
+    """Get cached in-memory session index tier."""
+    return SessionIndexManager(get_vector_store(), ingestion_queue=get_ingestion_queue())
+
+
+@st.cache_resource
+def get_janitor():
+    """Get cached background janitor for uploads, session data and artifacts."""
+    janitor = Janitor(
+        get_vector_store(),
+        session_manager=get_session_index_manager(),
+        summary_index=get_summary_index() if SUMMARY_INDEX_ENABLED else None
+    )
+    janitor.start()
+    return janitor
+
+
+@st.cache_resource
+def get_embedding_migration():
+    """Get the background migration of the vector store to EMBEDDING_MODEL, if one is needed."""
+    vector_store = get_vector_store()
+    if not EMBEDDING_MIGRATION_AUTO or not hasattr(vector_store, "client"):
+        return None
+    # Summaries are queried alongside the documents, so they move to the new model too
+    companions = [get_summary_index().store] if SUMMARY_INDEX_ENABLED else []
+    migration = EmbeddingMigration(vector_store, companions=companions)
+    if not migration.needed:
+        return None
+    migration.start()
+    return migration
+
+
+def get_session_vector_store():
+    """Get the vector store for this session (in-memory tier when enabled)."""
+    if SESSION_INDEX_ENABLED:
+        return SessionVectorStore(st.session_state.session_id, get_session_index_manager())
+    return get_vector_store()
+
+
+def index_chunks(chunks):
+    """Index chunks in the session tier, or through the shared ingestion queue."""
+    if isinstance(st.session_state.vector_store, SessionVectorStore):
+        st.session_state.vector_store.add_documents(chunks)
+    else:
+        get_ingestion_queue().add_documents(chunks)
 
 
 @st.cache_resource
@@ -184,10 +259,11 @@ def get_study_plan_crew():
     return StudyPlanCrew()
 
 
-@st.cache_resource
-def get_rag_crew(_vector_store):
-    """Get cached RAG crew instance."""
-    return RAGCrew(_vector_store)
+def get_rag_crew(vector_store):
+    """Get the RAG crew bound to this session's vector store."""
+    if st.session_state.get("rag_crew") is None:
+        st.session_state.rag_crew = RAGCrew(vector_store)
+    return st.session_state.rag_crew
 
 
 def process_pdf(uploaded_file):
@@ -203,93 +279,82 @@ def process_pdf(uploaded_file):
         result = processor.extract_text_from_pdf(str(file_path))
         
         return result
-    
+        
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}")
         raise
 
 
-def run_crew_with_logs(crew_func, *args, **kwargs):
-    """Run crew function and capture verbose output."""
+STAGE_LABELS = {
+    "extracting": "🔍 Extracting assignment details...",
+    "researching": "🌐 Researching study resources for each topic...",
+    "planning": "📋 Writing your study plan...",
+    "answering": "💬 Searching materials and writing the answer...",
+    "escalating": "🌐 Documents were not enough, searching the web as well..."
+}
+
+
+def run_crew_streaming(output_placeholder, stream_func, *args, **kwargs):
+    """Run a streaming crew function, rendering answer tokens as they arrive."""
     # Create expandable section for logs
-    log_expander = st.expander("🔍 View Agent Thought Process", expanded=True)
+    log_expander = st.expander("🔍 View Agent Thought Process", expanded=False)
     
     with log_expander:
         log_container = st.empty()
-        progress_text = st.empty()
-        
-        # Create output capture
-        capture = OutputCapture()
-        
-        # Show initial message
-        progress_text.info("🤖 AI agents are working... Check the thought process below!")
-        
-        def run_with_capture():
-            """Run function with output capture."""
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
+    progress_text = st.empty()
+    progress_text.info("🤖 AI agents are working...")
+    
+    capture = OutputCapture()
+    old_stdout = sys.stdout
+    old_stderr = sys.stderr
+    
+    answer = ""
+    result = None
+    last_log_update = 0.0
+    
+    try:
+        # Redirect stdout and stderr for crew verbose output
+        sys.stdout = capture
+        sys.stderr = capture
+        
+        for event in stream_func(*args, **kwargs):
+            if event["type"] == "stage":
+                progress_text.info(STAGE_LABELS.get(event["stage"], event["stage"]))
+            elif event["type"] == "token":
+                answer += event["text"]
+                output_placeholder.markdown(answer + "▌")
+            elif event["type"] == "result":
+                result = event["result"]
             
-            try:
-                # Redirect stdout and stderr
-                sys.stdout = capture
-                sys.stderr = capture
+            if time.time() - last_log_update > 0.5:
+                log_container.markdown(capture.get_formatted_logs(), unsafe_allow_html=True)
+                last_log_update = time.time()
                 
-                # Execute crew function
-                return crew_func(*args, **kwargs)
-                
-            finally:
-                # Restore stdout/stderr
-                sys.stdout = old_stdout
-                sys.stderr = old_stderr
-        
-        # Run in thread and update UI periodically
-        result_container = {'result': None, 'error': None}
-        
-        def execute():
-            try:
-                result_container['result'] = run_with_capture()
-            except Exception as e:
-                result_container['error'] = e
-        
-        # Start execution thread
-        thread = threading.Thread(target=execute)
-        thread.start()
-        
-        # Update logs while thread is running
-        while thread.is_alive():
-            # Get new logs from queue
-            try:
-                while True:
-                    capture.output_queue.get_nowait()
-            except queue.Empty:
-                pass
-            
-            # Update display
-            log_container.markdown(capture.get_formatted_logs(), unsafe_allow_html=True)
-            time.sleep(0.5)
-        
-        thread.join()
-        
-        # Final update
-        log_container.markdown(capture.get_formatted_logs(), unsafe_allow_html=True)
-        
-        # Store logs
-        st.session_state.agent_logs = capture.logs
-        
-        # Check for errors
-        if result_container['error']:
-            progress_text.error(f"❌ Error: {str(result_container['error'])}")
-            raise result_container['error']
-        
-        # Show completion
-        progress_text.success("✅ Process completed! Review the agent thought process above.")
-        
-        return result_container['result']
+    finally:
+        # Restore stdout/stderr
+        sys.stdout = old_stdout
+        sys.stderr = old_stderr
+    
+    # Final update
+    log_container.markdown(capture.get_formatted_logs(), unsafe_allow_html=True)
+    st.session_state.agent_logs = capture.logs
+    
+    progress_text.empty()
+    if result is None:
+        result = {"success": False, "error": "The run ended without a result"}
+    # The usage tracker is shared by every session, so remember which run was this session's
+    st.session_state.last_run_id = result.get("run_id", st.session_state.last_run_id)
+    if not result["success"]:
+        output_placeholder.empty()
+    
+    return result
 
 
 def main():
     """Main application function."""
     init_session_state()
+    get_janitor()
+    migration = get_embedding_migration()
     
     # Header
     st.markdown('<div class="main-header">📚 Multi Agentic Assignment Plan Generator</div>', unsafe_allow_html=True)
@@ -332,21 +397,27 @@ def main():
                         
                         # Update vector store
                         if st.session_state.vector_store is None:
-                            st.session_state.vector_store = get_vector_store()
+                            st.session_state.vector_store = get_session_vector_store()
                         
                         # Chunk and add to vector store
                         from src.utils.embeddings import EmbeddingManager
                         embedding_mgr = EmbeddingManager()
+                        doc_id = get_document_registry().register_document(result['metadata'], result['pages'])
                         chunks = embedding_mgr.chunk_pages(
                             result['pages'], 
-                            result['metadata']
+                            result['metadata'],
+                            doc_id=doc_id
                         )
                         all_chunks.extend(chunks)
                         
+                        # Summarize pages and document in the background
+                        if SUMMARY_INDEX_ENABLED:
+                            get_summary_index().submit(result['pages'], result['metadata'])
+                        
                         st.session_state.uploaded_docs.append(uploaded_file.name)
                     
                     # Add all chunks to vector store
-                    st.session_state.vector_store.add_documents(all_chunks)
+                    index_chunks(all_chunks)
                     
                     # Store combined text
                     st.session_state.assignment_text = "\n\n".join(all_text)
@@ -370,16 +441,20 @@ def main():
             
             # Add to vector store
             if st.session_state.vector_store is None:
-                st.session_state.vector_store = get_vector_store()
+                st.session_state.vector_store = get_session_vector_store()
             
             try:
                 from src.utils.embeddings import EmbeddingManager
                 embedding_mgr = EmbeddingManager()
-                chunks = embedding_mgr.chunk_text(
-                    text_input, 
-                    {"source": "manual_input", "file_name": "User Input"}
+                metadata = {"source": "manual_input", "file_name": "User Input"}
+                doc_id = get_document_registry().register_document(
+                    metadata,
+                    [{"page_number": 0, "text": text_input}]
                 )
-                st.session_state.vector_store.add_documents(chunks)
+                chunks = embedding_mgr.chunk_text(text_input, metadata, doc_id=doc_id)
+                index_chunks(chunks)
+                if SUMMARY_INDEX_ENABLED:
+                    get_summary_index().submit([{"page_number": 0, "text": text_input}], metadata)
                 st.success("✅ Text saved and indexed!")
             except Exception as e:
                 st.error(f"❌ Error indexing text: {str(e)}")
@@ -402,6 +477,11 @@ def main():
                     st.session_state.vector_store.clear_collection()
                 st.success("✅ Assignment data cleared!")
                 st.rerun()
+            
+            if isinstance(st.session_state.vector_store, SessionVectorStore):
+                if st.button("💾 Save to Persistent Index"):
+                    st.session_state.vector_store.save()
+                    st.success("✅ Assignment saved to the persistent index!")
     
     # Tab 2: Generate Study Plan
     with tab2:
@@ -437,22 +517,27 @@ def main():
             # Generate button
             if st.button("🚀 Generate Study Plan", type="primary", use_container_width=True):
                 try:
-                    # Get crew and generate plan with log capture
+                    # Get crew and stream the plan as it is written
                     crew = get_study_plan_crew()
                     
-                    result = run_crew_with_logs(
-                        crew.generate_study_plan,
+                    plan_placeholder = st.empty()
+                    
+                    result = run_crew_streaming(
+                        plan_placeholder,
+                        crew.stream_study_plan,
                         assignment_text=st.session_state.assignment_text,
                         deadline=deadline_datetime
                     )
                     
                     if result["success"]:
+                        # The full plan is rendered below
+                        plan_placeholder.empty()
                         st.session_state.study_plan = result["study_plan"]
                         st.session_state.deadline = result["deadline"]
                         st.balloons()
                     else:
                         st.error(f"❌ Error: {result['error']}")
-                
+                        
                 except Exception as e:
                     st.error(f"❌ Error generating study plan: {str(e)}")
                     logger.error(f"Study plan generation error: {str(e)}")
@@ -495,17 +580,19 @@ def main():
                 # Get AI response
                 with st.chat_message("assistant"):
                     try:
-                        # Get RAG crew and answer with log capture
+                        # Get RAG crew and stream the answer as it is written
                         rag_crew = get_rag_crew(st.session_state.vector_store)
+                        answer_placeholder = st.empty()
                         
-                        result = run_crew_with_logs(
-                            rag_crew.answer_question,
+                        result = run_crew_streaming(
+                            answer_placeholder,
+                            rag_crew.stream_answer,
                             prompt
                         )
                         
                         if result["success"]:
                             answer = str(result["answer"])
-                            st.markdown(answer)
+                            answer_placeholder.markdown(answer)
                             st.session_state.chat_history.append({
                                 "role": "assistant", 
                                 "content": answer
@@ -517,7 +604,7 @@ def main():
                                 "role": "assistant", 
                                 "content": error_msg
                             })
-                    
+                            
                     except Exception as e:
                         error_msg = f"❌ Error: {str(e)}"
                         st.error(error_msg)
@@ -552,7 +639,52 @@ def main():
         st.metric("Documents Uploaded", len(st.session_state.uploaded_docs))
         if st.session_state.vector_store:
             st.metric("Chunks Indexed", st.session_state.vector_store.get_collection_count())
+            ingest_stats = get_ingestion_queue().stats()
+            st.metric("Ingest Queue Depth", ingest_stats["pending_chunks"])
+            st.metric("Avg Commit Latency", f"{ingest_stats['avg_commit_ms']:.0f} ms")
         st.metric("Chat Messages", len(st.session_state.chat_history))
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            cache_stats = llm_cache.stats()
+            st.metric("LLM Cache Hits", cache_stats["hits"], help=f"Hit rate {cache_stats['hit_rate']:.0%}")
+        pool_stats = get_pool_stats()
+        if pool_stats["requests"]:
+            st.metric(
+                "LLM Connections",
+                f"{pool_stats['open_connections']}/{pool_stats['max_connections']}",
+                help=f"{pool_stats['requests']} requests, avg {pool_stats['avg_request_ms']:.0f} ms, peak {pool_stats['max_in_flight']} in flight"
+            )
+        last_run = next(
+            (run for run in get_usage_tracker().recent() if run["run_id"] == st.session_state.last_run_id),
+            None
+        )
+        if last_run is not None:
+            totals = last_run["totals"]
+            st.metric(
+                "Last Run Tokens",
+                f"{totals['prompt_tokens'] + totals['completion_tokens']:,}",
+                help=(
+                    f"{last_run['crew']}: {totals['llm_calls']} LLM calls, {totals['tool_calls']} tool calls, "
+                    f"~${totals['cost_usd']:.4f}, {totals['wall_seconds']:.1f}s"
+                )
+            )
+            with st.expander("Usage by agent"):
+                st.table([
+                    {
+                        "agent": agent,
+                        "LLM calls": usage["llm_calls"],
+                        "prompt tokens": usage["prompt_tokens"],
+                        "completion tokens": usage["completion_tokens"],
+                        "tool calls": usage["tool_calls"],
+                        "cost (USD)": f"{usage['cost_usd']:.4f}",
+                        "wall (s)": f"{usage['wall_seconds']:.1f}"
+                    }
+                    for agent, usage in last_run["agents"].items()
+                ])
+        if migration is not None:
+            progress = migration.progress()
+            st.caption(f"Re-embedding with {progress['target_model']}: {progress['state']}")
+            st.progress(min(progress["percent"] / 100.0, 1.0))
         
         st.markdown("---")
         st.caption("Powered by CrewAI, OpenAI GPT-4o, and SerperAPI")
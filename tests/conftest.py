@@ -0,0 +1,69 @@
+"""Shared test setup."""
+
+import os
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# config.settings refuses to import without API keys; tests never call the APIs
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("SERPER_API_KEY", "test-key")
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+class FakeEventBus:
+    """Synchronous stand-in for crewai's event bus."""
+    
+    def __init__(self):
+        self.handlers = {}
+        self.lock = threading.Lock()
+    
+    def on(self, event_type):
+        def register(handler):
+            with self.lock:
+                self.handlers.setdefault(event_type, []).append(handler)
+            return handler
+        return register
+    
+    def off(self, event_type, handler):
+        with self.lock:
+            self.handlers[event_type].remove(handler)
+    
+    def emit(self, source, event):
+        with self.lock:
+            handlers = list(self.handlers.get(type(event), []))
+        for handler in handlers:
+            handler(source, event)
+
+
+class CallStarted:
+    pass
+
+
+class StreamChunk:
+    def __init__(self, chunk):
+        self.chunk = chunk
+
+
+@pytest.fixture
+def event_bus(monkeypatch):
+    """Fake crewai event bus used by stream_final_answer, with its event types as attributes."""
+    from src.utils import streaming
+    
+    bus = FakeEventBus()
+    bus.started_event = CallStarted
+    bus.chunk_event = StreamChunk
+    monkeypatch.setattr(streaming, "_llm_events", lambda: (bus, CallStarted, StreamChunk))
+    return bus
+
+
+@pytest.fixture
+def document_registry(tmp_path):
+    """Process-wide document registry backed by a temporary database."""
+    from src.utils.document_registry import DocumentRegistry, use_document_registry
+    
+    with use_document_registry(DocumentRegistry(str(tmp_path / "documents.sqlite3"))) as registry:
+        yield registry
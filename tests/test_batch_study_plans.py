@@ -0,0 +1,98 @@
+"""Tests of resuming and deduplicating batch study plan generation."""
+
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from src.crews import batch_study_plans
+from src.crews.batch_study_plans import BatchStudyPlanner, load_manifest
+
+
+class FakeCrew:
+    """StudyPlanCrew that records the assignments it plans and fails on request."""
+    
+    calls = []
+    lock = threading.Lock()
+    
+    def generate_study_plan(self, assignment_text, deadline, current_date=None):
+        with self.lock:
+            self.calls.append(assignment_text)
+        if "fail" in assignment_text:
+            return {"success": False, "error": "planning failed"}
+        return {
+            "success": True,
+            "study_plan": f"Plan for {assignment_text} by {deadline:%Y-%m-%d}",
+            "deadline": deadline.isoformat(),
+            "generated_at": "2026-10-19T09:00:00"
+        }
+
+
+@pytest.fixture
+def crew_calls(monkeypatch):
+    monkeypatch.setattr(batch_study_plans, "StudyPlanCrew", FakeCrew)
+    monkeypatch.setattr(FakeCrew, "calls", [])
+    return FakeCrew.calls
+
+
+def test_identical_assignments_are_generated_once(tmp_path, crew_calls):
+    (tmp_path / "essay.txt").write_text("Essay on rivers")
+    entries = [
+        {"id": "a", "text": "Lab report", "deadline": "2026-12-01"},
+        {"id": "b", "text": "Lab report", "deadline": "2026-12-01"},
+        {"id": "c", "text": "Lab report", "deadline": "2026-12-02"},
+        {"id": "d", "assignment": "essay.txt", "deadline": "2026-12-01"},
+        {"id": "e", "assignment": "./essay.txt", "deadline": "2026-12-01"}
+    ]
+    
+    report = BatchStudyPlanner(tmp_path / "plans", max_concurrency=3).run(entries, base_dir=tmp_path)
+    
+    assert sorted(crew_calls) == ["Essay on rivers", "Lab report", "Lab report"]
+    assert report["succeeded"] == 5
+    assert report["deduplicated"] == 2
+    assert report["failed"] == []
+    assert (tmp_path / "plans" / "b.md").read_text() == (tmp_path / "plans" / "a.md").read_text()
+    duplicate = json.loads((tmp_path / "plans" / "e.json").read_text())
+    assert duplicate["success"] and duplicate["duplicate_of"] == "d"
+
+
+def test_rerun_resumes_after_failures(tmp_path, crew_calls):
+    entries = [
+        {"id": "ok", "text": "Lab report", "deadline": "2026-12-01"},
+        {"id": "bad", "text": "fail this one", "deadline": "2026-12-01"}
+    ]
+    planner = BatchStudyPlanner(tmp_path, max_concurrency=2)
+    
+    first = planner.run(entries)
+    assert first["failed"] == ["bad"]
+    assert not (tmp_path / "bad.md").exists()
+    assert json.loads((tmp_path / "bad.json").read_text())["error"] == "planning failed"
+    
+    entries[1]["text"] = "Fixed report"
+    second = planner.run(entries)
+    
+    assert sorted(crew_calls[:2]) == ["Lab report", "fail this one"]
+    assert crew_calls[2:] == ["Fixed report"]
+    assert second["skipped"] == 1
+    assert second["succeeded"] == 1
+    assert (tmp_path / "bad.md").exists()
+
+
+def test_force_regenerates_existing_plans(tmp_path, crew_calls):
+    entries = [{"id": "ok", "text": "Lab report", "deadline": "2026-12-01"}]
+    BatchStudyPlanner(tmp_path).run(entries)
+    
+    report = BatchStudyPlanner(tmp_path, force=True).run(entries)
+    
+    assert crew_calls == ["Lab report", "Lab report"]
+    assert report["skipped"] == 0
+
+
+def test_manifest_ids_must_be_unique(tmp_path):
+    manifest = tmp_path / "cohort.csv"
+    manifest.write_text("id,text,deadline\n1,Lab report,2026-12-01\n1,Essay,2026-12-02\n")
+    
+    with pytest.raises(ValueError):
+        load_manifest(str(manifest))
@@ -0,0 +1,76 @@
+"""Tests of span merging and token-budgeted context packing."""
+
+from src.utils.context_packer import (
+    MIN_TRUNCATED_SPAN_TOKENS,
+    count_tokens,
+    format_result,
+    merge_spans,
+    pack_context
+)
+
+PAGE = "The mitochondria is the powerhouse of the cell and makes most of its ATP."
+
+
+def chunk(start, end, page_number=1, doc_id="doc"):
+    return PAGE[start:end], {"doc_id": doc_id, "page_number": page_number, "start_index": start, "end_index": end}
+
+
+def test_overlapping_chunks_are_stitched_without_repeating_the_overlap():
+    (a, a_meta), (b, b_meta), (c, c_meta) = chunk(30, 60), chunk(0, 40), chunk(60, len(PAGE))
+    
+    spans = merge_spans([a, b, c], [a_meta, b_meta, c_meta])
+    
+    assert len(spans) == 1
+    assert spans[0]["text"] == PAGE
+    assert spans[0]["rank"] == 0
+
+
+def test_chunk_inside_another_adds_nothing():
+    (outer, outer_meta), (inner, inner_meta) = chunk(0, 50), chunk(10, 20)
+    
+    spans = merge_spans([inner, outer], [inner_meta, outer_meta])
+    
+    assert [span["text"] for span in spans] == [PAGE[:50]]
+
+
+def test_chunks_of_other_pages_or_without_offsets_stay_apart():
+    (a, a_meta), (b, b_meta) = chunk(0, 40), chunk(30, 60, page_number=2)
+    
+    spans = merge_spans([b, "loose text", a, "loose  text"], [b_meta, {}, a_meta, {}])
+    
+    # Ordered by relevance, with the duplicate loose chunk dropped
+    assert [span["text"] for span in spans] == [b, "loose text", a]
+
+
+def test_first_span_over_budget_is_truncated():
+    text = "word " * 400
+    metadata = {"file_name": "notes.pdf", "page_number": 3}
+    budget = count_tokens(format_result(1, "", metadata)) + MIN_TRUNCATED_SPAN_TOKENS + 10
+    
+    context, stats = pack_context({"documents": [text, "second"], "metadatas": [metadata, metadata]}, token_budget=budget)
+    
+    assert context.startswith("[Result 1] (notes.pdf, Page 3):\nword word")
+    assert "second" not in context
+    assert stats["spans"] == 1
+    assert stats["truncated"]
+    assert stats["tokens"] <= budget
+
+
+def test_first_span_is_dropped_when_only_a_fragment_would_fit():
+    metadata = {"file_name": "notes.pdf", "page_number": 3}
+    budget = count_tokens(format_result(1, "", metadata)) + MIN_TRUNCATED_SPAN_TOKENS - 1
+    
+    context, stats = pack_context({"documents": ["word " * 400], "metadatas": [metadata]}, token_budget=budget)
+    
+    assert context == ""
+    assert stats == {"chunks": 1, "spans": 0, "tokens": 0, "truncated": True}
+
+
+def test_everything_fits_within_budget():
+    (a, a_meta), (b, b_meta) = chunk(0, 40), chunk(30, 60, page_number=2)
+    
+    context, stats = pack_context({"documents": [a, b], "metadatas": [a_meta, b_meta]}, token_budget=1000)
+    
+    assert context.count("[Result") == 2
+    assert stats == {"chunks": 2, "spans": 2, "tokens": stats["tokens"], "truncated": False}
+    assert 0 < stats["tokens"] <= 1000
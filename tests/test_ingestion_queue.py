@@ -0,0 +1,76 @@
+"""Tests of group commit in the ingestion queue."""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.ingestion_queue import IngestionQueue, _PendingBatch
+
+
+class FakeStore:
+    """Vector store that records its writes and rejects chunks marked bad."""
+    
+    embedding_model = "fake-embedding"
+    
+    def __init__(self):
+        self.embedding_manager = SimpleNamespace(
+            model=self.embedding_model,
+            get_embeddings=lambda texts: [[float(len(text))] for text in texts]
+        )
+        self.writes = []
+        self.lock = threading.Lock()
+    
+    def refresh(self):
+        pass
+    
+    def add_documents(self, chunks, embeddings=None, embedding_model=None):
+        if any(chunk["metadata"].get("bad") for chunk in chunks):
+            raise ValueError("rejected chunk")
+        with self.lock:
+            self.writes.append([chunk["chunk_id"] for chunk in chunks])
+
+
+def make_batch(*chunk_ids, bad=False):
+    chunks = [{"chunk_id": chunk_id, "text": chunk_id, "metadata": {"bad": bad}} for chunk_id in chunk_ids]
+    return _PendingBatch(chunks, [[0.0] for _ in chunks], FakeStore.embedding_model)
+
+
+@pytest.fixture
+def ingestion_queue():
+    ingestion_queue = IngestionQueue(FakeStore(), commit_interval_ms=50)
+    yield ingestion_queue
+    ingestion_queue.close()
+
+
+def test_batches_are_grouped_into_one_write(ingestion_queue):
+    futures = [ingestion_queue.submit([{"chunk_id": f"c{i}", "text": "text", "metadata": {}}]) for i in range(5)]
+    
+    assert [future.result(timeout=5) for future in futures] == [1] * 5
+    assert ingestion_queue.vector_store.writes == [["c0", "c1", "c2", "c3", "c4"]]
+    stats = ingestion_queue.stats()
+    assert stats["commits"] == 1
+    assert stats["committed_chunks"] == 5
+    assert stats["pending_chunks"] == 0
+
+
+def test_duplicate_chunks_are_written_once(ingestion_queue):
+    group = [make_batch("a", "b"), make_batch("b", "c")]
+    
+    ingestion_queue._commit(group)
+    
+    assert ingestion_queue.vector_store.writes == [["a", "b", "c"]]
+    assert [batch.future.result() for batch in group] == [2, 2]
+
+
+def test_failed_batch_does_not_fail_its_group(ingestion_queue):
+    group = [make_batch("a"), make_batch("b", bad=True), make_batch("c")]
+    
+    ingestion_queue._commit(group)
+    
+    assert group[0].future.result() == 1
+    assert group[2].future.result() == 1
+    with pytest.raises(ValueError):
+        group[1].future.result()
+    assert ingestion_queue.vector_store.writes == [["a"], ["c"]]
+    assert ingestion_queue.stats()["committed_chunks"] == 2
@@ -0,0 +1,118 @@
+"""Tests of crew kickoffs with model fallback."""
+
+import asyncio
+import copy
+import threading
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from src.utils import llm_pool
+from src.utils.streaming import stream_final_answer
+
+
+class FakeCrew:
+    """Crew whose first kickoff times out behind a wrapping error."""
+    
+    def __init__(self, agents, event_bus=None, failures=1):
+        self.agents = agents
+        self.event_bus = event_bus
+        self.failures = failures
+        self.kickoffs = []
+    
+    def copy(self):
+        crew = copy.copy(self)
+        crew.agents = [copy.copy(agent) for agent in self.agents]
+        return crew
+    
+    def kickoff(self):
+        llm = self.agents[0].llm
+        self.kickoffs.append(llm.model)
+        if len(self.kickoffs) <= self.failures:
+            try:
+                raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com"))
+            except openai.APITimeoutError as e:
+                raise RuntimeError("Agent execution failed") from e
+        if self.event_bus is not None:
+            self.event_bus.emit(llm, self.event_bus.chunk_event(f"Final Answer: from {llm.model}"))
+        return f"answer from {llm.model}"
+
+
+@pytest.fixture
+def fallback_llms(monkeypatch):
+    monkeypatch.setattr(llm_pool, "get_llm_cache", lambda: None)
+    monkeypatch.setattr(llm_pool, "default_fallback_model", lambda model: "small" if model == "large" else None)
+    monkeypatch.setattr(
+        llm_pool,
+        "get_agent_llm",
+        lambda temperature, model: SimpleNamespace(model=model, temperature=temperature, stream=False)
+    )
+
+
+def test_retry_runs_copies_on_the_fallback_model(fallback_llms):
+    llm = SimpleNamespace(model="large", temperature=0.5, stream=False)
+    agent = SimpleNamespace(llm=llm)
+    crew = FakeCrew([agent])
+    
+    assert llm_pool.kickoff_with_fallback(crew) == "answer from small"
+    assert agent.llm is llm
+    assert crew.kickoffs == ["large", "small"]
+
+
+def test_retry_streams_into_the_original_stream(fallback_llms, event_bus):
+    agent = SimpleNamespace(llm=SimpleNamespace(model="large", temperature=0.5, stream=False))
+    crew = FakeCrew([agent], event_bus)
+    tokens = []
+    
+    with stream_final_answer(agent, tokens.append):
+        llm_pool.kickoff_with_fallback(crew)
+    
+    assert "".join(token["text"] for token in tokens) == "from small"
+
+
+def test_errors_without_a_fallback_are_raised(fallback_llms):
+    crew = FakeCrew([SimpleNamespace(llm=SimpleNamespace(model="small", temperature=0.5, stream=False))])
+    
+    with pytest.raises(RuntimeError):
+        llm_pool.kickoff_with_fallback(crew)
+
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def test_slot_wait_times_out_with_pool_timeout():
+    slots = llm_pool._SlotLimiter(1)
+    slots.acquire(REQUEST, None)
+    
+    with pytest.raises(httpx.PoolTimeout):
+        slots.acquire(REQUEST, 0.05)
+    
+    slots.release()
+    slots.acquire(REQUEST, 0.05)
+
+
+def test_freed_slots_go_to_async_waiters_and_abandoned_waits_keep_none():
+    slots = llm_pool._SlotLimiter(1)
+    slots.acquire(REQUEST, None)
+    
+    async def scenario():
+        timed_out = asyncio.ensure_future(slots.acquire_async(REQUEST, 0.05))
+        cancelled = asyncio.ensure_future(slots.acquire_async(REQUEST, None))
+        waiting = asyncio.ensure_future(slots.acquire_async(REQUEST, None))
+        await asyncio.sleep(0.1)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        
+        # Released from another thread, as a sync request would
+        threading.Thread(target=slots.release).start()
+        await asyncio.wait_for(waiting, 1)
+        with pytest.raises(httpx.PoolTimeout):
+            await timed_out
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+    
+    asyncio.run(scenario())
+    slots.release()
+    slots.acquire(REQUEST, 0.05)
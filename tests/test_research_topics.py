@@ -0,0 +1,79 @@
+"""Tests of key topic parsing and research result merging."""
+
+from src.utils.research_topics import extract_key_topics, merge_resources
+
+
+EXTRACTION_OUTPUT = """**Assignment Analysis**
+
+**1. Assignment Topic/Title:** Building a Sentiment Classifier for Product Reviews
+
+**2. Course Name:** CS 4780 - Machine Learning for Intelligent Systems
+
+**3. Main Requirements and Deliverables:**
+- A Jupyter notebook with the full training pipeline
+- A 4-page report comparing at least two models
+- Deliverable due in week 10
+
+**4. Learning Objectives:**
+1. Apply text preprocessing to real-world data
+2. Evaluate classifiers with appropriate metrics
+
+**5. Key Topics:**
+- **Text Preprocessing** - tokenization, stop words and stemming
+- **TF-IDF Vectorization**: turning documents into sparse features
+- Logistic Regression
+- Naive Bayes – a probabilistic baseline
+- Model Evaluation (precision, recall, F1)
+- text preprocessing
+
+**6. Specific Instructions or Constraints:**
+- Use scikit-learn only; no deep learning frameworks
+"""
+
+RESEARCH_OUTPUTS = {
+    "Text Preprocessing": (
+        "- **NLTK Book, Chapter 3** - https://www.nltk.org/book/ch03.html - Processing raw text\n"
+        "- **scikit-learn text tutorial** - https://scikit-learn.org/stable/tutorial/text_analytics/working_with_text_data.html"
+    ),
+    "TF-IDF Vectorization": (
+        "- **scikit-learn text tutorial** - https://www.scikit-learn.org/stable/tutorial/text_analytics/working_with_text_data.html/ - also covers TF-IDF\n"
+        "- **TF-IDF explained** (https://en.wikipedia.org/wiki/Tf%E2%80%93idf).\n"
+        "Most essential: the scikit-learn tutorial."
+    )
+}
+
+
+def test_extract_key_topics_reads_the_key_topics_list():
+    assert extract_key_topics(EXTRACTION_OUTPUT, max_topics=10) == [
+        "Text Preprocessing",
+        "TF-IDF Vectorization",
+        "Logistic Regression",
+        "Naive Bayes",
+        "Model Evaluation (precision, recall, F1)"
+    ]
+
+
+def test_extract_key_topics_respects_max_topics():
+    assert extract_key_topics(EXTRACTION_OUTPUT, max_topics=2) == ["Text Preprocessing", "TF-IDF Vectorization"]
+
+
+def test_extract_key_topics_reads_inline_topics():
+    details = "## Key Topics: Recursion; Dynamic Programming, Graph Search\n\nOther notes"
+    assert extract_key_topics(details) == ["Recursion", "Dynamic Programming", "Graph Search"]
+
+
+def test_extract_key_topics_without_a_list():
+    assert extract_key_topics("**1. Assignment Topic:** An essay on climate policy") == []
+
+
+def test_merge_resources_drops_urls_listed_for_an_earlier_topic():
+    merged = merge_resources(RESEARCH_OUTPUTS)
+    
+    sections = merged.split("\n\n")
+    assert [section.splitlines()[0] for section in sections] == [
+        "## Text Preprocessing",
+        "## TF-IDF Vectorization"
+    ]
+    assert merged.count("scikit-learn text tutorial") == 1
+    assert "https://en.wikipedia.org/wiki/Tf%E2%80%93idf" in sections[1]
+    assert "Most essential: the scikit-learn tutorial." in sections[1]
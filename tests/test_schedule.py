@@ -0,0 +1,63 @@
+"""Tests of the study schedule skeleton."""
+
+from datetime import date, datetime
+
+import pytest
+
+from src.utils.schedule import build_schedule_skeleton, format_schedule_skeleton
+
+NOW = datetime(2026, 10, 19, 9, 0)
+
+
+def test_deadline_passed():
+    skeleton = build_schedule_skeleton(NOW, datetime(2026, 10, 18, 23, 59), hours_per_day=2, buffer_ratio=0.15)
+    
+    assert skeleton["days_remaining"] == 0
+    assert skeleton["study_days"] == skeleton["buffer_days"] == 0
+    assert skeleton["weeks"] == []
+    assert skeleton["buffer"] is None
+    assert "has passed" in format_schedule_skeleton(skeleton)
+
+
+def test_deadline_later_today_is_one_study_day():
+    skeleton = build_schedule_skeleton(NOW, datetime(2026, 10, 19, 17, 0), hours_per_day=2, buffer_ratio=0.15)
+    
+    assert skeleton["days_remaining"] == 1
+    assert skeleton["study_days"] == 1
+    assert skeleton["buffer"] is None
+    assert skeleton["weeks"] == [
+        {"week": 1, "start": date(2026, 10, 19), "end": date(2026, 10, 19), "days": 1, "hours": 2}
+    ]
+
+
+def test_deadline_earlier_today_has_passed():
+    skeleton = build_schedule_skeleton(NOW, datetime(2026, 10, 19, 8, 0), hours_per_day=2, buffer_ratio=0.15)
+    
+    assert skeleton["days_remaining"] == 0
+
+
+@pytest.mark.parametrize("days, buffer_ratio, buffer_days", [
+    (2, 0.15, 0),   # too short for a buffer
+    (3, 0.1, 1),    # at least one buffer day from three days on
+    (10, 0.15, 2),  # 1.5 rounds to 2
+    (10, 0.25, 2),  # 2.5 rounds half to even
+    (10, 0.95, 9),  # at least one study day is kept
+])
+def test_buffer_rounding(days, buffer_ratio, buffer_days):
+    deadline = datetime(2026, 10, 19 + days, 9, 0)
+    skeleton = build_schedule_skeleton(NOW, deadline, hours_per_day=2, buffer_ratio=buffer_ratio)
+    
+    assert skeleton["days_remaining"] == days
+    assert skeleton["buffer_days"] == buffer_days
+    assert skeleton["study_days"] == days - buffer_days
+    assert sum(week["days"] for week in skeleton["weeks"]) == days - buffer_days
+
+
+def test_weeks_and_buffer_cover_every_day():
+    skeleton = build_schedule_skeleton(NOW, datetime(2026, 11, 8, 12, 0), hours_per_day=1.5, buffer_ratio=0.1)
+    
+    assert skeleton["days_remaining"] == 20
+    assert [week["days"] for week in skeleton["weeks"]] == [7, 7, 4]
+    assert skeleton["weeks"][-1]["end"] == date(2026, 11, 5)
+    assert skeleton["buffer"] == {"start": date(2026, 11, 6), "end": date(2026, 11, 7), "days": 2, "hours": 3.0}
+    assert skeleton["total_hours"] == 30
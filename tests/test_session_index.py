@@ -0,0 +1,129 @@
+"""Tests of session eviction and spilling in the session index."""
+
+import threading
+
+import pytest
+
+from src.utils.session_index import SessionIndexManager, matches_where
+
+MB = 1024 * 1024
+
+
+class FakePersistentStore:
+    """In-memory stand-in for the persistent VectorStore."""
+    
+    embedding_model = "fake-embedding"
+    
+    def __init__(self):
+        self.chunks = []
+        self.on_count = None
+    
+    def _matching(self, where=None):
+        return [chunk for chunk in self.chunks if where is None or matches_where(chunk["metadata"], where)]
+    
+    def add_documents(self, chunks, embeddings=None, embedding_model=None):
+        self.chunks.extend(chunks)
+    
+    def count_documents(self, where):
+        if self.on_count is not None:
+            self.on_count()
+        return len(self._matching(where))
+    
+    def delete_documents(self, where):
+        matching = self._matching(where)
+        self.chunks = [chunk for chunk in self.chunks if chunk not in matching]
+    
+    def query_by_embedding(self, query_embedding, n_results=5, where=None, include_embeddings=False, hydrate=True):
+        matching = self._matching(where)[:n_results]
+        return {
+            "ids": [chunk["chunk_id"] for chunk in matching],
+            "documents": [chunk["text"] for chunk in matching],
+            "metadatas": [chunk["metadata"] for chunk in matching],
+            "distances": [0.0] * len(matching)
+        }
+    
+    def session_ids(self):
+        return {chunk["metadata"]["session_id"] for chunk in self.chunks}
+
+
+def make_chunks(name, count=1):
+    return [{"chunk_id": f"{name}-{i}", "text": name * 500, "metadata": {"file_name": name}} for i in range(count)]
+
+
+def embeddings(count=1):
+    return [[1.0, 0.0, 0.0, 0.0]] * count
+
+
+@pytest.fixture
+def store():
+    return FakePersistentStore()
+
+
+def make_manager(store, **budgets):
+    return SessionIndexManager(store, **{"session_budget_mb": 1, "total_budget_mb": 1, "idle_ttl_minutes": 60, **budgets})
+
+
+def test_least_recently_used_session_is_spilled_over_the_total_budget(store, document_registry):
+    # Room for two single-chunk sessions
+    manager = make_manager(store, total_budget_mb=1500 / MB)
+    manager.add("a", make_chunks("a"), embeddings())
+    manager.add("b", make_chunks("b"), embeddings())
+    manager.query("a", [1.0, 0.0, 0.0, 0.0])
+    
+    manager.add("c", make_chunks("c"), embeddings())
+    
+    assert store.session_ids() == {"b"}
+    assert manager.stats()["spilled_sessions"] == 1
+    assert manager.stats()["sessions"] == 3
+    assert manager.memory_bytes() <= manager.total_budget
+    # The spilled session is now served from the persistent store
+    assert manager.query("b", [1.0, 0.0, 0.0, 0.0])["ids"] == ["b-0"]
+
+
+def test_idle_session_is_spilled_and_released(store, document_registry):
+    manager = make_manager(store)
+    manager.add("a", make_chunks("a", 3), embeddings(3))
+    manager.add("b", make_chunks("b"), embeddings())
+    manager._sessions["a"].last_access -= 2 * manager.idle_ttl
+    
+    manager.evict_idle()
+    
+    assert list(manager._sessions) == ["b"]
+    assert store.session_ids() == {"a"}
+    assert all(chunk["metadata"]["session_saved_at"] for chunk in store.chunks)
+    # A released session comes back from the persistent store
+    assert manager.count("a") == 3
+    assert sorted(manager.query("a", [1.0, 0.0, 0.0, 0.0])["ids"]) == ["a-0", "a-1", "a-2"]
+    assert manager._sessions["a"].spilled
+
+
+def test_session_over_its_budget_spills(store, document_registry):
+    manager = make_manager(store, session_budget_mb=1000 / MB)
+    manager.add("a", make_chunks("a"), embeddings())
+    assert not store.chunks
+    
+    manager.add("a", make_chunks("a", 2), embeddings(2))
+    
+    assert [chunk["chunk_id"] for chunk in store.chunks] == ["a-0", "a-1"]
+    assert manager._sessions["a"].spilled
+    assert manager._sessions["a"].index.count() == 0
+
+
+def test_persistent_lookup_does_not_hold_the_manager_lock(store, document_registry):
+    manager = make_manager(store)
+    lock_free = []
+    
+    def try_lock_from_another_thread():
+        def attempt():
+            acquired = manager._lock.acquire(timeout=1)
+            lock_free.append(acquired)
+            if acquired:
+                manager._lock.release()
+        thread = threading.Thread(target=attempt)
+        thread.start()
+        thread.join()
+    
+    store.on_count = try_lock_from_another_thread
+    manager.add("a", make_chunks("a"), embeddings())
+    
+    assert lock_free == [True]
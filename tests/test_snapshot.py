@@ -0,0 +1,116 @@
+"""Round-trip tests of vector store snapshots."""
+
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from src.utils import vector_store
+from src.utils.document_registry import DocumentRegistry, use_document_registry
+from src.utils.embeddings import EmbeddingManager
+from src.utils.snapshot import MANIFEST_FILE, read_manifest
+from src.utils.vector_store import VectorStore
+
+
+class FakeEmbeddingManager(EmbeddingManager):
+    """Embedding manager with deterministic vectors that never calls the API."""
+    
+    def get_embeddings(self, texts):
+        return [self.get_embedding(text) for text in texts]
+    
+    def get_embedding(self, text):
+        seed = int(hashlib.md5(f"{self.model}:{text}".encode("utf-8")).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(16).tolist()
+
+
+PAGES = [
+    {"page_number": 1, "text": "Photosynthesis turns light into chemical energy. " * 40},
+    {"page_number": 2, "text": "Cellular respiration releases that energy as ATP. " * 40}
+]
+METADATA = {"file_name": "biology.pdf", "source": "upload"}
+
+
+def make_store(path):
+    return VectorStore("snapshot_test", persist_dir=str(path), embedding_manager=FakeEmbeddingManager())
+
+
+def ingest(store, registry):
+    doc_id = registry.register_document(METADATA, PAGES)
+    store.add_documents(store.embedding_manager.chunk_pages(PAGES, METADATA, doc_id=doc_id))
+
+
+def sorted_records(store):
+    records = store.get_records()
+    order = np.argsort(records["ids"])
+    return {key: [values[i] for i in order] for key, values in records.items()}
+
+
+@pytest.mark.parametrize("external_text", [False, True])
+def test_snapshot_round_trip_into_a_new_process(tmp_path, monkeypatch, external_text):
+    monkeypatch.setattr(vector_store, "EXTERNAL_CHUNK_TEXT", external_text)
+    
+    with use_document_registry(DocumentRegistry(str(tmp_path / "source.sqlite3"))) as registry:
+        source = make_store(tmp_path / "source")
+        ingest(source, registry)
+        manifest = source.export_snapshot(str(tmp_path / "snapshot"))
+        expected = sorted_records(source)
+        expected_answer = source.query("light energy", n_results=3, use_mmr=False)
+    
+    # A fresh registry and store, as on another machine
+    with use_document_registry(DocumentRegistry(str(tmp_path / "target.sqlite3"))):
+        target = make_store(tmp_path / "target")
+        assert target.import_snapshot(str(tmp_path / "snapshot")) == manifest["count"] == len(expected["ids"])
+        
+        restored = sorted_records(target)
+        assert restored["ids"] == expected["ids"]
+        assert restored["metadatas"] == expected["metadatas"]
+        assert restored["documents"] == expected["documents"]
+        np.testing.assert_allclose(np.array(restored["embeddings"]), np.array(expected["embeddings"]), rtol=1e-6)
+        
+        # Hydration finds the document metadata and text in the restored registry
+        answer = target.query("light energy", n_results=3, use_mmr=False)
+        assert answer["documents"] == expected_answer["documents"]
+        assert {m["file_name"] for m in answer["metadatas"]} == {"biology.pdf"}
+
+
+def test_float16_snapshot_keeps_vectors_close(tmp_path, document_registry):
+    source = make_store(tmp_path / "source")
+    ingest(source, document_registry)
+    source.export_snapshot(str(tmp_path / "snapshot"), vector_dtype="float16")
+    
+    target = make_store(tmp_path / "target")
+    target.import_snapshot(str(tmp_path / "snapshot"))
+    
+    np.testing.assert_allclose(
+        np.array(sorted_records(target)["embeddings"]),
+        np.array(sorted_records(source)["embeddings"]),
+        atol=1e-2
+    )
+
+
+def test_replace_with_an_incompatible_snapshot_keeps_the_collection(tmp_path, document_registry):
+    source = make_store(tmp_path / "source")
+    ingest(source, document_registry)
+    source.export_snapshot(str(tmp_path / "snapshot"))
+    manifest_path = tmp_path / "snapshot" / MANIFEST_FILE
+    manifest_path.write_text(json.dumps({**read_manifest(str(tmp_path / "snapshot")), "embedding_model": "other-model"}))
+    
+    target = make_store(tmp_path / "target")
+    target.add_documents([{"chunk_id": "kept", "text": "kept chunk", "metadata": {"file_name": "notes"}}])
+    
+    with pytest.raises(ValueError):
+        target.import_snapshot(str(tmp_path / "snapshot"), replace=True)
+    assert target.get_records()["documents"] == ["kept chunk"]
+
+
+def test_replace_swaps_in_only_the_snapshot(tmp_path, document_registry):
+    source = make_store(tmp_path / "source")
+    ingest(source, document_registry)
+    source.export_snapshot(str(tmp_path / "snapshot"))
+    
+    target = make_store(tmp_path / "target")
+    target.add_documents([{"chunk_id": "old", "text": "old chunk", "metadata": {"file_name": "notes"}}])
+    
+    assert target.import_snapshot(str(tmp_path / "snapshot"), replace=True) == source.get_collection_count()
+    assert sorted_records(target)["ids"] == sorted_records(source)["ids"]
@@ -0,0 +1,55 @@
+"""Tests of final-answer streaming from crewai LLM events."""
+
+import threading
+from types import SimpleNamespace
+
+from src.utils import streaming
+
+
+def test_final_answer_tokens_follow_the_marker(event_bus):
+    llm = SimpleNamespace(stream=False)
+    tokens = []
+    
+    with streaming.stream_final_answer(SimpleNamespace(llm=llm), tokens.append):
+        assert llm.stream
+        event_bus.emit(llm, event_bus.started_event())
+        for chunk in ["Thought: plan it\nFinal ", "Answer: Week", " 1"]:
+            event_bus.emit(llm, event_bus.chunk_event(chunk))
+    
+    assert [token["text"] for token in tokens] == ["Week", " 1"]
+    assert not llm.stream
+    assert all(not handlers for handlers in event_bus.handlers.values())
+
+
+def test_concurrent_runs_stream_only_their_own_tokens(event_bus):
+    runs = {name: {"llm": SimpleNamespace(stream=False), "tokens": []} for name in ("first", "second")}
+    entered = threading.Barrier(2)
+    first_done = threading.Event()
+    
+    def run(name: str):
+        llm = runs[name]["llm"]
+        with streaming.stream_final_answer(SimpleNamespace(llm=llm), runs[name]["tokens"].append):
+            entered.wait()
+            event_bus.emit(llm, event_bus.started_event())
+            event_bus.emit(llm, event_bus.chunk_event(f"Final Answer: {name}"))
+            if name == "first":
+                first_done.set()
+                return
+            # The first run has finished; this run keeps streaming
+            first_done.wait()
+            runs[name]["still_streaming"] = llm.stream
+            event_bus.emit(llm, event_bus.chunk_event(" plan"))
+    
+    threads = [
+        threading.Thread(target=run, args=("first",)),
+        threading.Thread(target=run, args=("second",))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert "".join(token["text"] for token in runs["first"]["tokens"]) == "first"
+    assert "".join(token["text"] for token in runs["second"]["tokens"]) == "second plan"
+    assert runs["second"]["still_streaming"]
+    assert not runs["first"]["llm"].stream and not runs["second"]["llm"].stream